@@ -6,20 +6,90 @@ Dieses Paket enthält alle Funktionen für das Benchmark-Testen von Sprachmodell
 """
 
 # Importiere die wichtigsten Funktionen aus den Modulen
-from ollama_server import check_ollama_server, start_ollama_server
-from model_manager import check_model_exists, load_model
-from benchmark_core import benchmark_model, run_benchmark
-from visualization import visualize_results
+from ollama_client import get_session, configure_session
+from ollama_server import check_ollama_server, start_ollama_server, stop_ollama_server, wait_for_server
+from model_manager import check_model_exists, ensure_models, load_model, pull_model, pull_models, get_model_digest, get_model_metadata, unload_model, get_running_models
+from model_registry import ModelRegistry, get_registry
+from benchmark_core import benchmark_model, chat_model, run_benchmark, get_last_failures
+from retry_policy import RetryPolicy
+from quality_scoring import QualityScorer, score_row, pareto_front
+from chat_benchmark import run_chat_benchmark, summarize_turns
+from embedding_benchmark import benchmark_embed, run_embedding_benchmark, optimal_batch_size
+from benchmark_stats import aggregate_results
+from regression import compare_runs, mann_whitney_u
+from result_store import ResultStore, open_store, metrics_frame
+from blob_store import BlobStore
+from instrumentation import Profiler, profile, add_hook, remove_hook
+from resource_sampler import ResourceSampler
+from response_cache import ResponseCache
+from parameter_sweep import run_parameter_sweep, summarize_sweep
+from context_scaling import run_context_scaling, detect_nonlinearity, build_context_prompt
+from model_residency import measure_cold_load, residency_snapshot
+from load_generator import run_load_test
+from distributed import run_distributed_benchmark, cross_host_variance
+from mock_ollama_server import MockOllamaServer
+from visualization import visualize_results, visualize_load_test, visualize_context_scaling, visualize_quality
 from model_benchmark_utils import run_benchmark_test
 
 # Exportiere diese Funktionen direkt aus dem Hauptpaket
 __all__ = [
+    'get_session',
+    'configure_session',
     'check_ollama_server',
     'start_ollama_server',
+    'stop_ollama_server',
+    'wait_for_server',
     'check_model_exists',
+    'ensure_models',
     'load_model',
+    'pull_model',
+    'pull_models',
+    'get_model_digest',
+    'get_model_metadata',
+    'ModelRegistry',
+    'get_registry',
+    'unload_model',
+    'get_running_models',
     'benchmark_model',
+    'chat_model',
     'run_benchmark',
+    'get_last_failures',
+    'RetryPolicy',
+    'QualityScorer',
+    'score_row',
+    'pareto_front',
+    'run_chat_benchmark',
+    'summarize_turns',
+    'benchmark_embed',
+    'run_embedding_benchmark',
+    'optimal_batch_size',
+    'aggregate_results',
+    'compare_runs',
+    'mann_whitney_u',
+    'ResultStore',
+    'open_store',
+    'metrics_frame',
+    'BlobStore',
+    'Profiler',
+    'profile',
+    'add_hook',
+    'remove_hook',
+    'ResourceSampler',
+    'ResponseCache',
+    'run_parameter_sweep',
+    'summarize_sweep',
+    'run_context_scaling',
+    'detect_nonlinearity',
+    'build_context_prompt',
+    'measure_cold_load',
+    'residency_snapshot',
+    'run_load_test',
+    'run_distributed_benchmark',
+    'cross_host_variance',
+    'MockOllamaServer',
     'visualize_results',
+    'visualize_load_test',
+    'visualize_context_scaling',
+    'visualize_quality',
     'run_benchmark_test'
 ]
\ No newline at end of file
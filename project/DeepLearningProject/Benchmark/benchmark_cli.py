@@ -0,0 +1,203 @@
+"""
+benchmark_cli.py - Command-line entry point for headless benchmark runs
+
+This module runs suites from test_prompts.json without a notebook, e.g. from
+cron on a benchmark node. pandas, matplotlib and IPython are only imported
+when --plot or --plot-dir is given. Every call is a new run in the result
+store, so the command can be repeated as often as needed.
+
+Usage:
+    python benchmark_cli.py --models llama3.2 phi3:3.8b --suite basic_benchmark --repetitions 5
+    python benchmark_cli.py --list-suites
+"""
+
+import os
+import sys
+import json
+import argparse
+from contextlib import nullcontext
+from benchmark_core import run_benchmark
+from benchmark_stats import aggregate_results
+from result_store import open_store, export_csv
+from response_cache import ResponseCache
+from retry_policy import RetryPolicy
+from quality_scoring import QualityScorer, pareto_front
+from blob_store import BlobStore
+from instrumentation import Profiler, add_hook, remove_hook
+
+DEFAULT_PROMPTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'test_prompts.json')
+DEFAULT_API_URL = "http://localhost:11434/api"
+
+def load_suites(path):
+    """Loads all suites from a test_prompts.json file."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def suite_kind(entries):
+    """Returns 'chat', 'embedding' or 'generate' depending on the entries of a suite."""
+    if entries and 'turns' in entries[0]:
+        return 'chat'
+    if entries and 'inputs' in entries[0]:
+        return 'embedding'
+    return 'generate'
+
+def _side_path(path, name):
+    """Returns the file next to path for another kind of rows, e.g. results.chat.csv."""
+    root, extension = os.path.splitext(path)
+    return f"{root}.{name}{extension}"
+
+def print_table(rows, columns):
+    """Prints rows as a plain text table."""
+    if not rows:
+        return
+    cells = [[f"{row.get(column):.3f}" if isinstance(row.get(column), float) else str(row.get(column, ''))
+              for column in columns] for row in rows]
+    widths = [max(len(column), *(len(line[i]) for line in cells)) for i, column in enumerate(columns)]
+    print("  ".join(column.ljust(width) for column, width in zip(columns, widths)))
+    for line in cells:
+        print("  ".join(cell.ljust(width) for cell, width in zip(line, widths)))
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Run Ollama benchmark suites from test_prompts.json")
+    parser.add_argument("--prompts", default=DEFAULT_PROMPTS, help="Prompt file (default: test_prompts.json next to this script)")
+    parser.add_argument("--suite", nargs="+", default=["basic_benchmark"], help="Suites (sections of the prompt file) to run")
+    parser.add_argument("--list-suites", action="store_true", help="List the suites of the prompt file and exit")
+    parser.add_argument("--models", nargs="+", help="Models to benchmark")
+    parser.add_argument("--api-url", nargs="+", default=[DEFAULT_API_URL],
+                        help="Ollama API endpoint(s); with several, generation suites are distributed over them")
+    parser.add_argument("--concurrency", type=int, default=1, help="Requests in flight at once (per host with several endpoints)")
+    parser.add_argument("--concurrency-per-model", type=int, default=None, help="Requests in flight per model")
+    parser.add_argument("--warmup", type=int, default=0, help="Discarded warmup runs per task/model pair")
+    parser.add_argument("--repetitions", type=int, default=1, help="Measured runs per task/model pair")
+    parser.add_argument("--temperature", type=float, default=0.7)
+    parser.add_argument("--stream", action="store_true", help="Stream generations to measure TTFT and inter-token latency")
+    parser.add_argument("--timeout", type=float, default=120, help="Deadline of one generation attempt in seconds")
+    parser.add_argument("--attempts", type=int, default=2, help="Attempts per request (1 = no retries)")
+    parser.add_argument("--backoff", type=float, default=1.0, help="Pause before the first retry in seconds, doubled per retry")
+    parser.add_argument("--abandon", choices=["cancel", "drain"], default="cancel",
+                        help="Close a timed-out request or read it to its end before retrying")
+    parser.add_argument("--schedule", choices=["interleaved", "grouped"], default="interleaved")
+    parser.add_argument("--store", default="model_benchmark_results.jsonl", help="Result store (JSON Lines), '' disables it")
+    parser.add_argument("--csv", default="model_benchmark_results.csv", help="CSV output of this run, '' disables it")
+    parser.add_argument("--run-id", default=None, help="Run ID in the store (default: new ID)")
+    parser.add_argument("--resume", action="store_true", help="Continue the last (or --run-id) run in the store")
+    parser.add_argument("--blob-dir", default=None,
+                        help="Move prompts and responses to this deduplicated blob store, rows keep their hashes")
+    parser.add_argument("--cache-dir", default=None, help="Directory of the response cache (default: off)")
+    parser.add_argument("--resource-interval", type=float, default=0.5, help="Seconds between /proc samples, 0 disables them")
+    parser.add_argument("--score", action="store_true", help="Score the responses (expected answers, Python tests, length/format)")
+    parser.add_argument("--summary", action="store_true", help="Print statistics over the repetitions")
+    parser.add_argument("--profile", action="store_true", help="Print the time the harness itself spends per request phase")
+    parser.add_argument("--trace", default=None, help="Write a Chrome trace JSON of all requests to this file (implies --profile)")
+    parser.add_argument("--plot", action="store_true", help="Show charts (needs pandas and matplotlib)")
+    parser.add_argument("--plot-dir", default=None, help="Save charts and summary tables to this directory without showing them")
+    return parser
+
+# Options of run_benchmark that distributed runs over several --api-url endpoints do not support
+SINGLE_HOST_OPTIONS = ('resume', 'cache_dir', 'score', 'schedule', 'concurrency_per_model', 'resource_interval')
+
+def main(argv=None):
+    """Runs the selected suites; returns 0 if every suite produced results, 1 otherwise."""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    suites = load_suites(args.prompts)
+    if args.list_suites:
+        for name, entries in suites.items():
+            print(f"{name}: {len(entries)} entries ({suite_kind(entries)})")
+        return 0
+    if not args.models:
+        print("❌ No models specified (--models).")
+        return 1
+    unknown = [name for name in args.suite if name not in suites]
+    if unknown:
+        print(f"❌ Unknown suites: {', '.join(unknown)}. Available: {', '.join(suites)}")
+        return 1
+    if len(args.api_url) > 1:
+        unsupported = [name for name in SINGLE_HOST_OPTIONS if getattr(args, name) != parser.get_default(name)]
+        if unsupported:
+            options = ", ".join("--" + name.replace('_', '-') for name in unsupported)
+            print(f"❌ {options} cannot be used with several --api-url endpoints.")
+            return 1
+
+    store = open_store(args.store, run_id=args.run_id, resume=args.resume) if args.store else None
+    profiler = add_hook(Profiler(trace=args.trace is not None)) if args.profile or args.trace else None
+    if store is not None:
+        print(f"💾 Results are appended to '{args.store}' (run {store.run_id}).\n")
+    api_url = args.api_url[0]
+    retry_policy = RetryPolicy(attempts=args.attempts, timeout=args.timeout, backoff=args.backoff, abandon=args.abandon)
+    success = True
+
+    tasks = [task for name in args.suite if suite_kind(suites[name]) == 'generate' for task in suites[name]]
+    if tasks:
+        if len(args.api_url) > 1:
+            from distributed import run_distributed_benchmark
+            rows, host_summary = run_distributed_benchmark(
+                args.api_url, args.models, tasks, temperature=args.temperature,
+                max_concurrency_per_host=args.concurrency, stream=args.stream, warmup=args.warmup,
+                repetitions=args.repetitions, store=store, retry_policy=retry_policy,
+                blob_store=BlobStore(args.blob_dir) if args.blob_dir else None
+            )
+        else:
+            scorer = QualityScorer() if args.score else None
+            with scorer or nullcontext():
+                rows = run_benchmark(
+                    api_url, args.models, tasks, temperature=args.temperature, max_concurrency=args.concurrency,
+                    max_concurrency_per_model=args.concurrency_per_model, stream=args.stream, warmup=args.warmup,
+                    repetitions=args.repetitions, store=store, resume=args.resume,
+                    cache=ResponseCache(args.cache_dir) if args.cache_dir else None, schedule=args.schedule,
+                    resource_interval=args.resource_interval or None, retry_policy=retry_policy, scorer=scorer,
+                    blob_store=BlobStore(args.blob_dir) if args.blob_dir else None
+                )
+        success = success and bool(rows)
+        if rows and args.csv:
+            export_csv(rows, args.csv)
+            print(f"\n💾 Results have been saved to '{args.csv}'.")
+        if rows and args.summary:
+            print("\n📈 Statistics over Repetitions:")
+            print_table(aggregate_results(rows), ["Model", "Task", "Metric", "N", "Mean", "Std", "Median", "P95"])
+            if args.score:
+                print("\n🎯 Speed vs. Accuracy:")
+                print_table(pareto_front(rows), ["Model", "N", "Tokens per Second", "Accuracy", "Pareto Optimal"])
+        if rows and (args.plot or args.plot_dir):
+            from visualization import visualize_results
+            visualize_results(rows, args.models, tasks, output_dir=args.plot_dir, show=args.plot)
+
+    conversations = [entry for name in args.suite if suite_kind(suites[name]) == 'chat' for entry in suites[name]]
+    if conversations:
+        from chat_benchmark import run_chat_benchmark, summarize_turns
+        rows = run_chat_benchmark(api_url, args.models, conversations, temperature=args.temperature,
+                                  stream=args.stream, repetitions=args.repetitions, retry_policy=retry_policy)
+        success = success and bool(rows)
+        if rows and store is not None:
+            store.append_series('chat', rows)
+        if rows and args.csv:
+            export_csv(rows, _side_path(args.csv, 'chat'))
+        if rows and args.summary:
+            turns, growth = summarize_turns(rows)
+            print("\n💬 Latency per Turn:")
+            print_table(turns, ["Model", "Turn", "N", "Prompt Tokens", "Prefill Time (s)", "Generation Time (s)"])
+
+    datasets = [entry for name in args.suite if suite_kind(suites[name]) == 'embedding' for entry in suites[name]]
+    if datasets:
+        from embedding_benchmark import run_embedding_benchmark, optimal_batch_size
+        rows = run_embedding_benchmark(api_url, args.models, datasets, warmup=max(args.warmup, 1),
+                                       repetitions=args.repetitions, retry_policy=retry_policy)
+        success = success and bool(rows)
+        if rows and store is not None:
+            store.append_series('embeddings', rows)
+        if rows and args.csv:
+            export_csv(rows, _side_path(args.csv, 'embeddings'))
+        if rows and args.summary:
+            print("\n🧮 Optimal Batch Sizes:")
+            print_table(optimal_batch_size(rows), ["Model", "Dataset", "Optimal Batch Size", "Inputs per Second", "Best Batch Size"])
+
+    if profiler is not None:
+        remove_hook(profiler)
+        profiler.print_summary()
+        if args.trace:
+            profiler.export_chrome_trace(args.trace)
+
+    return 0 if success else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,11 +4,18 @@ benchmark_core.py - Core functions for language model benchmarking
 This module contains the main functions for conducting benchmark tests with Ollama.
 """
 
+import json
 import time
 import random
-import requests
-from ollama_server import check_ollama_server, start_ollama_server
-from model_manager import check_model_exists, load_model
+import numpy as np
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from ollama_client import get_session, ensure_pool_size
+from ollama_server import check_ollama_server, start_ollama_server, get_server_startup_time
+from model_manager import check_model_exists, load_model, get_model_metadata
+from resource_sampler import ResourceSampler
+from retry_policy import RetryPolicy, classify_status, classify_failure
+from instrumentation import new_context, emit, phase
 
 # Global variables for benchmark status
 _benchmark_running = False
@@ -16,82 +23,542 @@ _benchmark_running = False
 _checked_models = set()
 # Unique ID for the current benchmark execution
 _execution_id = None
+# Load times above this threshold (in seconds) mark a run as cold start
+COLD_LOAD_THRESHOLD = 0.25
+# Failed requests of the last run_benchmark call, see get_last_failures
+_last_failures = []
+# The request body is encoded by the harness itself, so the encoding can be timed.
+# Generations use the session without transport retries: the RetryPolicy owns every attempt.
+_JSON_HEADERS = {"Content-Type": "application/json"}
 
-def benchmark_model(api_url, model_name, prompt, max_tokens=100, temperature=0.7, request_timeout=120, retry_timeout=300):
-    """Performs a benchmark for a single model with a prompt."""
-    request_data = {
-        "model": model_name,
-        "prompt": prompt,
-        "temperature": temperature,
-        "max_tokens": max_tokens,
-        "stream": False
+def _latency_percentiles(intervals):
+    """Returns p50/p95/p99 of the inter-token intervals in seconds."""
+    if len(intervals) == 0:
+        return {"p50": 0, "p95": 0, "p99": 0}
+    p50, p95, p99 = np.percentile(np.asarray(intervals), [50, 95, 99])
+    return {"p50": float(p50), "p95": float(p95), "p99": float(p99)}
+
+def _server_timings(result, generation_time):
+    """
+    Converts Ollama's duration fields (ns) into seconds and derives the timing breakdown.
+    
+    Prefill throughput is prompt_eval_count / prompt_eval_duration, decode
+    throughput is eval_count / eval_duration. The client overhead is the wall
+    time observed by the client minus the server's total_duration, i.e. the
+    time spent on network, HTTP and the harness itself.
+    """
+    total_duration = result.get('total_duration', 0) / 1_000_000_000  # ns to s
+    prompt_eval_duration = result.get('prompt_eval_duration', 0) / 1_000_000_000
+    eval_duration = result.get('eval_duration', 0) / 1_000_000_000
+    prompt_eval_count = result.get('prompt_eval_count', 0)
+    eval_count = result.get('eval_count', 0)
+    
+    return {
+        "total_duration": total_duration,
+        "load_duration": result.get('load_duration', 0) / 1_000_000_000,
+        "prompt_eval_count": prompt_eval_count,
+        "prompt_eval_duration": prompt_eval_duration,
+        "eval_count": eval_count,
+        "eval_duration": eval_duration,
+        "prefill_tokens_per_second": prompt_eval_count / prompt_eval_duration if prompt_eval_duration > 0 else 0,
+        "decode_tokens_per_second": eval_count / eval_duration if eval_duration > 0 else 0,
+        "client_overhead": generation_time - total_duration if total_duration > 0 else 0
     }
+
+def _response_text(data):
+    """Returns the generated text of a /generate ("response") or /chat ("message") chunk."""
+    if 'message' in data:
+        return data['message'].get('content', '')
+    return data.get('response', '')
+
+def _timeout_failure(timeout, elapsed, abandon):
+    """
+    Result of an attempt that exceeded its deadline.
+
+    abandon tells how the attempt ended: 'cancel' (connection closed at the
+    deadline), 'drained' (the server finished late and the response was
+    discarded) or 'drain_timeout' (the drain window expired as well and the
+    connection was closed).
+    """
+    details = {
+        'cancel': "cancelled at the deadline",
+        'drained': f"drained, server finished after {elapsed:.1f}s",
+        'drain_timeout': f"drain window expired, aborted after {elapsed:.1f}s"
+    }
+    return {
+        "success": False,
+        "failure": "timeout",
+        "abandon": abandon,
+        "error": f"Timeout after {timeout}s ({details[abandon]})"
+    }
+
+def _encode(request_data, context):
+    """Encodes the request body (timed as phase encode)."""
+    with phase('encode', context):
+        return json.dumps(request_data).encode('utf-8')
+
+def _generate(api_url, request_data, timeout, start_time, endpoint='generate', drain=0, context=None):
+    """
+    Sends a non-streaming /generate (or /chat) request and evaluates the response.
     
-    start_time = time.time()
-    try:
-        # Timeout for the request
-        response = requests.post(f"{api_url}/generate", json=request_data, timeout=request_timeout)
-        end_time = time.time()
-        
-        if response.status_code == 200:
-            result = response.json()
-            generation_time = end_time - start_time
-            tokens_per_second = result.get('eval_count', 0) / generation_time if generation_time > 0 else 0
-            
-            return {
-                "success": True,
-                "response": result.get('response', ''),
-                "total_duration": result.get('total_duration', 0) / 1_000_000_000,  # ns to s
-                "load_duration": result.get('load_duration', 0) / 1_000_000_000,    # ns to s
-                "eval_count": result.get('eval_count', 0),
-                "generation_time": generation_time,
-                "tokens_per_second": tokens_per_second
-            }
-        else:
+    With drain > 0 the request is allowed drain further seconds to complete
+    after the timeout; a response arriving late is discarded as a timeout.
+    Without drain the connection is closed at the timeout.
+    """
+    body = _encode(request_data, context)
+    with phase('request', context):
+        response = get_session(retry=False).post(f"{api_url}/{endpoint}", data=body, headers=_JSON_HEADERS,
+                                                 timeout=timeout + drain)
+    end_time = time.perf_counter()
+    emit('after_request', context)
+    
+    if response.status_code != 200:
+        return {
+            "success": False,
+            "failure": classify_status(response.status_code),
+            "error": f"Error: {response.status_code} - {response.text}"
+        }
+    
+    with phase('parse', context):
+        result = response.json()
+    generation_time = end_time - start_time
+    if generation_time > timeout:
+        return _timeout_failure(timeout, generation_time, 'drained')
+    
+    with phase('finalize', context):
+        tokens_per_second = result.get('eval_count', 0) / generation_time if generation_time > 0 else 0
+        res = {
+            "success": True,
+            "response": _response_text(result),
+            "generation_time": generation_time,
+            "tokens_per_second": tokens_per_second
+        }
+        res.update(_server_timings(result, generation_time))
+    return res
+
+def _generate_streaming(api_url, request_data, timeout, start_time, endpoint='generate', drain=0, context=None):
+    """
+    Sends a streaming /generate (or /chat) request and consumes the NDJSON stream incrementally.
+    
+    Every chunk with response text counts as one token arrival. This yields the
+    time to first token, the inter-token intervals and the decode-only throughput
+    (tokens after the first one divided by the time between first and last token).
+    
+    timeout is a deadline for the whole stream, not only for the gap between
+    two chunks. When it passes, the connection is closed (which stops the
+    generation on the server) or, with drain > 0, the rest of the stream is
+    read and discarded for up to drain further seconds.
+    """
+    deadline = start_time + timeout
+    body = _encode(request_data, context)
+    with phase('request', context):
+        response = get_session(retry=False).post(f"{api_url}/{endpoint}", data=body, headers=_JSON_HEADERS,
+                                                 timeout=timeout + drain, stream=True)
+    emit('after_request', context)
+    with response:
+        if response.status_code != 200:
             return {
                 "success": False,
+                "failure": classify_status(response.status_code),
                 "error": f"Error: {response.status_code} - {response.text}"
             }
-    except requests.exceptions.Timeout:
-        print(f"    ⚠️ Timeout for request to {model_name}. Trying with increased timeout...")
-        try:
-            # Second attempt with even higher timeout
-            response = requests.post(f"{api_url}/generate", json=request_data, timeout=retry_timeout)
-            end_time = time.time()
-            
-            if response.status_code == 200:
-                result = response.json()
-                generation_time = end_time - start_time
-                tokens_per_second = result.get('eval_count', 0) / generation_time if generation_time > 0 else 0
-                
-                return {
-                    "success": True,
-                    "response": result.get('response', ''),
-                    "total_duration": result.get('total_duration', 0) / 1_000_000_000,
-                    "load_duration": result.get('load_duration', 0) / 1_000_000_000,
-                    "eval_count": result.get('eval_count', 0),
-                    "generation_time": generation_time,
-                    "tokens_per_second": tokens_per_second
-                }
-            else:
+        
+        chunks = []
+        arrival_times = []
+        result = {}
+        end_time = None
+        # Time spent decoding chunks, only measured while instrumentation hooks are registered
+        parse_start_ns = None
+        parse_ns = 0
+        # Read the stream to its end, so the connection can be reused
+        for line in response.iter_lines():
+            now = time.perf_counter()
+            if now > deadline + drain:
+                # Leaving the with block closes the connection, which stops the generation
+                return _timeout_failure(timeout, now - start_time, 'drain_timeout' if drain > 0 else 'cancel')
+            if not line:
+                continue
+            if context is not None:
+                chunk_start_ns = time.perf_counter_ns()
+                if parse_start_ns is None:
+                    parse_start_ns = chunk_start_ns
+                    emit('on_first_byte', context)
+            data = json.loads(line)
+            if 'error' in data:
                 return {
                     "success": False,
-                    "error": f"Error: {response.status_code} - {response.text}"
+                    "failure": "stream_error",
+                    "error": f"Error: {data['error']}"
                 }
-        except Exception as e:
-            return {
-                "success": False,
-                "error": f"Error on second attempt: {str(e)}"
-            }
-    except Exception as e:
-        return {
-            "success": False,
-            "error": str(e)
+            text = _response_text(data)
+            if text:
+                arrival_times.append(time.perf_counter())
+                chunks.append(text)
+            if data.get('done'):
+                end_time = time.perf_counter()
+                result = data
+            if context is not None:
+                parse_ns += time.perf_counter_ns() - chunk_start_ns
+                if text:
+                    emit('on_token', context, text)
+        if end_time is None:
+            end_time = time.perf_counter()
+    if parse_start_ns is not None:
+        emit('on_phase', context, 'parse', parse_start_ns, parse_ns)
+    
+    generation_time = end_time - start_time
+    if generation_time > timeout:
+        return _timeout_failure(timeout, generation_time, 'drained')
+    with phase('finalize', context):
+        result.setdefault('eval_count', len(arrival_times))
+        eval_count = result['eval_count']
+        tokens_per_second = eval_count / generation_time if generation_time > 0 else 0
+        time_to_first_token = arrival_times[0] - start_time if arrival_times else generation_time
+        intervals = np.diff(arrival_times) if len(arrival_times) > 1 else []
+        decode_time = arrival_times[-1] - arrival_times[0] if len(arrival_times) > 1 else 0
+        stream_decode_tokens_per_second = (len(arrival_times) - 1) / decode_time if decode_time > 0 else 0
+        
+        res = {
+            "success": True,
+            "response": ''.join(chunks),
+            "generation_time": generation_time,
+            "tokens_per_second": tokens_per_second,
+            "time_to_first_token": time_to_first_token,
+            "inter_token_latency": _latency_percentiles(intervals),
+            "stream_decode_tokens_per_second": stream_decode_tokens_per_second
         }
+        res.update(_server_timings(result, generation_time))
+    return res
 
-def run_benchmark(api_url, models, tasks, temperature=0.7, request_timeout=120, retry_timeout=300):
-    """Performs the complete benchmark for all models and tasks."""
-    global _benchmark_running, _checked_models, _execution_id
+def build_options(max_tokens=100, temperature=0.7, options=None):
+    """
+    Builds the Ollama "options" object for a generation request.
+    
+    Ollama ignores sampling parameters at the top level of the request, so
+    max_tokens is sent as num_predict and temperature inside "options".
+    Further model options (num_ctx, num_thread, num_batch, ...) are merged in.
+    """
+    request_options = {
+        "temperature": temperature,
+        "num_predict": max_tokens
+    }
+    if options:
+        request_options.update(options)
+    return request_options
+
+def _timed_request(api_url, endpoint, request_data, request_timeout, retry_timeout, stream, retry_policy=None):
+    """
+    Sends a /generate or /chat request with the attempts of a retry_policy.RetryPolicy.
+    
+    Without retry_policy a timed-out request is retried once with retry_timeout,
+    immediately (no backoff or jitter), as before retry policies existed.
+    Every attempt has its own start time, so the timings of a successful result
+    only cover the attempt that succeeded. The result's "attempts" list holds
+    one record per attempt (attempt, latency, failure class, error and, for
+    timeouts, how the attempt was abandoned: 'cancel', 'drained' or
+    'drain_timeout'); a failed result also carries the failure class of its
+    last attempt as "failure".
+    
+    Registered instrumentation hooks get before_request for every attempt
+    and on_complete once the request is finished.
+    """
+    policy = retry_policy or RetryPolicy(attempts=2, timeout=request_timeout, retry_timeout=retry_timeout,
+                                         backoff=0.0, jitter=0.0, retry_on=('timeout',))
+    generate = _generate_streaming if stream else _generate
+    context = new_context(request_data['model'], endpoint, stream)
+    attempts = []
+    attempt = 0
+    while True:
+        attempt += 1
+        timeout = policy.timeout_for(attempt)
+        if context is not None:
+            context["attempt"] = attempt
+            emit('before_request', context)
+        start_time = time.perf_counter()
+        try:
+            res = generate(api_url, request_data, timeout, start_time, endpoint, policy.drain_for(), context)
+        except Exception as e:
+            # Failed reads close their connection, so an abandoned generation is not kept open
+            res = {"success": False, "failure": classify_failure(e), "error": str(e)}
+            if res['failure'] == 'timeout':
+                res['abandon'] = 'drain_timeout' if policy.drain_for() > 0 else 'cancel'
+        record = {"attempt": attempt, "latency": time.perf_counter() - start_time, "failure": res.get('failure')}
+        if not res['success']:
+            record["error"] = res['error']
+        if 'abandon' in res:
+            record["abandon"] = res['abandon']
+        attempts.append(record)
+        if res['success'] or not policy.should_retry(res['failure'], attempt):
+            break
+        pause = policy.backoff_for(attempt)
+        print(f"    ⚠️ Attempt {attempt} for {request_data['model']} failed ({res['failure']}), retrying in {pause:.1f}s...")
+        time.sleep(pause)
+    res["attempts"] = attempts
+    emit('on_complete', context, res)
+    return res
+
+def benchmark_model(api_url, model_name, prompt, max_tokens=100, temperature=0.7, request_timeout=120, retry_timeout=300, stream=False,
+                    options=None, retry_policy=None):
+    """
+    Performs a benchmark for a single model with a prompt.
+    
+    options can hold additional Ollama model options, e.g. {"num_ctx": 4096}.
+    
+    With stream=True the response is consumed as a stream and the result
+    additionally contains time_to_first_token, inter_token_latency (p50/p95/p99)
+    and stream_decode_tokens_per_second.
+    
+    Every successful result carries the server-side timing breakdown: prompt
+    and decode token counts and durations, prefill_tokens_per_second,
+    decode_tokens_per_second and client_overhead (wall time minus server time).
+    
+    retry_policy (a retry_policy.RetryPolicy) sets attempts, timeouts and
+    backoff; by default a timeout is retried once with retry_timeout. The
+    result lists every attempt under "attempts".
+    """
+    request_data = {
+        "model": model_name,
+        "prompt": prompt,
+        "stream": stream,
+        "options": build_options(max_tokens, temperature, options)
+    }
+    return _timed_request(api_url, 'generate', request_data, request_timeout, retry_timeout, stream, retry_policy)
+
+def chat_model(api_url, model_name, messages, max_tokens=100, temperature=0.7, request_timeout=120, retry_timeout=300, stream=False,
+               options=None, retry_policy=None):
+    """
+    Performs a benchmark for one /chat request with the given message history.
+    
+    messages is the list of {"role", "content"} dicts sent to the model. The
+    result has the same fields as benchmark_model; response is the content of
+    the assistant message.
+    """
+    request_data = {
+        "model": model_name,
+        "messages": messages,
+        "stream": stream,
+        "options": build_options(max_tokens, temperature, options)
+    }
+    return _timed_request(api_url, 'chat', request_data, request_timeout, retry_timeout, stream, retry_policy)
+
+# Building blocks of run_benchmark, also used by chat_benchmark and distributed
+
+def result_row(model, task_name, task, res, repetition=0):
+    """Builds a result row for a successful benchmark response."""
+    row = {
+        "Model": model,
+        "Task": task_name,
+        "Repetition": repetition,
+        "Cold Start": res.get('load_duration', 0) >= COLD_LOAD_THRESHOLD,
+        "Prompt": task['prompt'],
+        "Response": res.get('response', ''),
+        "Generation Time (s)": res.get('generation_time', 0),
+        "Load Time (s)": res.get('load_duration', 0),
+        "Tokens Generated": res.get('eval_count', 0),
+        "Tokens per Second": res.get('tokens_per_second', 0),
+        "Prompt Tokens": res.get('prompt_eval_count', 0),
+        "Prefill Time (s)": res.get('prompt_eval_duration', 0),
+        "Prefill Tokens per Second": res.get('prefill_tokens_per_second', 0),
+        "Decode Time (s)": res.get('eval_duration', 0),
+        "Decode Tokens per Second": res.get('decode_tokens_per_second', 0),
+        "Server Total Time (s)": res.get('total_duration', 0),
+        "Client Overhead (s)": res.get('client_overhead', 0),
+        "Attempts": len(res.get('attempts', [])) or 1,
+        "Failed Attempts Time (s)": sum(a['latency'] for a in res.get('attempts', []) if a['failure'])
+    }
+    if 'time_to_first_token' in res:
+        row["Time to First Token (s)"] = res['time_to_first_token']
+        row["Inter-Token Latency p50 (s)"] = res['inter_token_latency']['p50']
+        row["Inter-Token Latency p95 (s)"] = res['inter_token_latency']['p95']
+        row["Inter-Token Latency p99 (s)"] = res['inter_token_latency']['p99']
+        row["Stream Decode Tokens per Second"] = res['stream_decode_tokens_per_second']
+    if 'cached' in res:
+        row["Cached"] = res['cached']
+    return row
+
+def failure_record(model, task_name, repetition, res):
+    """Builds the record of a failed request for get_last_failures."""
+    attempts = res.get('attempts', [])
+    return {
+        "Model": model,
+        "Task": task_name,
+        "Repetition": repetition,
+        "Failure": res.get('failure', 'other'),
+        "Abandon": res.get('abandon'),
+        "Error": res.get('error', 'Unknown error'),
+        "Attempts": len(attempts),
+        "Attempt Failures": [a['failure'] for a in attempts],
+        "Attempt Latencies (s)": [a['latency'] for a in attempts]
+    }
+
+def get_last_failures():
+    """
+    Returns the failed requests of the last run_benchmark call.
+    
+    Each record has Model, Task, Repetition, the Failure class, Abandon mode
+    (timeouts) and Error of the last attempt and the failure class and latency
+    of every attempt, so error
+    rates can be reported next to the latencies of the successful rows.
+    """
+    return list(_last_failures)
+
+def run_job(api_url, job, benchmark_kwargs, cache=None):
+    """
+    Runs the benchmark for one (task_name, task, model, repetition) job.
+    
+    With a response_cache.ResponseCache the result is looked up first and stored
+    after a successful generation. The result's "cached" entry tells whether it
+    was served from the cache or freshly measured.
+    """
+    task_name, task, model, repetition = job
+    max_tokens = task.get('max_tokens', 100)
+    if cache is None:
+        return benchmark_model(api_url, model, task['prompt'], max_tokens=max_tokens, **benchmark_kwargs)
+    
+    options = {
+        "temperature": benchmark_kwargs.get('temperature'),
+        "max_tokens": max_tokens,
+        "stream": benchmark_kwargs.get('stream', False),
+        "model_options": benchmark_kwargs.get('options'),
+        "repetition": repetition
+    }
+    key = cache.make_key(api_url, model, task['prompt'], options)
+    cached = cache.get(key) if key is not None else None
+    if cached is not None:
+        cached['cached'] = True
+        return cached
+    
+    res = benchmark_model(api_url, model, task['prompt'], max_tokens=max_tokens, **benchmark_kwargs)
+    if res['success'] and key is not None:
+        cache.put(key, res)
+    res['cached'] = False
+    return res
+
+def run_jobs_concurrently(api_url, jobs, benchmark_kwargs, max_concurrency, max_concurrency_per_model=None, on_result=None, cache=None,
+                           on_failure=None):
+    """
+    Dispatches (task_name, task, model, repetition) jobs to a thread pool.
+    
+    At most max_concurrency requests are in flight overall and at most
+    max_concurrency_per_model per model. A job is only submitted once both
+    limits allow it, so waiting jobs never occupy a worker thread.
+    Results are returned in job order, independent of completion order.
+    on_result is called with every row as soon as it completes, on_failure
+    with the failure record of every failed job.
+    """
+    per_model_limit = max_concurrency_per_model or max_concurrency
+    # Warmup jobs have the repetitions -warmup..-1
+    warmup = max((-job[3] for job in jobs), default=0)
+    pending = deque(enumerate(jobs))
+    in_flight = {}
+    in_flight_per_model = {}
+    completed = {}
+    
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        while pending or in_flight:
+            # Submit every pending job whose model still has a free slot
+            skipped = deque()
+            while pending and len(in_flight) < max_concurrency:
+                index, job = pending.popleft()
+                task_name, task, model, repetition = job
+                if in_flight_per_model.get(model, 0) >= per_model_limit:
+                    skipped.append((index, job))
+                    continue
+                future = executor.submit(run_job, api_url, job, benchmark_kwargs, cache)
+                in_flight[future] = (index, job)
+                in_flight_per_model[model] = in_flight_per_model.get(model, 0) + 1
+            skipped.extend(pending)
+            pending = skipped
+            
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, (task_name, task, model, repetition) = in_flight.pop(future)
+                in_flight_per_model[model] -= 1
+                try:
+                    res = future.result()
+                except Exception as e:
+                    res = {"success": False, "failure": "other", "error": str(e)}
+                
+                label = f"warmup #{repetition + warmup + 1}" if repetition < 0 else f"#{repetition + 1}"
+                with phase('report', new_context(model, 'report', benchmark_kwargs.get('stream', False))):
+                    if res['success']:
+                        completed[index] = result_row(model, task_name, task, res, repetition)
+                        if on_result is not None:
+                            on_result(completed[index])
+                        print(f"  ✓ {model} · {task_name} {label}: {res.get('eval_count', 0)} tokens in {res.get('generation_time', 0):.2f}s{' (cached)' if res.get('cached') else ''}")
+                    else:
+                        if on_failure is not None:
+                            on_failure(failure_record(model, task_name, repetition, res))
+                        print(f"  ❌ {model} · {task_name} {label}: {res.get('error','Unknown error')}")
+    
+    return [completed[index] for index in sorted(completed)]
+
+def run_benchmark(api_url, models, tasks, temperature=0.7, request_timeout=120, retry_timeout=300,
+                  max_concurrency=1, max_concurrency_per_model=None, stream=False, warmup=0, repetitions=1,
+                  store=None, resume=False, cache=None, options=None, schedule='interleaved', resource_interval=0.5,
+                  retry_policy=None, scorer=None, blob_store=None):
+    """
+    Performs the complete benchmark for all models and tasks.
+    
+    With max_concurrency > 1 the task × model requests are dispatched
+    concurrently, limited to max_concurrency requests in flight overall and
+    max_concurrency_per_model per model (defaults to max_concurrency).
+    Use this together with OLLAMA_NUM_PARALLEL on the server to measure
+    throughput under concurrent load. The result rows are the same in both modes.
+    
+    With stream=True every generation is streamed and the rows get the extra
+    columns Time to First Token, Inter-Token Latency p50/p95/p99 and
+    Stream Decode Tokens per Second.
+    
+    Every task/model pair is first run warmup times (results discarded) and
+    then measured repetitions times. Each row records its Repetition and a
+    Cold Start flag (load time above COLD_LOAD_THRESHOLD), use
+    benchmark_stats.aggregate_results to summarize the repetitions.
+    
+    If the server had to be started, every row also records its Server Startup Time.
+    
+    If a result_store.ResultStore is given, every row is appended to it as soon
+    as it is measured. With resume=True, pairs already stored for the store's
+    run are skipped and their stored rows are returned together with the new ones.
+    
+    With a response_cache.ResponseCache, responses for an unchanged model digest,
+    prompt and options are reused instead of generated. Such rows are marked with
+    Cached = True and still carry the timings of the original measurement.
+    
+    options are passed to every request as additional Ollama model options,
+    e.g. {"num_ctx": 8192, "num_thread": 8}.
+    
+    schedule='interleaved' runs all models for one task before the next task,
+    schedule='grouped' runs all tasks of one model before the next model. Use
+    grouped when the server cannot keep all models in memory, otherwise every
+    request may force a model swap. With max_concurrency > 1, grouped runs the
+    requests of one model concurrently and waits until all of them are done
+    before the next model starts, so models are never mixed in flight.
+    
+    While the benchmark runs, a resource_sampler.ResourceSampler reads CPU,
+    memory, load average and the RSS of the ollama processes from /proc every
+    resource_interval seconds (None disables it). Every measured row gets the
+    summary of the samples taken during its request (Mean CPU, Peak CPU Core,
+    Peak Ollama RSS, Min Memory Available, Mean Load Average) and the time
+    series is saved next to the store's results as <store>.resources.jsonl.
+    
+    retry_policy (a retry_policy.RetryPolicy) controls attempts, timeouts,
+    backoff and how timed-out requests are abandoned; by default a timeout is
+    retried once with retry_timeout. Rows record their Attempts and the Failed
+    Attempts Time, failed requests are available from get_last_failures and
+    are saved as <store>.failures.jsonl.
+    
+    With a quality_scoring.QualityScorer every measured row is scored in the
+    scorer's worker pool while the benchmark continues (answer checks, Python
+    test cases, length/format metrics). Rows are appended to the store once
+    they are scored; the returned rows carry the score columns.
+    
+    With a blob_store.BlobStore, Prompt and Response are moved out of every row
+    into the deduplicated blob store (after scoring) and replaced by Prompt Hash
+    and Response Hash, so the rows kept in memory and written to the store and
+    the CSV only hold metrics. Use blob_store.expand(rows) to get the texts back.
+    """
+    global _benchmark_running, _checked_models, _execution_id, _last_failures
     
     # Generate a unique execution ID
     current_execution_id = f"{time.time()}-{random.randint(1000, 9999)}"
@@ -112,6 +579,7 @@ def run_benchmark(api_url, models, tasks, temperature=0.7, request_timeout=120,
     
     # Clear model cache
     _checked_models = set()
+    _last_failures = []
     
     # Check if input parameters are valid
     if not models or len(models) == 0:
@@ -124,12 +592,17 @@ def run_benchmark(api_url, models, tasks, temperature=0.7, request_timeout=120,
         _benchmark_running = False
         return None
     
+    sampler = None
     try:
+        # Values added to every row of this run
+        row_extras = {}
+        
         # Check/start server if needed
         if not check_ollama_server(api_url):
             if not start_ollama_server(api_url):
                 print("❌ Ollama server could not be started.")
                 return None
+            row_extras["Server Startup Time (s)"] = get_server_startup_time()
         
         # Check/load models (with cache checking)
         for model in models:
@@ -147,49 +620,173 @@ def run_benchmark(api_url, models, tasks, temperature=0.7, request_timeout=120,
             else:
                 print(f"✅ Model {model} is ready.")
         
+        # Size, parameter count, quantization and family of every model for the result rows
+        model_metadata = {model: get_model_metadata(api_url, model) for model in dict.fromkeys(models)}
+        
         # Process tasks in advance to avoid duplicate tasks
         unique_tasks = {}
         for task in tasks:
             unique_tasks[task['name']] = task
-            
+        
+        # Each model only once per task, negative repetitions are warmup runs
+        unique_models = list(dict.fromkeys(models))
+        jobs = [
+            (task_name, task, model, repetition)
+            for task_name, task in unique_tasks.items()
+            for model in unique_models
+            for repetition in range(-warmup, repetitions)
+        ]
+        if schedule == 'grouped':
+            # All tasks of a model in a row, so the server does not swap models between requests
+            jobs.sort(key=lambda job: unique_models.index(job[2]))
+        elif schedule != 'interleaved':
+            print(f"❌ Unknown schedule '{schedule}', use 'interleaved' or 'grouped'.")
+            return None
+        job_order = {(model, task_name, repetition): i for i, (task_name, task, model, repetition) in enumerate(jobs)}
+        
+        # Skip pairs that were already completed in the resumed run
+        stored_rows = []
+        if store is not None and resume:
+            for row in store.load():
+                key = (row['Model'], row['Task'], row.get('Repetition', 0))
+                if key in job_order:
+                    row.pop("Run ID", None)
+                    stored_rows.append(row)
+            done = {(row['Model'], row['Task'], row.get('Repetition', 0)) for row in stored_rows}
+            pair_done = lambda model, task_name: all((model, task_name, r) in done for r in range(repetitions))
+            jobs = [
+                (task_name, task, model, repetition) for task_name, task, model, repetition in jobs
+                if (model, task_name, repetition) not in done and not (repetition < 0 and pair_done(model, task_name))
+            ]
+            if stored_rows:
+                print(f"🔁 {len(stored_rows)} results already stored, {len([j for j in jobs if j[3] >= 0])} remaining.")
+        
+        if resource_interval:
+            sampler = ResourceSampler(interval=resource_interval).start()
+        
+        def on_result(row):
+            if sampler is not None and not row.get('Cached'):
+                end_time = time.perf_counter()
+                row.update(sampler.window(end_time - row['Generation Time (s)'], end_time))
+            row.update(model_metadata.get(row['Model'], {}))
+            row.update(row_extras)
+            if scorer is not None:
+                scorer.submit(row, unique_tasks[row['Task']], on_scored=finish)
+            else:
+                finish(row)
+        
+        def finish(row):
+            if blob_store is not None:
+                blob_store.compact(row)
+            if store is not None:
+                store.append(row)
+        
+        def on_failure(record):
+            _last_failures.append(record)
+        
+        benchmark_kwargs = {
+            "temperature": temperature,
+            "request_timeout": request_timeout,
+            "retry_timeout": retry_timeout,
+            "stream": stream,
+            "options": options,
+            "retry_policy": retry_policy
+        }
+        
         # Run benchmark
-        results = []
-        for task_name, task in unique_tasks.items():
-            print(f"\n🧪 Task: {task_name}")
-            
-            # Each model only once per task
-            processed_models = set()
-            for model in models:
-                if model in processed_models:
+        if max_concurrency <= 1:
+            results = []
+            current_group = None
+            for task_name, task, model, repetition in jobs:
+                if schedule == 'grouped':
+                    if model != current_group:
+                        print(f"\n🤖 Model: {model}")
+                        current_group = model
+                    label = f"🧪 {task_name}"
+                else:
+                    if task_name != current_group:
+                        print(f"\n🧪 Task: {task_name}")
+                        current_group = task_name
+                    label = f"🤖 {model}"
+                if repetition < 0:
+                    print(f"  {label} (warmup #{repetition + warmup + 1})...")
+                elif repetitions > 1:
+                    print(f"  {label} #{repetition + 1}...")
+                else:
+                    print(f"  {label}...")
+                res = run_job(api_url, (task_name, task, model, repetition), benchmark_kwargs, cache)
+                
+                if repetition < 0:
+                    if not res['success']:
+                        print(f"    ⚠️ Warmup failed: {res.get('error','Unknown error')}")
                     continue
-                    
-                processed_models.add(model)
-                print(f"  🤖 {model}...")
-                res = benchmark_model(
-                    api_url,
-                    model,
-                    task['prompt'],
-                    max_tokens=task.get('max_tokens', 100),
-                    temperature=temperature,
-                    request_timeout=request_timeout,
-                    retry_timeout=retry_timeout                )
                 
-                if res['success']:
-                    results.append({
-                        "Model": model,
-                        "Task": task_name,
-                        "Prompt": task['prompt'],
-                        "Response": res.get('response', ''),
-                        "Generation Time (s)": res.get('generation_time', 0),
-                        "Load Time (s)": res.get('load_duration', 0),
-                        "Tokens Generated": res.get('eval_count', 0),
-                        "Tokens per Second": res.get('tokens_per_second', 0)
-                    })
-                    print(f"    ✓ {res.get('eval_count', 0)} tokens in {res.get('generation_time', 0):.2f}s")
-                else:
-                    print(f"    ❌ Error: {res.get('error','Unknown error')}")
+                # Row, store and output of the harness, timed for the instrumentation hooks
+                with phase('report', new_context(model, 'report', stream)):
+                    if res['success']:
+                        results.append(result_row(model, task_name, task, res, repetition))
+                        on_result(results[-1])
+                        print(f"    ✓ {res.get('eval_count', 0)} tokens in {res.get('generation_time', 0):.2f}s{' (cached)' if res.get('cached') else ''}")
+                        if stream:
+                            print(f"      TTFT {res['time_to_first_token']:.3f}s, {res['stream_decode_tokens_per_second']:.1f} decode tokens/s")
+                    else:
+                        on_failure(failure_record(model, task_name, repetition, res))
+                        print(f"    ❌ Error: {res.get('error','Unknown error')}")
+        else:
+            ensure_pool_size(max_concurrency)
+            # Grouped: one model at a time, the next model only starts once every request of the previous one is done
+            if schedule == 'grouped':
+                groups = [[job for job in jobs if job[2] == model] for model in unique_models]
+            else:
+                groups = [jobs]
+            results = []
+            for group in groups:
+                if not group:
+                    continue
+                if schedule == 'grouped':
+                    print(f"\n🤖 Model: {group[0][2]}")
+                warmup_jobs = [job for job in group if job[3] < 0]
+                if warmup_jobs:
+                    print(f"\n🔥 Running {len(warmup_jobs)} warmup requests...")
+                    run_jobs_concurrently(
+                        api_url, warmup_jobs, benchmark_kwargs, max_concurrency, max_concurrency_per_model, cache=cache
+                    )
+                    print("🔥 Warmup finished, results discarded.\n")
+                results += run_jobs_concurrently(
+                    api_url, [job for job in group if job[3] >= 0], benchmark_kwargs, max_concurrency,
+                    max_concurrency_per_model, on_result=on_result, cache=cache, on_failure=on_failure
+                )
+        
+        if scorer is not None:
+            print(f"\n🧪 Scored {scorer.wait()} responses.")
+        
+        if stored_rows:
+            results = sorted(
+                stored_rows + results,
+                key=lambda row: job_order[(row['Model'], row['Task'], row['Repetition'])]
+            )
+        
+        if cache is not None:
+            print(f"\n🗄️ Response cache: {cache.hits} hits, {cache.misses} misses")
+        retried = sum(1 for row in results if row.get('Attempts', 1) > 1)
+        if _last_failures or retried:
+            classes = {}
+            for record in _last_failures:
+                classes[record['Failure']] = classes.get(record['Failure'], 0) + 1
+            details = ", ".join(f"{name}: {count}" for name, count in classes.items())
+            print(f"\n🔁 {retried} requests succeeded after a retry, {len(_last_failures)} failed" + (f" ({details})" if details else ""))
+        if store is not None and _last_failures:
+            store.append_series('failures', _last_failures)
         
         return results
     finally:
+        if scorer is not None:
+            # Rows still being scored after an error are stored before returning
+            scorer.wait()
+        if sampler is not None:
+            sampler.stop()
+            if store is not None and sampler.samples:
+                store.append_series('resources', sampler.series())
+            print(f"📈 {len(sampler.samples)} resource samples, sampler cost {sampler.sampling_time * 1000:.1f} ms in total")
         # Release lock
         _benchmark_running = False
\ No newline at end of file
@@ -0,0 +1,146 @@
+"""
+benchmark_stats.py - Statistical aggregation of repeated benchmark runs
+
+This module summarizes the repetitions of each task/model pair (mean, standard
+deviation, median, p95 and confidence interval). All statistics are computed
+for all groups at once with NumPy instead of looping over the groups.
+"""
+
+import numpy as np
+from statistics import NormalDist
+
+try:
+    from scipy import stats as scipy_stats
+except ImportError:
+    # scipy is optional, the normal approximation is used without it
+    scipy_stats = None
+
+# Metrics that are aggregated by default
+DEFAULT_METRICS = [
+    'Generation Time (s)',
+    'Tokens Generated',
+    'Tokens per Second'
+]
+
+def _critical_values(counts, confidence):
+    """Two-sided critical values: Student's t per group size if scipy is available, otherwise normal."""
+    if scipy_stats is not None:
+        degrees = np.maximum(counts - 1, 1)
+        return scipy_stats.t.ppf(0.5 + confidence / 2, degrees)
+    return np.full(len(counts), NormalDist().inv_cdf(0.5 + confidence / 2))
+
+def _grouped_quantile(sorted_values, starts, counts, q):
+    """Linear-interpolated quantile per group of values that are sorted within each group."""
+    valid = counts > 0
+    positions = starts + q * np.maximum(counts - 1, 0)
+    lower = np.floor(positions).astype(int)
+    upper = np.ceil(positions).astype(int)
+    fraction = positions - lower
+    result = np.full(len(counts), np.nan)
+    if valid.any():
+        low_values = sorted_values[lower[valid]]
+        high_values = sorted_values[upper[valid]]
+        result[valid] = low_values + (high_values - low_values) * fraction[valid]
+    return result
+
+def grouped_statistics(group_ids, values, n_groups, confidence=0.95):
+    """
+    Computes the statistics of values for every group in one vectorized pass.
+
+    Args:
+        group_ids: Integer array assigning each value to a group (0..n_groups-1)
+        values: Float array of the measured values
+        n_groups: Number of groups
+        confidence: Confidence level of the interval around the mean
+
+    Returns:
+        Dict of arrays (one entry per group): n, mean, std, median, p95, ci_low, ci_high
+    """
+    counts = np.bincount(group_ids, minlength=n_groups)
+    sums = np.bincount(group_ids, weights=values, minlength=n_groups)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = np.where(counts > 0, sums / counts, np.nan)
+        squares = np.bincount(group_ids, weights=(values - means[group_ids]) ** 2, minlength=n_groups)
+        stds = np.where(counts > 1, np.sqrt(squares / (counts - 1)), 0.0)
+        half_widths = _critical_values(counts, confidence) * stds / np.sqrt(counts)
+    half_widths = np.where(counts > 1, half_widths, 0.0)
+
+    # Sort by group and then by value, so each group is a sorted slice
+    order = np.lexsort((values, group_ids))
+    sorted_values = values[order]
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+    return {
+        "n": counts,
+        "mean": means,
+        "std": stds,
+        "median": _grouped_quantile(sorted_values, starts, counts, 0.5),
+        "p95": _grouped_quantile(sorted_values, starts, counts, 0.95),
+        "ci_low": means - half_widths,
+        "ci_high": means + half_widths
+    }
+
+def aggregate_results(results, metrics=None, group_by=('Model', 'Task'), confidence=0.95, include_cold=False,
+                      include_cached=False):
+    """
+    Aggregates repeated benchmark rows per task/model pair.
+
+    Args:
+        results: List of result rows from run_benchmark, or a DataFrame of them
+        metrics: Columns to aggregate (default: DEFAULT_METRICS)
+        group_by: Columns that identify a group
+        confidence: Confidence level of the interval around the mean
+        include_cold: Also use rows flagged as Cold Start (excluded by default)
+        include_cached: Also use rows served from the response cache (excluded by default)
+
+    Returns:
+        List of dicts with one row per group and metric (Model, Task, Metric,
+        N, Mean, Std, Median, P95, CI Low, CI High)
+    """
+    metrics = metrics or DEFAULT_METRICS
+    if hasattr(results, 'columns'):
+        # DataFrame: filter and group with column operations instead of a loop over the rows
+        keep = np.ones(len(results), dtype=bool)
+        for column, include in (('Cold Start', include_cold), ('Cached', include_cached)):
+            if not include and column in results:
+                keep &= ~results[column].fillna(False).to_numpy(dtype=bool)
+        frame = results[keep]
+        if len(frame) == 0:
+            return []
+        group_ids = frame.groupby(list(group_by), sort=False).ngroup().to_numpy()
+        group_keys = list(frame[list(group_by)].drop_duplicates().itertuples(index=False, name=None))
+        column_values = lambda metric: frame[metric].to_numpy(dtype=float) if metric in frame else np.full(len(frame), np.nan)
+    else:
+        rows = [
+            row for row in results
+            if (include_cold or not row.get('Cold Start', False)) and (include_cached or not row.get('Cached', False))
+        ]
+        if not rows:
+            return []
+        keys = [tuple(row[column] for column in group_by) for row in rows]
+        group_keys = list(dict.fromkeys(keys))
+        key_index = {key: i for i, key in enumerate(group_keys)}
+        group_ids = np.array([key_index[key] for key in keys])
+        column_values = lambda metric: np.array([row.get(metric, np.nan) for row in rows], dtype=float)
+
+    aggregated = []
+    for metric in metrics:
+        values = column_values(metric)
+        present = ~np.isnan(values)
+        stats = grouped_statistics(group_ids[present], values[present], len(group_keys), confidence)
+        for i, key in enumerate(group_keys):
+            if stats["n"][i] == 0:
+                continue
+            entry = dict(zip(group_by, key))
+            entry.update({
+                "Metric": metric,
+                "N": int(stats["n"][i]),
+                "Mean": float(stats["mean"][i]),
+                "Std": float(stats["std"][i]),
+                "Median": float(stats["median"][i]),
+                "P95": float(stats["p95"][i]),
+                "CI Low": float(stats["ci_low"][i]),
+                "CI High": float(stats["ci_high"][i])
+            })
+            aggregated.append(entry)
+    return aggregated
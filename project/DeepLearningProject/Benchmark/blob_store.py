@@ -0,0 +1,94 @@
+"""
+blob_store.py - Deduplicated on-disk storage for prompts and responses
+
+This module keeps the long text of result rows out of the rows themselves.
+Every text is stored once under its SHA-256 hash; a compacted row only holds
+the hash (Prompt Hash, Response Hash), so the rows in memory, the result store
+and the CSV stay small even for long generations over thousands of
+repetitions. The same prompt repeated for every model and repetition is
+written only once.
+"""
+
+import os
+import hashlib
+import tempfile
+import threading
+
+# Row columns that are moved to the blob store
+TEXT_COLUMNS = ('Prompt', 'Response')
+
+def text_hash(text):
+    """Returns the SHA-256 hex digest of a text."""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+class BlobStore:
+    """Content-addressed text store, one file per distinct text."""
+
+    def __init__(self, directory='.blobs'):
+        self.directory = directory
+        self.writes = 0
+        self.duplicates = 0
+        self._known = set()
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        # Two-character subdirectories keep the directories small
+        return os.path.join(self.directory, key[:2], f"{key}.txt")
+
+    def put(self, text):
+        """Stores a text (if it is not stored yet) and returns its hash."""
+        key = text_hash(text)
+        with self._lock:
+            if key in self._known:
+                self.duplicates += 1
+                return key
+            self._known.add(key)
+        path = self._path(key)
+        if os.path.exists(path):
+            with self._lock:
+                self.duplicates += 1
+            return key
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temporary file first, so a crash never leaves a truncated blob
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+            f.write(text)
+        os.replace(temp_path, path)
+        with self._lock:
+            self.writes += 1
+        return key
+
+    def get(self, key):
+        """Returns the text for a hash or None if it is not stored."""
+        try:
+            with open(self._path(key), 'r', encoding='utf-8', newline='') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def __contains__(self, key):
+        return key in self._known or os.path.exists(self._path(key))
+
+    def compact(self, row, columns=TEXT_COLUMNS):
+        """Replaces the text columns of a row in place by "<column> Hash" references; returns the row."""
+        for column in columns:
+            text = row.pop(column, None)
+            if text is not None:
+                row[f"{column} Hash"] = self.put(text)
+        return row
+
+    def expand(self, rows, columns=TEXT_COLUMNS):
+        """Returns copies of compacted rows with the text columns restored, e.g. for scoring or reading responses."""
+        texts = {}
+        expanded = []
+        for row in rows:
+            row = dict(row)
+            for column in columns:
+                key = row.get(f"{column} Hash")
+                if key is not None and column not in row:
+                    if key not in texts:
+                        texts[key] = self.get(key)
+                    row[column] = texts[key]
+            expanded.append(row)
+        return expanded
@@ -0,0 +1,93 @@
+"""
+chat_benchmark.py - Multi-turn conversation benchmark via /api/chat
+
+This module replays conversations turn by turn against /api/chat. The history
+(including the model's own answers) grows with every turn, so the per-turn
+latency shows how prefill cost develops with context length and whether the
+server reuses the already evaluated prefix of the conversation.
+"""
+
+import numpy as np
+from benchmark_core import chat_model, result_row
+from ollama_server import check_ollama_server, start_ollama_server
+from model_manager import ensure_models, get_model_metadata
+
+def run_chat_benchmark(api_url, models, conversations, temperature=0.7, request_timeout=120, retry_timeout=300,
+                       stream=False, repetitions=1, options=None, store=None, retry_policy=None):
+    """
+    Replays every conversation with every model.
+
+    A conversation is a dict with name, turns (list of user messages), an
+    optional system prompt and max_tokens per answer, as in the
+    "chat_conversations" section of test_prompts.json. A failed turn ends the
+    conversation, since the following turns depend on its answer.
+
+    Returns:
+        List of result rows (same columns as run_benchmark) with the
+        additional columns Turn, History Messages (messages sent with the turn)
+        and History Characters (their total length)
+    """
+    if not check_ollama_server(api_url) and not start_ollama_server(api_url):
+        print("❌ Ollama server could not be started.")
+        return None
+    if not ensure_models(api_url, models):
+        return None
+
+    rows = []
+    for model in dict.fromkeys(models):
+        metadata = get_model_metadata(api_url, model)
+        for conversation in conversations:
+            max_tokens = conversation.get('max_tokens', 100)
+            for repetition in range(repetitions):
+                print(f"\n💬 {model} · {conversation['name']}" + (f" #{repetition + 1}" if repetitions > 1 else ""))
+                messages = [{"role": "system", "content": conversation['system']}] if conversation.get('system') else []
+                for turn, user_message in enumerate(conversation['turns'], start=1):
+                    messages.append({"role": "user", "content": user_message})
+                    res = chat_model(api_url, model, messages, max_tokens=max_tokens, temperature=temperature,
+                                     request_timeout=request_timeout, retry_timeout=retry_timeout, stream=stream,
+                                     options=options, retry_policy=retry_policy)
+                    if not res['success']:
+                        print(f"  ❌ Turn {turn}: {res.get('error','Unknown error')}")
+                        break
+
+                    row = result_row(model, conversation['name'], {"prompt": user_message}, res, repetition)
+                    row["Turn"] = turn
+                    row["History Messages"] = len(messages)
+                    row["History Characters"] = sum(len(message['content']) for message in messages)
+                    row.update(metadata)
+                    rows.append(row)
+                    if store is not None:
+                        store.append(row)
+                    print(f"  ✓ Turn {turn}: {res['prompt_eval_count']} prompt tokens, prefill {res['prompt_eval_duration']:.2f}s, "
+                          f"{res['eval_count']} tokens in {res['generation_time']:.2f}s")
+                    messages.append({"role": "assistant", "content": res['response']})
+    return rows
+
+def summarize_turns(rows):
+    """
+    Averages latency and prefill figures per model and turn.
+
+    The growth per turn is the slope of a line fitted through the mean
+    latencies over the turn numbers, i.e. the seconds each further turn adds.
+
+    Returns:
+        (turns, growth): list of dicts with Model, Turn, N, History Characters,
+        Prompt Tokens, Prefill Time (s), Generation Time (s) and (when streamed)
+        Time to First Token (s); dict model -> seconds of latency added per turn
+    """
+    turns = []
+    growth = {}
+    for model in dict.fromkeys(row['Model'] for row in rows):
+        model_rows = [row for row in rows if row['Model'] == model]
+        turn_numbers = sorted(set(row['Turn'] for row in model_rows))
+        latencies = []
+        for turn in turn_numbers:
+            turn_rows = [row for row in model_rows if row['Turn'] == turn]
+            entry = {"Model": model, "Turn": turn, "N": len(turn_rows)}
+            for column in ["History Characters", "Prompt Tokens", "Prefill Time (s)", "Generation Time (s)", "Time to First Token (s)"]:
+                if column in turn_rows[0]:
+                    entry[column] = float(np.mean([row[column] for row in turn_rows]))
+            latencies.append(entry["Generation Time (s)"])
+            turns.append(entry)
+        growth[model] = float(np.polyfit(turn_numbers, latencies, 1)[0]) if len(turn_numbers) > 1 else 0.0
+    return turns, growth
@@ -0,0 +1,119 @@
+"""
+context_scaling.py - Prompt-length scaling benchmark
+
+This module generates prompts of controlled token lengths by padding a question
+with deterministic filler text and measures prefill time and time to first
+token per context size. It also detects the context length from which the
+latency stops growing linearly.
+"""
+
+import numpy as np
+from benchmark_core import run_benchmark
+
+# Rough number of characters per token for English text, the actual prompt
+# length is taken from Ollama's prompt_eval_count
+CHARS_PER_TOKEN = 4
+DEFAULT_LENGTHS = [512, 2048, 8192, 32768]
+DEFAULT_QUESTION = "Based on the notes above, which archive number was mentioned in the very first note? Answer briefly."
+
+_FILLER_SUBJECTS = ["archive", "library", "observatory", "harbor", "workshop", "greenhouse", "station", "museum"]
+_FILLER_ACTIONS = ["catalogued", "inspected", "repaired", "measured", "recorded", "relocated", "cleaned", "reviewed"]
+_FILLER_OBJECTS = ["old maps", "brass instruments", "seed samples", "ship logs", "glass plates", "letters", "tools", "charts"]
+
+def filler_sentence(index):
+    """Returns the index-th sentence of the deterministic filler text."""
+    return (f"Note {index}: the staff of the {_FILLER_SUBJECTS[index % 8]} {_FILLER_ACTIONS[(index // 8) % 8]} "
+            f"{_FILLER_OBJECTS[(index // 64) % 8]} in room {index % 97} during week {index % 52}.")
+
+def build_context_prompt(target_tokens, question=DEFAULT_QUESTION, variant=0):
+    """
+    Builds a prompt of roughly target_tokens tokens: filler notes followed by the question.
+
+    Different variants start with a different first note, so repeated requests
+    do not share a prompt prefix that the server could reuse from its cache.
+    """
+    target_chars = target_tokens * CHARS_PER_TOKEN - len(question)
+    sentences = [f"Archive number {1000 + variant} was opened for this session."]
+    length = len(sentences[0])
+    index = 0
+    while length < target_chars:
+        sentence = filler_sentence(index)
+        sentences.append(sentence)
+        length += len(sentence) + 1
+        index += 1
+    return " ".join(sentences) + "\n\n" + question
+
+def context_window(target_tokens, max_tokens):
+    """Returns the smallest power of two num_ctx that fits the prompt and the answer."""
+    required = int(target_tokens * 1.25) + max_tokens
+    return int(2 ** np.ceil(np.log2(max(required, 2048))))
+
+def run_context_scaling(api_url, models, lengths=None, repetitions=3, max_tokens=32, temperature=0.0,
+                        request_timeout=600, retry_timeout=900, question=DEFAULT_QUESTION):
+    """
+    Runs every model at every context length and returns the result rows.
+
+    For each length num_ctx is raised so the prompt is not truncated by the
+    server. Changing num_ctx reloads the model, so one warmup request with its
+    own prompt runs first. All requests are streamed to record time to first
+    token. Each row gets a Context Length column with the target length; the
+    measured length is in Prompt Tokens.
+    """
+    lengths = sorted(lengths or DEFAULT_LENGTHS)
+    rows = []
+    for model in models:
+        for length in lengths:
+            print(f"\n📏 {model}: ~{length} tokens of context")
+            tasks = [
+                {
+                    "name": f"Context {length} #{variant + 1}" if variant >= 0 else f"Context {length} warmup",
+                    "prompt": build_context_prompt(length, question, variant),
+                    "max_tokens": max_tokens
+                }
+                for variant in range(-1, repetitions)
+            ]
+            results = run_benchmark(
+                api_url,
+                [model],
+                tasks,
+                temperature=temperature,
+                request_timeout=request_timeout,
+                retry_timeout=retry_timeout,
+                stream=True,
+                options={"num_ctx": context_window(length, max_tokens)}
+            )
+            for row in results or []:
+                if row['Task'].endswith("warmup"):
+                    continue
+                row["Context Length"] = length
+                rows.append(row)
+    return rows
+
+def detect_nonlinearity(rows, metric='Prefill Time (s)', tolerance=0.25):
+    """
+    Finds per model the first context length where metric grows faster than linearly.
+
+    A line through the mean values of the two shortest lengths (over the mean
+    Prompt Tokens) predicts the metric for the longer ones. The first length
+    whose mean exceeds the prediction by more than tolerance is returned,
+    None if the growth stays linear.
+
+    Returns:
+        Dict model -> context length (or None)
+    """
+    knees = {}
+    for model in dict.fromkeys(row['Model'] for row in rows):
+        model_rows = [row for row in rows if row['Model'] == model]
+        lengths = sorted(set(row['Context Length'] for row in model_rows))
+        tokens = np.array([np.mean([r['Prompt Tokens'] or r['Context Length'] for r in model_rows if r['Context Length'] == length]) for length in lengths])
+        values = np.array([np.mean([r[metric] for r in model_rows if r['Context Length'] == length]) for length in lengths])
+        knees[model] = None
+        if len(lengths) < 3 or tokens[1] == tokens[0]:
+            continue
+
+        slope = (values[1] - values[0]) / (tokens[1] - tokens[0])
+        predicted = values[0] + slope * (tokens - tokens[0])
+        exceeded = np.nonzero(values[2:] > predicted[2:] * (1 + tolerance))[0]
+        if len(exceeded) > 0:
+            knees[model] = lengths[2 + exceeded[0]]
+    return knees
@@ -0,0 +1,313 @@
+"""
+distributed.py - Benchmarking across several Ollama hosts
+
+This module shards the task × model × repetition matrix over a list of Ollama
+endpoints. Every host gets its own job queue; a host whose queue runs empty
+steals jobs from the longest queue of another host, so fast hosts are not left
+idle while slow ones still have work. Every result row is tagged with its host.
+A host whose worker fails is retired and its queued jobs move to the other
+hosts; jobs that no host can run any more are recorded as failures.
+"""
+
+import time
+import threading
+import numpy as np
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from benchmark_core import run_job, run_jobs_concurrently, result_row, failure_record
+from ollama_client import ensure_pool_size
+from ollama_server import check_ollama_server
+from model_manager import ensure_models, get_model_metadata
+
+# Failure records of the last run_distributed_benchmark call
+_last_failures = []
+
+class WorkStealingQueues:
+    """One job deque per host; a host takes from the front of its own deque and steals from the back of others."""
+
+    def __init__(self, hosts, jobs):
+        self._queues = {host: deque() for host in hosts}
+        self._lock = threading.Lock()
+        # Round-robin sharding, so every host starts with a similar mix of models and tasks
+        for index, job in enumerate(jobs):
+            self._queues[hosts[index % len(hosts)]].append((index, job))
+
+    def next_job(self, host):
+        """Returns (index, job, stolen) for the host or None when all queues are empty or the host is retired."""
+        with self._lock:
+            if host not in self._queues:
+                return None
+            if self._queues[host]:
+                index, job = self._queues[host].popleft()
+                return index, job, False
+            victim = max(self._queues, key=lambda other: len(self._queues[other]))
+            if self._queues[victim]:
+                index, job = self._queues[victim].pop()
+                return index, job, True
+            return None
+
+    def retire(self, host):
+        """
+        Removes a failed host; its queued jobs are moved round robin to the remaining hosts.
+
+        Returns the (index, job) pairs that are left without a host, i.e. all
+        of them when the last host is retired.
+        """
+        with self._lock:
+            jobs = self._queues.pop(host, deque())
+            if not self._queues:
+                return list(jobs)
+            hosts = list(self._queues)
+            for position, item in enumerate(jobs):
+                self._queues[hosts[position % len(hosts)]].append(item)
+            return []
+
+    def remaining(self):
+        """Removes and returns all (index, job) pairs that are still queued."""
+        with self._lock:
+            jobs = [item for queue in self._queues.values() for item in queue]
+            for queue in self._queues.values():
+                queue.clear()
+            return jobs
+
+def _prepare_host(api_url, models):
+    """Checks that the host is reachable and has all models, pulling missing ones."""
+    if not check_ollama_server(api_url):
+        print(f"❌ {api_url} is not reachable, host is skipped.")
+        return False
+    if not ensure_models(api_url, models):
+        print(f"❌ {api_url} is skipped.")
+        return False
+    print(f"✅ {api_url} is ready.")
+    return True
+
+def run_distributed_benchmark(api_urls, models, tasks, temperature=0.7, request_timeout=120, retry_timeout=300,
+                              max_concurrency_per_host=1, stream=False, warmup=0, repetitions=1, store=None,
+                              options=None, retry_policy=None, blob_store=None):
+    """
+    Runs the benchmark for all models and tasks on several Ollama hosts.
+
+    Unreachable hosts and hosts that cannot load every model are skipped.
+    Warmup requests run on every host before the measured jobs, so each host
+    has the models loaded. The measured jobs are sharded over the hosts and
+    balanced by work stealing; each host runs up to max_concurrency_per_host
+    requests at a time. If a worker raises (e.g. the store cannot be written),
+    its host is retired, the job it was running is recorded as a failure and
+    the host's queued jobs are run by the other hosts. Failed requests are
+    available from get_last_failures and saved as <store>.failures.jsonl.
+
+    No response cache is used, the same prompt must be measured on every host
+    it is assigned to. retry_policy and blob_store are used as in
+    run_benchmark; resuming, quality scoring, schedules, per-model limits and
+    resource sampling are not supported for several hosts.
+
+    Returns:
+        (rows, host_summary): the result rows with a Host column, in job order,
+        and the throughput per host plus an "All hosts" row (see summarize_hosts)
+    """
+    global _last_failures
+    _last_failures = []
+    hosts = [api_url for api_url in dict.fromkeys(api_urls) if _prepare_host(api_url, models)]
+    if not hosts:
+        print("❌ No host is available.")
+        return [], []
+
+    unique_tasks = {task['name']: task for task in tasks}
+    unique_models = list(dict.fromkeys(models))
+    benchmark_kwargs = {
+        "temperature": temperature,
+        "request_timeout": request_timeout,
+        "retry_timeout": retry_timeout,
+        "stream": stream,
+        "options": options,
+        "retry_policy": retry_policy
+    }
+    model_metadata = {host: {model: get_model_metadata(host, model) for model in unique_models} for host in hosts}
+    ensure_pool_size(len(hosts) * max_concurrency_per_host)
+
+    if warmup > 0:
+        warmup_jobs = [
+            (task_name, task, model, repetition)
+            for task_name, task in unique_tasks.items()
+            for model in unique_models
+            for repetition in range(-warmup, 0)
+        ]
+        print(f"\n🔥 Running {len(warmup_jobs)} warmup requests on each of {len(hosts)} hosts...")
+        with ThreadPoolExecutor(max_workers=len(hosts)) as executor:
+            list(executor.map(
+                lambda host: run_jobs_concurrently(host, warmup_jobs, benchmark_kwargs, max_concurrency_per_host),
+                hosts
+            ))
+        print("🔥 Warmup finished, results discarded.\n")
+
+    jobs = [
+        (task_name, task, model, repetition)
+        for task_name, task in unique_tasks.items()
+        for model in unique_models
+        for repetition in range(repetitions)
+    ]
+    queues = WorkStealingQueues(hosts, jobs)
+    completed = {}
+    host_stats = {host: {"requests": 0, "stolen": 0, "failed": 0, "first_start": None, "last_end": None} for host in hosts}
+    stats_lock = threading.Lock()
+
+    def record_failure(host, job, res):
+        task_name, task, model, repetition = job
+        record = failure_record(model, task_name, repetition, res)
+        record["Host"] = host
+        with stats_lock:
+            _last_failures.append(record)
+        print(f"  ❌ {host} · {model} · {task_name}: {res.get('error','Unknown error')}")
+
+    def run_host_job(host, index, job, stolen):
+        task_name, task, model, repetition = job
+        start_time = time.perf_counter()
+        try:
+            res = run_job(host, job, benchmark_kwargs)
+        except Exception as e:
+            res = {"success": False, "failure": "other", "error": str(e)}
+        end_time = time.perf_counter()
+
+        with stats_lock:
+            stats = host_stats[host]
+            stats["first_start"] = start_time if stats["first_start"] is None else min(stats["first_start"], start_time)
+            stats["last_end"] = end_time if stats["last_end"] is None else max(stats["last_end"], end_time)
+            stats["stolen"] += stolen
+            if not res['success']:
+                stats["failed"] += 1
+        if not res['success']:
+            record_failure(host, job, res)
+            return
+        row = result_row(model, task_name, task, res, repetition)
+        row["Host"] = host
+        row.update(model_metadata[host][model])
+        if blob_store is not None:
+            blob_store.compact(row)
+        with stats_lock:
+            if store is not None:
+                store.append(row)
+            completed[index] = row
+            host_stats[host]["requests"] += 1
+        print(f"  ✓ {host} · {model} · {task_name} #{repetition + 1}: {res.get('eval_count', 0)} tokens in {res.get('generation_time', 0):.2f}s{' (stolen)' if stolen else ''}")
+
+    def worker(host):
+        while True:
+            item = queues.next_job(host)
+            if item is None:
+                return
+            index, job, stolen = item
+            try:
+                run_host_job(host, index, job, stolen)
+            except Exception as e:
+                # The host is retired: its queued jobs go to the other hosts, the current one is failed
+                with stats_lock:
+                    host_stats[host]["failed"] += 1
+                record_failure(host, job, {"success": False, "failure": "other", "error": f"{type(e).__name__}: {e}"})
+                for orphan_index, orphan in queues.retire(host):
+                    record_failure(host, orphan, {"success": False, "failure": "other", "error": "no healthy host left"})
+                raise
+
+    print(f"🌐 Running {len(jobs)} requests on {len(hosts)} hosts with up to {max_concurrency_per_host} in flight per host...")
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(hosts) * max_concurrency_per_host) as executor:
+        futures = {executor.submit(worker, host): host for host in hosts for _ in range(max_concurrency_per_host)}
+    for future, host in futures.items():
+        try:
+            future.result()
+        except Exception as e:
+            print(f"⚠️ Worker for {host} failed and the host was retired: {type(e).__name__}: {e}")
+    # Jobs still queued when every worker has stopped, e.g. after all hosts were retired
+    for index, job in queues.remaining():
+        record_failure(None, job, {"success": False, "failure": "other", "error": "no healthy host left"})
+    wall_time = time.perf_counter() - start_time
+    if store is not None and _last_failures:
+        store.append_series('failures', _last_failures)
+
+    rows = [completed[index] for index in sorted(completed)]
+    return rows, summarize_hosts(rows, host_stats, wall_time)
+
+def get_last_failures():
+    """
+    Returns the failed jobs of the last run_distributed_benchmark call.
+
+    The records are those of benchmark_core.get_last_failures plus the Host
+    that ran (or last held) the job.
+    """
+    return list(_last_failures)
+
+def summarize_hosts(rows, host_stats, wall_time):
+    """
+    Summarizes the throughput per host and over all hosts.
+
+    Throughput is the generated tokens divided by the time the host was busy
+    (first request sent to last response received); the "All hosts" row
+    divides all tokens by the wall time of the whole run.
+
+    Returns:
+        List of dicts with Host, Requests, Failed, Stolen Jobs, Tokens,
+        Busy Time (s), Throughput (tokens/s) and Mean Tokens per Second
+        (mean of the per-request values)
+    """
+    summary = []
+    for host, stats in host_stats.items():
+        host_rows = [row for row in rows if row['Host'] == host]
+        tokens = sum(row['Tokens Generated'] for row in host_rows)
+        busy_time = stats["last_end"] - stats["first_start"] if stats["first_start"] is not None else 0
+        summary.append({
+            "Host": host,
+            "Requests": stats["requests"],
+            "Failed": stats["failed"],
+            "Stolen Jobs": stats["stolen"],
+            "Tokens": tokens,
+            "Busy Time (s)": busy_time,
+            "Throughput (tokens/s)": tokens / busy_time if busy_time > 0 else 0,
+            "Mean Tokens per Second": float(np.mean([row['Tokens per Second'] for row in host_rows])) if host_rows else 0
+        })
+
+    tokens = sum(row['Tokens Generated'] for row in rows)
+    summary.append({
+        "Host": "All hosts",
+        "Requests": sum(entry["Requests"] for entry in summary),
+        "Failed": sum(entry["Failed"] for entry in summary),
+        "Stolen Jobs": sum(entry["Stolen Jobs"] for entry in summary),
+        "Tokens": tokens,
+        "Busy Time (s)": wall_time,
+        "Throughput (tokens/s)": tokens / wall_time if wall_time > 0 else 0,
+        "Mean Tokens per Second": float(np.mean([row['Tokens per Second'] for row in rows])) if rows else 0
+    })
+
+    for entry in summary:
+        print(f"🖥️ {entry['Host']}: {entry['Requests']} requests ({entry['Stolen Jobs']} stolen, {entry['Failed']} failed), "
+              f"{entry['Throughput (tokens/s)']:.1f} tokens/s")
+    return summary
+
+def cross_host_variance(rows, metric='Tokens per Second'):
+    """
+    Compares the same model across hosts.
+
+    For every model the mean of metric is computed per host; the spread of
+    these host means shows how consistent the fleet is.
+
+    Returns:
+        List of dicts with Model, Hosts, Mean, Std, CV (%) (std / mean),
+        Min/Max Host and Min/Max Mean
+    """
+    comparison = []
+    for model in dict.fromkeys(row['Model'] for row in rows):
+        model_rows = [row for row in rows if row['Model'] == model]
+        hosts = list(dict.fromkeys(row['Host'] for row in model_rows))
+        means = np.array([np.mean([row[metric] for row in model_rows if row['Host'] == host]) for host in hosts])
+        mean = float(means.mean())
+        std = float(means.std(ddof=1)) if len(means) > 1 else 0.0
+        comparison.append({
+            "Model": model,
+            "Hosts": len(hosts),
+            "Mean": mean,
+            "Std": std,
+            "CV (%)": 100 * std / mean if mean > 0 else 0,
+            "Min Host": hosts[int(means.argmin())],
+            "Min Mean": float(means.min()),
+            "Max Host": hosts[int(means.argmax())],
+            "Max Mean": float(means.max())
+        })
+    return comparison
@@ -0,0 +1,184 @@
+"""
+embedding_benchmark.py - Batch embedding throughput via /api/embed
+
+This module sends batches of inputs of increasing size to /api/embed and
+measures inputs per second per batch size. Larger batches amortize the fixed
+cost of a request until the model is saturated; the optimal batch size is the
+smallest one that reaches (almost) the highest throughput.
+"""
+
+import time
+import numpy as np
+from ollama_client import get_session
+from retry_policy import RetryPolicy, classify_status, classify_failure
+from ollama_server import check_ollama_server, start_ollama_server
+from model_manager import ensure_models
+
+DEFAULT_BATCH_SIZES = [1, 4, 16, 64]
+
+def _embed_attempt(api_url, request_data, timeout):
+    """Sends one /embed attempt without transport retries and times it."""
+    inputs = request_data["input"]
+    start_time = time.perf_counter()
+    try:
+        response = get_session(retry=False).post(f"{api_url}/embed", json=request_data, timeout=timeout)
+        end_time = time.perf_counter()
+        if response.status_code != 200:
+            return {
+                "success": False,
+                "failure": classify_status(response.status_code),
+                "error": f"Error: {response.status_code} - {response.text}"
+            }
+        result = response.json()
+    except Exception as e:
+        return {"success": False, "failure": classify_failure(e), "error": str(e)}
+    embeddings = result.get('embeddings', [])
+    if len(embeddings) != len(inputs):
+        return {"success": False, "failure": "invalid_response",
+                "error": f"Expected {len(inputs)} embeddings, got {len(embeddings)}"}
+    latency = end_time - start_time
+    total_duration = result.get('total_duration', 0) / 1_000_000_000
+    prompt_eval_count = result.get('prompt_eval_count', 0)
+    return {
+        "success": True,
+        "latency": latency,
+        "inputs_per_second": len(inputs) / latency if latency > 0 else 0,
+        "prompt_eval_count": prompt_eval_count,
+        "tokens_per_second": prompt_eval_count / latency if latency > 0 else 0,
+        "dimensions": len(embeddings[0]) if embeddings else 0,
+        "total_duration": total_duration,
+        "load_duration": result.get('load_duration', 0) / 1_000_000_000,
+        "client_overhead": latency - total_duration if total_duration > 0 else 0
+    }
+
+def benchmark_embed(api_url, model_name, inputs, request_timeout=120, options=None, retry_policy=None):
+    """
+    Sends one /embed request with a batch of inputs.
+
+    The request is sent without transport retries, so the latency and
+    inputs/s never include a hidden retry or its backoff. retry_policy (a
+    retry_policy.RetryPolicy) allows further attempts; by default there is a
+    single attempt. Every attempt is timed on its own and listed under
+    "attempts", as for generations.
+
+    Returns:
+        Dict with success, latency (s), inputs_per_second, prompt_eval_count,
+        tokens_per_second, dimensions, total_duration, load_duration,
+        client_overhead (wall time minus server time) and attempts, or success
+        False with failure class, error and attempts
+    """
+    request_data = {"model": model_name, "input": inputs}
+    if options:
+        request_data["options"] = options
+
+    policy = retry_policy or RetryPolicy(attempts=1, timeout=request_timeout)
+    attempts = []
+    attempt = 0
+    while True:
+        attempt += 1
+        start_time = time.perf_counter()
+        res = _embed_attempt(api_url, request_data, policy.timeout_for(attempt))
+        record = {"attempt": attempt, "latency": time.perf_counter() - start_time, "failure": res.get('failure')}
+        if not res['success']:
+            record["error"] = res['error']
+        attempts.append(record)
+        if res['success'] or not policy.should_retry(res['failure'], attempt):
+            break
+        pause = policy.backoff_for(attempt)
+        print(f"    ⚠️ Attempt {attempt} for {model_name} failed ({res['failure']}), retrying in {pause:.1f}s...")
+        time.sleep(pause)
+    res["attempts"] = attempts
+    return res
+
+def _batch(inputs, batch_size, offset):
+    """Returns batch_size inputs starting at offset, cycling through the input list."""
+    return [inputs[(offset + i) % len(inputs)] for i in range(batch_size)]
+
+def run_embedding_benchmark(api_url, models, datasets, batch_sizes=None, warmup=1, repetitions=3,
+                            request_timeout=120, options=None, store=None, retry_policy=None):
+    """
+    Measures embedding throughput for every model, dataset and batch size.
+
+    A dataset is a dict with name, inputs and optional batch_sizes, as in the
+    "embedding_batches" section of test_prompts.json. Batches larger than the
+    dataset cycle through its inputs. Each repetition starts at a different
+    offset, so consecutive batches do not repeat the same inputs.
+
+    Returns:
+        List of dicts with Model, Dataset, Batch Size, Repetition, Latency (s),
+        Inputs per Second, Prompt Tokens, Tokens per Second, Dimensions,
+        Server Total Time (s), Load Time (s), Client Overhead (s) and Attempts
+        (see benchmark_embed for retry_policy)
+    """
+    if not check_ollama_server(api_url) and not start_ollama_server(api_url):
+        print("❌ Ollama server could not be started.")
+        return None
+    if not ensure_models(api_url, models):
+        return None
+
+    rows = []
+    for model in dict.fromkeys(models):
+        for dataset in datasets:
+            inputs = dataset['inputs']
+            sizes = batch_sizes or dataset.get('batch_sizes') or DEFAULT_BATCH_SIZES
+            print(f"\n🧮 {model} · {dataset['name']} ({len(inputs)} inputs)")
+            for batch_size in sizes:
+                for repetition in range(-warmup, repetitions):
+                    res = benchmark_embed(api_url, model, _batch(inputs, batch_size, repetition * batch_size),
+                                          request_timeout=request_timeout, options=options, retry_policy=retry_policy)
+                    if not res['success']:
+                        print(f"  ❌ Batch {batch_size}: {res.get('error','Unknown error')}")
+                        continue
+                    if repetition < 0:
+                        continue
+                    row = {
+                        "Model": model,
+                        "Dataset": dataset['name'],
+                        "Batch Size": batch_size,
+                        "Repetition": repetition,
+                        "Latency (s)": res['latency'],
+                        "Inputs per Second": res['inputs_per_second'],
+                        "Prompt Tokens": res['prompt_eval_count'],
+                        "Tokens per Second": res['tokens_per_second'],
+                        "Dimensions": res['dimensions'],
+                        "Server Total Time (s)": res['total_duration'],
+                        "Load Time (s)": res['load_duration'],
+                        "Client Overhead (s)": res['client_overhead'],
+                        "Attempts": len(res['attempts'])
+                    }
+                    rows.append(row)
+                    if store is not None:
+                        store.append(row)
+                batch_rows = [row for row in rows if row['Model'] == model and row['Dataset'] == dataset['name'] and row['Batch Size'] == batch_size]
+                if batch_rows:
+                    print(f"  ✓ Batch {batch_size}: {np.mean([row['Inputs per Second'] for row in batch_rows]):.1f} inputs/s, "
+                          f"{np.mean([row['Latency (s)'] for row in batch_rows]):.3f}s per request")
+    return rows
+
+def optimal_batch_size(rows, tolerance=0.05):
+    """
+    Finds the optimal batch size per model and dataset.
+
+    The optimum is the smallest batch size whose mean throughput is within
+    tolerance of the best mean throughput; larger batches only add latency.
+
+    Returns:
+        List of dicts with Model, Dataset, Optimal Batch Size, Inputs per Second
+        (at the optimum), Best Batch Size and Best Inputs per Second
+    """
+    results = []
+    for key in dict.fromkeys((row['Model'], row['Dataset']) for row in rows):
+        key_rows = [row for row in rows if (row['Model'], row['Dataset']) == key]
+        sizes = sorted(set(row['Batch Size'] for row in key_rows))
+        throughput = np.array([np.mean([row['Inputs per Second'] for row in key_rows if row['Batch Size'] == size]) for size in sizes])
+        best = int(throughput.argmax())
+        optimal = int(np.nonzero(throughput >= throughput[best] * (1 - tolerance))[0][0])
+        results.append({
+            "Model": key[0],
+            "Dataset": key[1],
+            "Optimal Batch Size": sizes[optimal],
+            "Inputs per Second": float(throughput[optimal]),
+            "Best Batch Size": sizes[best],
+            "Best Inputs per Second": float(throughput[best])
+        })
+    return results
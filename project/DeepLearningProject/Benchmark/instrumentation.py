@@ -0,0 +1,231 @@
+"""
+instrumentation.py - Hooks into the request path and a harness overhead profiler
+
+benchmark_core reports the events of every generation request to the
+registered hooks:
+
+- before_request(context): an attempt starts, before the request is encoded
+- after_request(context): the HTTP response headers (non-streaming: the whole
+  response) have arrived
+- on_first_byte(context): the first chunk of a stream has arrived
+- on_token(context, text): a chunk with generated text has arrived
+- on_complete(context, result): the request is finished (after all attempts)
+- on_phase(context, name, start_ns, duration_ns): a timed phase of the harness
+  (encode, request, parse, finalize, report)
+
+A hook is any object with some of these methods. Without registered hooks
+the request path only checks an empty list. Profiler is a built-in hook
+that attributes the time of every request to these phases with
+time.perf_counter_ns, i.e. it measures how much of a generation time is the
+harness itself; run it against mock_ollama_server to get the measurement floor.
+"""
+
+import os
+import json
+import time
+import itertools
+import threading
+import numpy as np
+from contextlib import contextmanager, nullcontext
+
+# Registered hooks, checked on every request
+_hooks = []
+_hooks_lock = threading.Lock()
+_request_ids = itertools.count(1)
+_NO_PHASE = nullcontext()
+
+def add_hook(hook):
+    """Registers a hook; returns it so it can be removed later."""
+    with _hooks_lock:
+        _hooks.append(hook)
+    return hook
+
+def remove_hook(hook):
+    with _hooks_lock:
+        if hook in _hooks:
+            _hooks.remove(hook)
+
+def active():
+    """Returns True if at least one hook is registered."""
+    return bool(_hooks)
+
+def new_context(model, endpoint, stream):
+    """Creates the context passed to the hooks for one request, None if no hook is registered."""
+    if not _hooks:
+        return None
+    return {
+        "request_id": next(_request_ids),
+        "model": model,
+        "endpoint": endpoint,
+        "stream": stream,
+        "attempt": 1,
+        "thread": threading.get_ident()
+    }
+
+def emit(event, context, *args):
+    """Calls the method event of every hook that has it; does nothing without a context."""
+    if context is None:
+        return
+    for hook in list(_hooks):
+        method = getattr(hook, event, None)
+        if method is not None:
+            method(context, *args)
+
+class _Phase:
+    __slots__ = ('name', 'context', 'start_ns')
+
+    def __init__(self, name, context):
+        self.name = name
+        self.context = context
+
+    def __enter__(self):
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        emit('on_phase', self.context, self.name, self.start_ns, time.perf_counter_ns() - self.start_ns)
+
+def phase(name, context):
+    """Times a block as phase name of a request; a shared no-op without context."""
+    return _Phase(name, context) if context is not None else _NO_PHASE
+
+class Profiler:
+    """
+    Hook that collects per-phase harness timings and optionally a trace.
+
+    Phases: encode (JSON encoding of the request), request (sending until the
+    response, or for streams its headers, arrived), parse (decoding the
+    response; for streams the summed time spent on the chunks), finalize
+    (building the result, e.g. latency percentiles) and report (result row,
+    store, prints in run_benchmark). Everything outside these phases in a
+    request's wall time is server and network time.
+    With trace=True every phase, first byte and token is kept for
+    export_chrome_trace.
+    """
+
+    def __init__(self, trace=False):
+        self.trace = trace
+        self.phases = {}
+        self.requests = 0
+        self.tokens = 0
+        self.events = []
+        self._starts = {}
+        self._lock = threading.Lock()
+        self._origin_ns = time.perf_counter_ns()
+
+    def _trace_event(self, context, name, timestamp_ns, duration_ns=None, args=None):
+        event = {
+            "name": name,
+            "cat": context["endpoint"],
+            "ph": "X" if duration_ns is not None else "i",
+            "ts": (timestamp_ns - self._origin_ns) / 1000,
+            "pid": os.getpid(),
+            "tid": context["thread"],
+            "args": dict(args or {}, model=context["model"], request=context["request_id"])
+        }
+        if duration_ns is not None:
+            event["dur"] = duration_ns / 1000
+        else:
+            event["s"] = "t"
+        self.events.append(event)
+
+    def before_request(self, context):
+        with self._lock:
+            self._starts[(context["request_id"], context["attempt"])] = time.perf_counter_ns()
+
+    def on_first_byte(self, context):
+        if self.trace:
+            with self._lock:
+                self._trace_event(context, "first byte", time.perf_counter_ns())
+
+    def on_token(self, context, text):
+        now = time.perf_counter_ns() if self.trace else None
+        with self._lock:
+            self.tokens += 1
+            if self.trace:
+                self._trace_event(context, "token", now)
+
+    def on_phase(self, context, name, start_ns, duration_ns):
+        with self._lock:
+            self.phases.setdefault(name, []).append(duration_ns)
+            if self.trace:
+                self._trace_event(context, name, start_ns, duration_ns)
+
+    def on_complete(self, context, result):
+        end_ns = time.perf_counter_ns()
+        with self._lock:
+            self.requests += 1
+            start_ns = self._starts.pop((context["request_id"], context["attempt"]), None)
+            if start_ns is None:
+                return
+            # Keys of earlier attempts of this request
+            for key in [key for key in self._starts if key[0] == context["request_id"]]:
+                start_ns = min(start_ns, self._starts.pop(key))
+            self.phases.setdefault("total", []).append(end_ns - start_ns)
+            if self.trace:
+                self._trace_event(context, f"{context['endpoint']} {context['model']}", start_ns, end_ns - start_ns,
+                                  {"success": result.get("success"), "attempts": len(result.get("attempts", []))})
+
+    def summary(self):
+        """
+        Returns one dict per phase with Phase, Count, Total (ms), Mean (µs),
+        p50 (µs), p95 (µs) and Share (%) of the summed request wall time.
+        """
+        with self._lock:
+            phases = {name: np.asarray(values, dtype=np.int64) for name, values in self.phases.items()}
+        total_ns = phases["total"].sum() if "total" in phases else 0
+        rows = []
+        for name, values in phases.items():
+            p50, p95 = np.percentile(values, [50, 95]) / 1000
+            rows.append({
+                "Phase": name,
+                "Count": len(values),
+                "Total (ms)": values.sum() / 1e6,
+                "Mean (µs)": values.mean() / 1000,
+                "p50 (µs)": float(p50),
+                "p95 (µs)": float(p95),
+                "Share (%)": 100 * values.sum() / total_ns if total_ns else 0.0
+            })
+        return sorted(rows, key=lambda row: (row["Phase"] == "total", -row["Total (ms)"]))
+
+    def harness_overhead(self):
+        """Returns the mean harness time per request in seconds (all phases except the request itself)."""
+        with self._lock:
+            requests = self.requests
+            own_ns = sum(sum(values) for name, values in self.phases.items() if name not in ("total", "request"))
+        return own_ns / requests / 1e9 if requests else 0.0
+
+    def print_summary(self):
+        print(f"\n⏱️ Harness profile over {self.requests} requests ({self.tokens} streamed chunks):")
+        print(f"{'Phase':<10} {'Count':>7} {'Total (ms)':>11} {'Mean (µs)':>10} {'p50 (µs)':>10} {'p95 (µs)':>10} {'Share (%)':>10}")
+        for row in self.summary():
+            print(f"{row['Phase']:<10} {row['Count']:>7} {row['Total (ms)']:>11.2f} {row['Mean (µs)']:>10.1f} "
+                  f"{row['p50 (µs)']:>10.1f} {row['p95 (µs)']:>10.1f} {row['Share (%)']:>10.2f}")
+        print(f"Harness overhead: {self.harness_overhead() * 1e6:.0f} µs per request")
+
+    def export_chrome_trace(self, path):
+        """Writes the collected events as Chrome trace JSON (chrome://tracing, Perfetto)."""
+        if not self.trace:
+            print("⚠️ The profiler was created without trace=True, no events to export.")
+            return
+        with self._lock:
+            events = list(self.events)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        print(f"💾 Chrome trace with {len(events)} events written to '{path}'.")
+
+@contextmanager
+def profile(trace_path=None):
+    """
+    Profiles all requests inside the with block and prints the summary.
+
+    With trace_path the events are also written as Chrome trace JSON.
+    """
+    profiler = add_hook(Profiler(trace=trace_path is not None))
+    try:
+        yield profiler
+    finally:
+        remove_hook(profiler)
+        profiler.print_summary()
+        if trace_path:
+            profiler.export_chrome_trace(trace_path)
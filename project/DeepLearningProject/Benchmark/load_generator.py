@@ -0,0 +1,190 @@
+"""
+load_generator.py - Open-loop load tests for Ollama models
+
+This module sends requests at a target arrival rate instead of waiting for each
+response before sending the next one. The rate is ramped in steps to measure
+latency under load and to find the saturation point (knee) of each model.
+"""
+
+import time
+import random
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from benchmark_core import benchmark_model
+from retry_policy import RetryPolicy
+from ollama_client import ensure_pool_size
+
+def _arrival_offsets(rate, duration, arrival, rng):
+    """Returns the send times (seconds after step start) for one load step."""
+    if arrival == "constant":
+        return list(np.arange(0, duration, 1.0 / rate))
+    if arrival == "poisson":
+        offsets = []
+        offset = rng.expovariate(rate)
+        while offset < duration:
+            offsets.append(offset)
+            offset += rng.expovariate(rate)
+        return offsets
+    raise ValueError(f"Unknown arrival process '{arrival}', use 'constant' or 'poisson'")
+
+def _percentile(values, q):
+    """Percentile that returns 0 for empty inputs."""
+    return float(np.percentile(values, q)) if len(values) > 0 else 0
+
+def run_load_step(api_url, model, tasks, rate, duration, arrival="poisson", temperature=0.7,
+                  request_timeout=120, max_workers=128, stream=False, seed=None):
+    """
+    Runs one load step: sends requests at the given rate (req/s) for duration seconds.
+
+    The tasks are used round robin. Requests are dispatched by a thread pool, so
+    new requests are sent on schedule even while earlier ones are still running.
+    Queue delay is the time a request waited in the harness before it was sent
+    (only non-zero once max_workers is exhausted), server wait is the part of
+    the server-side duration not spent loading, prefilling or decoding.
+
+    Returns a dict with throughput and latency statistics for this step.
+    """
+    rng = random.Random(seed)
+    offsets = _arrival_offsets(rate, duration, arrival, rng)
+    ensure_pool_size(max_workers)
+    # No retries: a retry would send load the arrival process did not offer
+    retry_policy = RetryPolicy(attempts=1, timeout=request_timeout)
+
+    def send(task, scheduled_time):
+        dispatch_time = time.perf_counter()
+        res = benchmark_model(
+            api_url,
+            model,
+            task['prompt'],
+            max_tokens=task.get('max_tokens', 100),
+            temperature=temperature,
+            request_timeout=request_timeout,
+            retry_timeout=request_timeout,
+            stream=stream,
+            retry_policy=retry_policy
+        )
+        res['queue_delay'] = dispatch_time - scheduled_time
+        res['end_time'] = time.perf_counter()
+        return res
+
+    futures = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        step_start = time.perf_counter()
+        for i, offset in enumerate(offsets):
+            scheduled_time = step_start + offset
+            delay = scheduled_time - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            futures.append(executor.submit(send, tasks[i % len(tasks)], scheduled_time))
+    records = [future.result() for future in futures]
+
+    successes = [r for r in records if r['success']]
+    latencies = np.array([r['generation_time'] for r in successes])
+    queue_delays = np.array([r['queue_delay'] for r in records])
+    server_waits = np.array([
+        max(r['total_duration'] - r['load_duration'] - r.get('prompt_eval_duration', 0) - r.get('eval_duration', 0), 0)
+        for r in successes
+    ])
+    tokens = sum(r.get('eval_count', 0) for r in successes)
+    elapsed = max((r['end_time'] for r in records), default=step_start) - step_start
+
+    step = {
+        "Model": model,
+        "Arrival": arrival,
+        "Offered Rate (req/s)": rate,
+        "Duration (s)": duration,
+        "Requests": len(records),
+        "Completed": len(successes),
+        "Errors": len(records) - len(successes),
+        "Timeouts": sum(1 for r in records if r.get('failure') == 'timeout'),
+        "Achieved Throughput (req/s)": len(successes) / elapsed if elapsed > 0 else 0,
+        "Token Throughput (tokens/s)": tokens / elapsed if elapsed > 0 else 0,
+        "Queue Delay Mean (s)": float(queue_delays.mean()) if len(queue_delays) > 0 else 0,
+        "Queue Delay p95 (s)": _percentile(queue_delays, 95),
+        "Server Wait Mean (s)": float(server_waits.mean()) if len(server_waits) > 0 else 0,
+        "Latency p50 (s)": _percentile(latencies, 50),
+        "Latency p95 (s)": _percentile(latencies, 95),
+        "Latency p99 (s)": _percentile(latencies, 99)
+    }
+    if stream:
+        ttfts = [r['time_to_first_token'] for r in successes]
+        step["TTFT p50 (s)"] = _percentile(ttfts, 50)
+        step["TTFT p95 (s)"] = _percentile(ttfts, 95)
+    return step
+
+def find_saturation_knee(steps, throughput_ratio=0.9, latency_factor=2.0):
+    """
+    Marks saturated steps and returns the knee rate per model.
+
+    A step is saturated if the achieved throughput falls below throughput_ratio
+    times the offered rate, or if its p95 latency exceeds latency_factor times
+    the p95 latency of the model's first (lowest) step. The knee is the highest
+    offered rate before the first saturated step (None if even the first step
+    is saturated).
+    """
+    knees = {}
+    baselines = {}
+    saturated_models = set()
+    for step in steps:
+        model = step['Model']
+        baseline = baselines.setdefault(model, step['Latency p95 (s)'])
+        step['Saturated'] = (
+            step['Completed'] == 0
+            or step['Achieved Throughput (req/s)'] < throughput_ratio * step['Offered Rate (req/s)']
+            or step['Latency p95 (s)'] > latency_factor * baseline
+        )
+        knees.setdefault(model, None)
+        if step['Saturated']:
+            saturated_models.add(model)
+        elif model not in saturated_models:
+            knees[model] = step['Offered Rate (req/s)']
+    return knees
+
+def run_load_test(api_url, models, tasks, rates, step_duration=30, arrival="poisson", temperature=0.7,
+                  request_timeout=120, max_workers=128, stream=False, stop_at_saturation=True,
+                  throughput_ratio=0.9, latency_factor=2.0, seed=None):
+    """
+    Ramps the arrival rate through rates (req/s) for every model and reports each step.
+
+    Args:
+        api_url: The URL of the Ollama API
+        models: List of models to test
+        tasks: List of benchmark tasks (name, prompt, max_tokens), used round robin
+        rates: Arrival rates in requests per second, e.g. [0.5, 1, 2, 4]
+        step_duration: Duration of each step in seconds
+        arrival: 'constant' for fixed gaps or 'poisson' for exponential gaps
+        stream: Stream the generations to also report time to first token
+        stop_at_saturation: Skip the remaining rates of a model once a step is saturated
+
+    Returns:
+        Tuple of (list of step dicts, dict model -> knee rate)
+    """
+    steps = []
+    for model in models:
+        print(f"\n📈 Load test for {model}")
+        for rate in sorted(rates):
+            print(f"  ⏱️ {rate} req/s ({arrival}) for {step_duration}s...")
+            step = run_load_step(
+                api_url, model, tasks, rate, step_duration,
+                arrival=arrival,
+                temperature=temperature,
+                request_timeout=request_timeout,
+                max_workers=max_workers,
+                stream=stream,
+                seed=seed
+            )
+            steps.append(step)
+            find_saturation_knee(steps, throughput_ratio, latency_factor)
+            print(f"    ✓ {step['Achieved Throughput (req/s)']:.2f} req/s, p95 {step['Latency p95 (s)']:.2f}s, "
+                  f"queue {step['Queue Delay Mean (s)']:.2f}s, {step['Errors']} errors")
+            if step['Saturated'] and stop_at_saturation:
+                print("    ⚠️ Saturated, stopping ramp for this model.")
+                break
+
+    knees = find_saturation_knee(steps, throughput_ratio, latency_factor)
+    for model, knee in knees.items():
+        if knee is None:
+            print(f"📉 {model}: saturated at the lowest rate")
+        else:
+            print(f"📉 {model}: saturation knee at ~{knee} req/s")
+    return steps, knees
@@ -0,0 +1,440 @@
+"""
+mock_ollama_server.py - Local stand-in for the Ollama API
+
+This module implements the parts of the Ollama API used by the benchmark
+(/api/tags, /api/generate, /api/chat, /api/embed, /api/pull, /api/ps) with a configurable latency
+model: time to first token, per-token delay, jitter, a limited number of
+concurrency slots and injected failures. It allows benchmarking the overhead of
+the harness itself and testing the concurrency, retry and streaming code paths
+without a live Ollama daemon.
+
+Usage:
+    python mock_ollama_server.py --port 11435 --ttft 0.05 --token-delay 0.01 --slots 4
+"""
+
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from datetime import datetime, timedelta, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+DEFAULT_MODELS = ["llama3.2:latest", "phi3:3.8b", "deepseek-r1:1.5b", "nomic-embed-text:latest"]
+# Length of the vectors returned by /api/embed
+EMBEDDING_DIMENSIONS = 768
+
+def _model_info(name):
+    """Builds a /api/tags entry with deterministic metadata for a model name."""
+    digest = hashlib.sha256(name.encode('utf-8')).hexdigest()
+    size_tag = name.split(':')[-1] if ':' in name else "latest"
+    parameter_size = size_tag.upper() if size_tag[:1].isdigit() else "3.2B"
+    parameters = float(parameter_size.rstrip('B')) if parameter_size.rstrip('B').replace('.', '', 1).isdigit() else 3.2
+    return {
+        "name": name,
+        "model": name,
+        "modified_at": "2025-01-01T00:00:00Z",
+        "size": int(parameters * 0.6 * 1_000_000_000),
+        "digest": digest,
+        "details": {
+            "format": "gguf",
+            "family": name.split(':')[0].split('-')[0].rstrip('0123456789.'),
+            "parameter_size": parameter_size,
+            "quantization_level": "Q4_K_M"
+        }
+    }
+
+class MockOllamaServer:
+    """
+    Mock Ollama server running in a background thread.
+
+    Latency model of a generation: wait for a free slot, load_time if the model
+    is not loaded, prompt_token_delay per prompt token, ttft until the first
+    token and token_delay for every further token. jitter is the relative
+    standard deviation applied to every delay. failure_rate injects HTTP errors
+    with failure_status (default 500), stall_rate delays the response by
+    stall_time (e.g. to trigger client timeouts), before the response starts
+    or, with stall_point='stream', after the first streamed chunk.
+    /api/chat evaluates the whole message history as prompt; an /api/embed
+    batch costs ttft once plus prompt_token_delay per input token.
+    request_count counts all requests, path_counts the requests per path
+    (e.g. "/api/generate").
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, models=None, ttft=0.05, token_delay=0.01,
+                 prompt_token_delay=0.0001, load_time=0.5, jitter=0.0, slots=1, failure_rate=0.0,
+                 stall_rate=0.0, stall_time=30.0, default_num_predict=128, seed=None, failure_status=500,
+                 stall_point='before'):
+        self.host = host
+        self.port = port
+        self.models = {name: _model_info(name) for name in (models or DEFAULT_MODELS)}
+        self.ttft = ttft
+        self.token_delay = token_delay
+        self.prompt_token_delay = prompt_token_delay
+        self.load_time = load_time
+        self.jitter = jitter
+        self.slots = slots
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self.stall_rate = stall_rate
+        self.stall_time = stall_time
+        self.stall_point = stall_point
+        self.default_num_predict = default_num_predict
+        self.request_count = 0
+        self.path_counts = {}
+        self.loaded = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(slots)
+        self._httpd = None
+        self._thread = None
+
+    @property
+    def api_url(self):
+        """Base URL of the API, in the same form as OLLAMA_API_URL."""
+        return f"http://{self.host}:{self.port}/api"
+
+    def start(self):
+        """Starts the server in a daemon thread and returns self."""
+        handler = type("MockOllamaHandler", (_MockOllamaHandler,), {"mock": self})
+        self._httpd = ThreadingHTTPServer((self.host, self.port), handler)
+        self._httpd.daemon_threads = True
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stops the server."""
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def delay(self, seconds):
+        """Applies the configured jitter to a delay."""
+        if self.jitter <= 0 or seconds <= 0:
+            return seconds
+        with self._lock:
+            return max(0.0, self._random.gauss(seconds, seconds * self.jitter))
+
+    def roll(self, rate):
+        """Returns True with the given probability."""
+        if rate <= 0:
+            return False
+        with self._lock:
+            return self._random.random() < rate
+
+    def ensure_loaded(self, model):
+        """Marks a model as loaded and returns the load time that applies to this request."""
+        with self._lock:
+            was_loaded = model in self.loaded
+            self.loaded[model] = datetime.now(timezone.utc) + timedelta(minutes=5)
+        return 0.0 if was_loaded else self.delay(self.load_time)
+
+    def unload(self, model):
+        """Marks a model as not loaded."""
+        with self._lock:
+            self.loaded.pop(model, None)
+
+class _MockOllamaHandler(BaseHTTPRequestHandler):
+    """Request handler, the server state is available as self.mock."""
+
+    protocol_version = "HTTP/1.1"
+    # Send every streamed chunk at once; with Nagle's algorithm and the client's delayed ACK,
+    # chunks on a reused keep-alive connection would be held back and arrive in bursts
+    disable_nagle_algorithm = True
+    mock = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, data, status=200):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _start_stream(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def _send_chunk(self, data):
+        line = (json.dumps(data) + "\n").encode('utf-8')
+        self.wfile.write(f"{len(line):x}\r\n".encode('ascii') + line + b"\r\n")
+        self.wfile.flush()
+
+    def _end_stream(self):
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _count(self):
+        with self.mock._lock:
+            self.mock.request_count += 1
+            self.mock.path_counts[self.path] = self.mock.path_counts.get(self.path, 0) + 1
+
+    def do_GET(self):
+        self._count()
+        if self.path == "/api/tags":
+            self._send_json({"models": list(self.mock.models.values())})
+        elif self.path == "/api/ps":
+            self._send_json({"models": self._running_models()})
+        elif self.path == "/api/version":
+            self._send_json({"version": "0.0.0-mock"})
+        else:
+            self._send_json({"error": f"unknown endpoint {self.path}"}, status=404)
+
+    def do_POST(self):
+        self._count()
+        try:
+            body = self._read_body()
+        except json.JSONDecodeError:
+            self._send_json({"error": "invalid JSON"}, status=400)
+            return
+
+        try:
+            if self.path == "/api/generate":
+                self._generate(body)
+            elif self.path == "/api/chat":
+                self._chat(body)
+            elif self.path == "/api/embed":
+                self._embed(body)
+            elif self.path == "/api/pull":
+                self._pull(body)
+            else:
+                self._send_json({"error": f"unknown endpoint {self.path}"}, status=404)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up on the request (e.g. timeout), like a cancelled request in Ollama
+            self.close_connection = True
+
+    def _running_models(self):
+        models = []
+        with self.mock._lock:
+            loaded = dict(self.mock.loaded)
+        for name, expires_at in loaded.items():
+            info = self.mock.models.get(name, _model_info(name))
+            models.append({
+                "name": name,
+                "model": name,
+                "size": info["size"],
+                "size_vram": info["size"],
+                "digest": info["digest"],
+                "details": info["details"],
+                "expires_at": expires_at.isoformat()
+            })
+        return models
+
+    def _model_name(self, body):
+        name = body.get("model") or body.get("name", "")
+        if name not in self.mock.models and f"{name}:latest" in self.mock.models:
+            name = f"{name}:latest"
+        return name
+
+    def _generate(self, body):
+        model = self._model_name(body)
+        if model not in self.mock.models:
+            self._send_json({"error": f"model '{body.get('model')}' not found"}, status=404)
+            return
+
+        # An empty prompt with keep_alive 0 unloads the model, like Ollama
+        if not body.get("prompt") and body.get("keep_alive") in (0, "0", "0s"):
+            self.mock.unload(model)
+            self._send_json({"model": model, "response": "", "done": True, "done_reason": "unload"})
+            return
+
+        prompt_tokens = max(1, len(body.get("prompt", "")) // 4)
+        self._complete(body, model, prompt_tokens, lambda text: {"response": text})
+
+    def _chat(self, body):
+        model = self._model_name(body)
+        if model not in self.mock.models:
+            self._send_json({"error": f"model '{body.get('model')}' not found"}, status=404)
+            return
+
+        messages = body.get("messages") or []
+        if not messages and body.get("keep_alive") in (0, "0", "0s"):
+            self.mock.unload(model)
+            self._send_json({"model": model, "message": {"role": "assistant", "content": ""}, "done": True,
+                             "done_reason": "unload"})
+            return
+
+        # The whole history is evaluated again on every turn
+        prompt_tokens = max(1, sum(len(message.get("content", "")) for message in messages) // 4)
+        self._complete(body, model, prompt_tokens, lambda text: {"message": {"role": "assistant", "content": text}})
+
+    def _complete(self, body, model, prompt_tokens, content):
+        """Simulates a generation; content(text) builds the response field of a chunk (/generate or /chat format)."""
+        mock = self.mock
+        if mock.roll(mock.failure_rate):
+            self._send_json({"error": "injected failure"}, status=mock.failure_status)
+            return
+
+        start = time.perf_counter()
+        with mock._slots:
+            stall = mock.roll(mock.stall_rate)
+            if stall and not (mock.stall_point == 'stream' and body.get("stream", True)):
+                time.sleep(mock.stall_time)
+                stall = False
+            load_duration = mock.ensure_loaded(model)
+            time.sleep(load_duration)
+
+            options = body.get("options") or {}
+            num_predict = options.get("num_predict", mock.default_num_predict)
+            if num_predict is None or num_predict < 0:
+                num_predict = mock.default_num_predict
+
+            prefill_start = time.perf_counter()
+            time.sleep(mock.delay(prompt_tokens * mock.prompt_token_delay + mock.ttft))
+            prompt_eval_duration = time.perf_counter() - prefill_start
+
+            stream = body.get("stream", True)
+            tokens = [f"token{i} " for i in range(num_predict)]
+            if stream:
+                self._start_stream()
+            eval_start = time.perf_counter()
+            for i, token in enumerate(tokens):
+                if i > 0:
+                    time.sleep(mock.delay(mock.token_delay))
+                if stream:
+                    self._send_chunk({"model": model, **content(token), "done": False})
+                    if stall:
+                        time.sleep(mock.stall_time)
+                        stall = False
+            eval_duration = time.perf_counter() - eval_start
+
+        if body.get("keep_alive") in (0, "0", "0s"):
+            mock.unload(model)
+
+        final = {
+            "model": model,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            **content("" if stream else "".join(tokens)),
+            "done": True,
+            "done_reason": "length",
+            "total_duration": int((time.perf_counter() - start) * 1e9),
+            "load_duration": int(load_duration * 1e9),
+            "prompt_eval_count": prompt_tokens,
+            "prompt_eval_duration": int(prompt_eval_duration * 1e9),
+            "eval_count": len(tokens),
+            "eval_duration": int(eval_duration * 1e9)
+        }
+        if stream:
+            self._send_chunk(final)
+            self._end_stream()
+        else:
+            self._send_json(final)
+
+    def _embed(self, body):
+        mock = self.mock
+        model = self._model_name(body)
+        if model not in mock.models:
+            self._send_json({"error": f"model '{body.get('model')}' not found"}, status=404)
+            return
+        inputs = body.get("input", [])
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        if mock.roll(mock.failure_rate):
+            self._send_json({"error": "injected failure"}, status=500)
+            return
+
+        # One fixed cost per batch plus prompt_token_delay per input token
+        start = time.perf_counter()
+        prompt_tokens = sum(max(1, len(text) // 4) for text in inputs)
+        with mock._slots:
+            load_duration = mock.ensure_loaded(model)
+            time.sleep(load_duration)
+            time.sleep(mock.delay(prompt_tokens * mock.prompt_token_delay + mock.ttft))
+        embeddings = []
+        for text in inputs:
+            rng = random.Random(hashlib.sha256(text.encode('utf-8')).digest())
+            embeddings.append([round(rng.uniform(-1, 1), 6) for _ in range(EMBEDDING_DIMENSIONS)])
+        self._send_json({
+            "model": model,
+            "embeddings": embeddings,
+            "total_duration": int((time.perf_counter() - start) * 1e9),
+            "load_duration": int(load_duration * 1e9),
+            "prompt_eval_count": prompt_tokens
+        })
+
+    def _pull(self, body):
+        mock = self.mock
+        name = body.get("model") or body.get("name", "")
+        if ':' not in name:
+            name = f"{name}:latest"
+        if mock.roll(mock.failure_rate):
+            self._send_json({"error": "injected failure"}, status=500)
+            return
+
+        info = _model_info(name)
+        layers = [(hashlib.sha256(f"{name}-{i}".encode('utf-8')).hexdigest(), size)
+                  for i, size in enumerate([info["size"], 12_000, 500])]
+        stream = body.get("stream", True)
+        if stream:
+            self._start_stream()
+            self._send_chunk({"status": "pulling manifest"})
+            for digest, size in layers:
+                for completed in (0, size // 2, size):
+                    time.sleep(mock.delay(mock.token_delay))
+                    self._send_chunk({"status": f"pulling {digest[:12]}", "digest": f"sha256:{digest}",
+                                      "total": size, "completed": completed})
+            for status in ("verifying sha256 digest", "writing manifest", "success"):
+                self._send_chunk({"status": status})
+        with mock._lock:
+            mock.models[name] = info
+        if stream:
+            self._end_stream()
+        else:
+            self._send_json({"status": "success"})
+
+def main():
+    """Runs the mock server in the foreground."""
+    parser = argparse.ArgumentParser(description="Mock Ollama server for offline benchmarking")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--models", nargs="*", default=DEFAULT_MODELS)
+    parser.add_argument("--ttft", type=float, default=0.05, help="Seconds until the first token")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="Seconds per further token")
+    parser.add_argument("--prompt-token-delay", type=float, default=0.0001, help="Seconds per prompt token")
+    parser.add_argument("--load-time", type=float, default=0.5, help="Seconds to load a model that is not loaded")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Relative standard deviation of all delays")
+    parser.add_argument("--slots", type=int, default=1, help="Requests processed in parallel (like OLLAMA_NUM_PARALLEL)")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Probability of an injected HTTP error")
+    parser.add_argument("--failure-status", type=int, default=500, help="Status code of injected errors, e.g. 503")
+    parser.add_argument("--stall-rate", type=float, default=0.0, help="Probability of a stalled request")
+    parser.add_argument("--stall-time", type=float, default=30.0, help="Seconds a stalled request waits")
+    parser.add_argument("--stall-point", choices=["before", "stream"], default="before",
+                        help="Stall before the response or after the first streamed chunk")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    server = MockOllamaServer(
+        host=args.host, port=args.port, models=args.models, ttft=args.ttft, token_delay=args.token_delay,
+        prompt_token_delay=args.prompt_token_delay, load_time=args.load_time, jitter=args.jitter,
+        slots=args.slots, failure_rate=args.failure_rate, stall_rate=args.stall_rate,
+        stall_time=args.stall_time, seed=args.seed, failure_status=args.failure_status,
+        stall_point=args.stall_point
+    ).start()
+    print(f"🧪 Mock Ollama server running at {server.api_url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
+
+if __name__ == "__main__":
+    main()
@@ -6,18 +6,12 @@ via the Ollama API, including server management, model checking and loading,
 benchmark execution and result visualization.
 """
 
-import requests
-import json
-import time
-import pandas as pd
-import matplotlib.pyplot as plt
-from IPython.display import display
-import numpy as np
-import subprocess
-import platform
-import os
-import sys
-from benchmark_core import run_benchmark, benchmark_model
+from benchmark_core import run_benchmark
+from visualization import visualize_results as plot_results, visualize_quality
+from result_store import open_store, export_csv
+from response_cache import ResponseCache
+from quality_scoring import QualityScorer
+from blob_store import BlobStore
 
 # Global variables for benchmark status
 _benchmark_running = False
@@ -26,117 +20,10 @@ _checked_models = set()
 # Unique ID for the current benchmark execution
 _execution_id = None
 
-def check_ollama_server(api_url):
-    """Checks if the Ollama server is running and reachable."""
-    try:
-        response = requests.get(f"{api_url}/tags")
-        return response.status_code == 200
-    except requests.exceptions.ConnectionError:
-        return False
-
-def start_ollama_server(api_url):
-    """Starts the Ollama server if it's not already running."""
-    print("🚀 Trying to start the Ollama server...")
-    
-    # Check if we're on Windows or Linux/Mac
-    if platform.system() == "Windows":
-        try:
-            # The Ollama server is started in the background
-            process = subprocess.Popen(
-                ["ollama", "serve"],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                creationflags=subprocess.CREATE_NEW_CONSOLE  # Open new console window
-            )
-            
-            # Wait until the server is started
-            print("⏳ Waiting for the Ollama server to start...")
-            time.sleep(5)  # Wait 5 seconds
-            
-            # Check if the server is running
-            if check_ollama_server(api_url):
-                print("✅ Ollama server was started successfully.")
-                return True
-            else:
-                print("⚠️ Ollama server could not be started. Try manually.")
-                return False
-                
-        except Exception as e:
-            print(f"❌ Error starting the Ollama server: {str(e)}")
-            print("ℹ️ Please start the Ollama server manually with the command 'ollama serve'")
-            return False
-    else:  # Mac or Linux
-        try:
-            process = subprocess.Popen(
-                ["ollama", "serve"],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                start_new_session=True  # Equivalent to nohup under Unix
-            )
-            
-            # Wait until the server is started
-            print("⏳ Waiting for the Ollama server to start...")
-            time.sleep(5)  # Wait 5 seconds
-            
-            # Check if the server is running
-            if check_ollama_server(api_url):
-                print("✅ Ollama server was started successfully.")
-                return True
-            else:
-                print("⚠️ Ollama server could not be started. Try manually.")
-                return False
-                
-        except Exception as e:
-            print(f"❌ Error starting the Ollama server: {str(e)}")
-            print("ℹ️ Please start the Ollama server manually with the command 'ollama serve'")
-            return False
-
-def check_model_exists(api_url, model_name):
-    """Checks if a specific model exists in Ollama."""
-    try:
-        response = requests.get(f"{api_url}/tags")
-        models = response.json().get('models', [])
-        exists = any(model['name'] == model_name for model in models)
-        return exists
-    except Exception as e:
-        print(f"⚠️ Error checking model {model_name}: {str(e)}")
-        return False
-
-def load_model(api_url, model_name):
-    """Loads a model from Ollama if it's not already present."""
-    print(f"Loading model {model_name}...")
-    try:
-        response = requests.post(
-            f"{api_url}/pull",
-            json={"name": model_name},
-            stream=True
-        )
-        
-        last_status = ""
-        for line in response.iter_lines():
-            if line:
-                data = json.loads(line.decode('utf-8'))
-                status = data.get('status', '')
-                
-                # Only show new status updates
-                if status != last_status and status:
-                    # Show progress without newline
-                    print(f"Status: {status}", end='\r')
-                    last_status = status
-                
-                if 'completed' in status.lower():
-                    print(f"\n✅ {model_name} was loaded successfully")
-                    return True
-                elif 'error' in data:
-                    print(f"\n❌ Error loading {model_name}: {data['error']}")
-                    return False
-        
-        return True
-    except Exception as e:
-        print(f"\n❌ Exception loading {model_name}: {str(e)}")
-        return False
-
-def run_benchmark_test(api_url, models, tasks, temperature=0.7):
+def run_benchmark_test(api_url, models, tasks, temperature=0.7, max_concurrency=1, max_concurrency_per_model=None, stream=False,
+                       warmup=0, repetitions=1, store_path='model_benchmark_results.jsonl', run_id=None, resume=False,
+                       cache_dir=None, schedule='interleaved', resource_interval=0.5, csv_path='model_benchmark_results.csv',
+                       visualize=True, retry_policy=None, score=False, blob_dir=None):
     """
     Runs the complete benchmark and visualizes the results.
     
@@ -145,146 +32,120 @@ def run_benchmark_test(api_url, models, tasks, temperature=0.7):
         models: List of models to test
         tasks: List of benchmark tasks
         temperature: Sampling temperature for the models
-        
+        max_concurrency: Maximum number of requests in flight at once (1 = sequential)
+        max_concurrency_per_model: Maximum number of requests in flight per model
+        stream: Stream the generations and record time to first token and inter-token latency
+        warmup: Number of discarded warmup runs per task/model pair
+        repetitions: Number of measured runs per task/model pair
+        store_path: JSON Lines file every result row is appended to as soon as it is measured (None = off)
+        run_id: ID of the run in the store (default: new ID, or the last run when resuming)
+        resume: Continue the run in the store and skip task/model pairs that are already completed
+        cache_dir: Directory of the response cache, reuses responses for unchanged model, prompt and options (None = off)
+        schedule: 'interleaved' (all models per task) or 'grouped' (all tasks per model, avoids model swaps)
+        resource_interval: Seconds between CPU/memory samples from /proc during the run (None = off)
+        csv_path: CSV file the results of this run are written to (None = off)
+        visualize: Show charts and tables (needs pandas, matplotlib and IPython)
+        retry_policy: retry_policy.RetryPolicy for attempts, backoff and timeouts (None = retry a timeout once)
+        score: Score the responses while the benchmark runs (Accuracy, test pass rate, length/format columns)
+        blob_dir: Directory of a blob store that keeps prompts and responses out of the rows (None = rows hold the texts)
+
+    Can be called repeatedly in the same process; every call is a new run in the store.
+
     Returns:
-        DataFrame with benchmark results or None on errors    """
-    global _run_once
-    
-    try:
-        if _run_once:
-            print("⚠️ This benchmark has already been executed. If you want to run it again, please restart the kernel (Kernel → Restart).")
-            return None
-    except NameError:
-        # The variable doesn't exist, so this is the first execution
-        _run_once = True
-    
+        List of result rows or None on errors
+    """
     # Format model names for output
     model_names = ", ".join(models)
     print(f"🚀 Starting benchmark test for {model_names}...\n")
     
+    # Open the incremental result store
+    store = open_store(store_path, run_id=run_id, resume=resume) if store_path else None
+    if store is not None:
+        print(f"💾 Results are appended to '{store_path}' (run {store.run_id}).\n")
+    
+    blob_store = BlobStore(blob_dir) if blob_dir else None
+    scorer = QualityScorer() if score else None
+    
     # Run benchmark
-    benchmark_results = run_benchmark(
-        api_url=api_url,
-        models=models,
-        tasks=tasks,
-        temperature=temperature
-    )
+    try:
+        benchmark_results = run_benchmark(
+            api_url=api_url,
+            models=models,
+            tasks=tasks,
+            temperature=temperature,
+            max_concurrency=max_concurrency,
+            max_concurrency_per_model=max_concurrency_per_model,
+            stream=stream,
+            warmup=warmup,
+            repetitions=repetitions,
+            store=store,
+            resume=resume,
+            cache=ResponseCache(cache_dir) if cache_dir else None,
+            schedule=schedule,
+            resource_interval=resource_interval,
+            retry_policy=retry_policy,
+            scorer=scorer,
+            blob_store=blob_store
+        )
+    finally:
+        if scorer is not None:
+            scorer.close()
     
     if benchmark_results:
         # Visualize results
-        visualize_results(benchmark_results, models, tasks)
+        if visualize:
+            visualize_results(benchmark_results, models, tasks, blob_store=blob_store)
+            if score:
+                visualize_quality(benchmark_results)
         
         # Save results as CSV
-        df = pd.DataFrame(benchmark_results)
-        df.to_csv('model_benchmark_results.csv', index=False)
-        print("\n💾 Results have been saved to 'model_benchmark_results.csv'.")
+        if csv_path:
+            export_csv(benchmark_results, csv_path)
+            print(f"\n💾 Results have been saved to '{csv_path}'.")
         
         return benchmark_results
     else:
         print("\n❌ No results available for visualization or saving.")
         return None
 
-def visualize_results(results, models, tasks):
-    """Visualizes the benchmark results with charts and tables."""
+def visualize_results(results, models, tasks, output_dir=None, show=True, blob_store=None):
+    """
+    Visualizes the benchmark results with charts and tables and prints the responses.
+    
+    Charts and summary tables come from visualization.visualize_results, this
+    function adds the qualitative comparison of the responses (first
+    result of every task/model pair). Compacted rows need the blob_store
+    their responses were moved to.
+    """
     if not results:
         print("No results available for visualization.")
         return
+    import pandas as pd
     
-    # Convert results to DataFrame
     df = pd.DataFrame(results)
+    plot_results(df, models, tasks, output_dir=output_dir, show=show)
     
-    # Get unique task names
-    task_names = list(set([task['name'] for task in tasks]))
-    
-    # 1. Compare generation times
-    plt.figure(figsize=(12, 6))
-    
-    x = np.arange(len(task_names))
-    width = 0.35
-    
-    for i, model in enumerate(models):
-        model_data = df[df['Model'] == model]
-        times = []
-        for task_name in task_names:
-            # Safe access to values with error handling
-            task_data = model_data[model_data['Task'] == task_name]['Generation Time (s)'].values
-            if len(task_data) > 0:
-                times.append(task_data[0])
-            else:
-                # If no data available for this task/model combination
-                times.append(0)  # Or another default value                print(f"⚠️ No data for model {model} and task '{task_name}'")
-        
-        plt.bar(x + i*width, times, width, label=model)
-    
-    plt.xlabel('Task')
-    plt.ylabel('Generation Time (s)')
-    plt.title('Comparison of Generation Times')
-    plt.xticks(x + width/2, task_names, rotation=45)
-    plt.legend()
-    plt.tight_layout()
-    plt.show()
-    
-    # 2. Compare tokens per second
-    plt.figure(figsize=(12, 6))
-    
-    for i, model in enumerate(models):
-        model_data = df[df['Model'] == model]
-        tokens_per_sec = []
-        for task_name in task_names:
-            # Safe access to values with error handling
-            task_data = model_data[model_data['Task'] == task_name]['Tokens per Second'].values
-            if len(task_data) > 0:
-                tokens_per_sec.append(task_data[0])
-            else:
-                # If no data available for this task/model combination
-                tokens_per_sec.append(0)  # Or another default value
-        
-        plt.bar(x + i*width, tokens_per_sec, width, label=model)
-    
-    plt.xlabel('Task')
-    plt.ylabel('Tokens per Second')
-    plt.title('Comparison of Tokens per Second')
-    plt.xticks(x + width/2, task_names, rotation=45)
-    plt.legend()
-    plt.tight_layout()
-    plt.show()
-    
-    # 3. Summary table
-    if len(df) > 0:  # Make sure data is available
-        summary = df.groupby('Model').agg({
-            'Generation Time (s)': 'mean',
-            'Tokens Generated': 'mean',
-            'Tokens per Second': 'mean'
-        }).reset_index()
-        
-        print("\n📊 Summary of Performance Metrics:")
-        display(summary)
-    else:
-        print("\n⚠️ No data available for summary.")
-    
-    # 4. Show qualitative evaluation
+    # Show qualitative evaluation
     print("\n📝 Qualitative Evaluation of Responses:")
-    # Get unique tasks from results
-    unique_task_names = df['Task'].unique()
-    
-    for task_name in unique_task_names:
-        matching_tasks = [task for task in tasks if task['name'] == task_name]
-        if not matching_tasks:
+    first = df.drop_duplicates(['Task', 'Model']).set_index(['Task', 'Model'])
+    if 'Response' in first:
+        responses = first['Response']
+    elif blob_store is not None and 'Response Hash' in first:
+        responses = first['Response Hash'].map(blob_store.get)
+    else:
+        print("Responses are not available (stored in a blob store that was not given).")
+        return
+    prompts = {task['name']: task['prompt'] for task in tasks}
+    for task_name in df['Task'].unique():
+        if task_name not in prompts:
             continue
-            
-        task = matching_tasks[0]
         print(f"\n🔍 Task: {task_name}")
-        print(f"Prompt: {task['prompt']}")
+        print(f"Prompt: {prompts[task_name]}")
         
         for model in models:
-            model_response = df[(df['Model'] == model) & (df['Task'] == task_name)]['Response'].values
-            if len(model_response) > 0:
+            if (task_name, model) in responses.index:
                 print(f"\n🤖 {model} Response:")
-                print(model_response[0])
-                print("-" * 80)
+                print(responses[(task_name, model)])
             else:
                 print(f"\n⚠️ No response from {model} available for this task.")
-                print("-" * 80)
-
-# Global variable to track if the benchmark has already been executed
-_run_once = False
\ No newline at end of file
+            print("-" * 80)
@@ -4,51 +4,164 @@ model_manager.py - Model management for Ollama
 This module contains functions for checking and loading models via the Ollama API.
 """
 
-import requests
 import json
 import time
+from concurrent.futures import ThreadPoolExecutor
+from ollama_client import get_session
+from model_registry import get_registry
 
 def check_model_exists(api_url, model_name):
-    """Checks if a specific model exists in Ollama."""
+    """Checks if a specific model exists in Ollama ('name' and 'name:latest' are the same model)."""
     try:
-        response = requests.get(f"{api_url}/tags")
-        models = response.json().get('models', [])
-        exists = any(model['name'] == model_name for model in models)
-        return exists
+        return get_registry(api_url).exists(model_name)
     except Exception as e:
         print(f"⚠️ Error checking model {model_name}: {str(e)}")
         return False
 
-def load_model(api_url, model_name):
-    """Loads a model from Ollama if it's not already present."""
-    print(f"Loading model {model_name}...")
+def get_model_digest(api_url, model_name):
+    """Returns the digest of a model from /tags or None if it is not available."""
+    try:
+        return get_registry(api_url).digest(model_name)
+    except Exception as e:
+        print(f"⚠️ Error reading digest of model {model_name}: {str(e)}")
+        return None
+
+def get_model_metadata(api_url, model_name):
+    """Returns the size, parameter count, quantization and family columns of a model (empty dict if unknown)."""
     try:
-        response = requests.post(
+        return get_registry(api_url).metadata(model_name)
+    except Exception as e:
+        print(f"⚠️ Error reading metadata of model {model_name}: {str(e)}")
+        return {}
+
+def pull_model(api_url, model_name, show_progress=True):
+    """
+    Pulls a model and tracks the download progress of every layer.
+    
+    The pull only counts as successful when the server reports the final
+    "success" status. Downloaded bytes are counted per layer from the first
+    reported progress, so layers that already exist locally do not inflate
+    the throughput.
+    
+    Returns:
+        Dict with model, success, error, downloaded_bytes, total_bytes, layers,
+        duration (s) and throughput (MB/s)
+    """
+    layers = {}
+    start_time = time.perf_counter()
+    stats = {"model": model_name, "success": False, "error": None}
+    last_reported = -1
+    try:
+        response = get_session().post(
             f"{api_url}/pull",
-            json={"name": model_name},
+            json={"model": model_name},
             stream=True
         )
-        
-        last_status = ""
-        for line in response.iter_lines():
-            if line:
-                data = json.loads(line.decode('utf-8'))
-                status = data.get('status', '')
+        if response.status_code != 200:
+            stats["error"] = f"Error: {response.status_code} - {response.text}"
+        else:
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                data = json.loads(line)
+                if 'error' in data:
+                    stats["error"] = data['error']
+                    break
                 
-                # Only show new status updates
-                if status != last_status and status:
-                    # Show progress without newline
-                    print(f"Status: {status}", end='\r')
-                    last_status = status
+                digest = data.get('digest')
+                if digest and data.get('total'):
+                    first_completed = layers[digest][0] if digest in layers else data.get('completed', 0)
+                    layers[digest] = (first_completed, data.get('completed', 0), data['total'])
+                    
+                    # Report progress in steps of 10%
+                    completed = sum(layer[1] for layer in layers.values())
+                    total = sum(layer[2] for layer in layers.values())
+                    percent = int(100 * completed / total) // 10 * 10
+                    if show_progress and percent > last_reported:
+                        elapsed = time.perf_counter() - start_time
+                        downloaded = sum(layer[1] - layer[0] for layer in layers.values())
+                        print(f"  ⬇️ {model_name}: {percent}% of {total / 1e9:.2f} GB "
+                              f"({downloaded / 1e6 / elapsed if elapsed > 0 else 0:.1f} MB/s)")
+                        last_reported = percent
                 
-                if 'completed' in status.lower():
-                    print(f"\n✅ {model_name} was loaded successfully")
-                    return True
-                elif 'error' in data:
-                    print(f"\n❌ Error loading {model_name}: {data['error']}")
-                    return False
-        
+                if data.get('status') == 'success':
+                    stats["success"] = True
+    except Exception as e:
+        stats["error"] = str(e)
+    
+    # The inventory changed, the next lookup fetches /tags again
+    get_registry(api_url).invalidate()
+    duration = time.perf_counter() - start_time
+    downloaded = sum(layer[1] - layer[0] for layer in layers.values())
+    stats.update({
+        "downloaded_bytes": downloaded,
+        "total_bytes": sum(layer[2] for layer in layers.values()),
+        "layers": len(layers),
+        "duration": duration,
+        "throughput": downloaded / 1e6 / duration if duration > 0 else 0
+    })
+    return stats
+
+def load_model(api_url, model_name):
+    """Loads a model from Ollama if it's not already present."""
+    print(f"Loading model {model_name}...")
+    stats = pull_model(api_url, model_name)
+    if stats["success"]:
+        print(f"✅ {model_name} was loaded successfully ({stats['downloaded_bytes'] / 1e9:.2f} GB in {stats['duration']:.1f}s)")
         return True
+    print(f"❌ Error loading {model_name}: {stats['error'] or 'pull ended without success status'}")
+    return False
+
+def ensure_models(api_url, models):
+    """Checks that every model is available and pulls the missing ones. Returns False if one could not be loaded."""
+    for model in dict.fromkeys(models):
+        if not check_model_exists(api_url, model):
+            print(f"⚠️ Model {model} not found on {api_url}. Loading...")
+            if not load_model(api_url, model):
+                print(f"❌ Model {model} could not be loaded on {api_url}.")
+                return False
+    return True
+
+def pull_models(api_url, models, max_workers=3):
+    """
+    Pulls several models concurrently with at most max_workers downloads at a time.
+    
+    Returns a list with the statistics of pull_model for every model, in the
+    order of models, and prints the aggregate download throughput.
+    """
+    models = list(dict.fromkeys(models))
+    print(f"⬇️ Pulling {len(models)} models with up to {max_workers} parallel downloads...")
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(lambda model: pull_model(api_url, model), models))
+    duration = time.perf_counter() - start_time
+    
+    for stats in results:
+        if stats["success"]:
+            print(f"✅ {stats['model']}: {stats['downloaded_bytes'] / 1e9:.2f} GB in {stats['duration']:.1f}s ({stats['throughput']:.1f} MB/s)")
+        else:
+            print(f"❌ {stats['model']}: {stats['error'] or 'pull ended without success status'}")
+    downloaded = sum(stats['downloaded_bytes'] for stats in results)
+    print(f"📦 {downloaded / 1e9:.2f} GB in {duration:.1f}s ({downloaded / 1e6 / duration if duration > 0 else 0:.1f} MB/s aggregate)")
+    return results
+
+def unload_model(api_url, model_name):
+    """Unloads a model from memory by sending a request with keep_alive 0."""
+    try:
+        response = get_session().post(
+            f"{api_url}/generate",
+            json={"model": model_name, "keep_alive": 0}
+        )
+        return response.status_code == 200
+    except Exception as e:
+        print(f"⚠️ Error unloading model {model_name}: {str(e)}")
+        return False
+
+def get_running_models(api_url):
+    """Returns the models currently loaded in memory (from /ps) with their size and VRAM usage."""
+    try:
+        response = get_session().get(f"{api_url}/ps")
+        return response.json().get('models', [])
     except Exception as e:
-        print(f"\n❌ Exception loading {model_name}: {str(e)}")
-        return False
\ No newline at end of file
+        print(f"⚠️ Error reading running models: {str(e)}")
+        return []
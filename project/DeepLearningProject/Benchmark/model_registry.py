@@ -0,0 +1,107 @@
+"""
+model_registry.py - Cached model inventory of an Ollama server
+
+This module fetches the model list from /tags once, indexes it by name and
+digest and refreshes it after a time-to-live, instead of requesting /tags again
+for every model check. It also provides the model metadata (size, parameter
+count, quantization, family) that is added to the result rows.
+"""
+
+import time
+import threading
+from ollama_client import get_session
+
+BYTES_PER_GB = 1024 ** 3
+
+def normalize_model_name(model_name):
+    """Adds the implicit ':latest' tag, e.g. 'llama3.2' -> 'llama3.2:latest'."""
+    return model_name if ':' in model_name else f"{model_name}:latest"
+
+def parse_parameter_size(parameter_size):
+    """Converts Ollama's parameter_size (e.g. '3.2B', '270M') to billions, None if unknown."""
+    if not parameter_size:
+        return None
+    value = parameter_size.strip().upper()
+    factor = {"B": 1.0, "M": 0.001, "K": 0.000001}.get(value[-1:])
+    try:
+        return float(value[:-1]) * factor if factor else float(value) / 1e9
+    except ValueError:
+        return None
+
+class ModelRegistry:
+    """Model inventory of one Ollama server, fetched once and refreshed after ttl seconds."""
+
+    def __init__(self, api_url, ttl=60):
+        self.api_url = api_url
+        self.ttl = ttl
+        self._by_name = {}
+        self._by_digest = {}
+        self._fetched_at = None
+        self._lock = threading.Lock()
+
+    def refresh(self, session=None, timeout=None):
+        """Fetches /tags and rebuilds the indexes. Raises on connection errors."""
+        session = session or get_session()
+        response = session.get(f"{self.api_url}/tags", timeout=timeout)
+        response.raise_for_status()
+        models = response.json().get('models', [])
+        with self._lock:
+            self._by_name = {normalize_model_name(model['name']): model for model in models}
+            self._by_digest = {model.get('digest'): model for model in models if model.get('digest')}
+            self._fetched_at = time.monotonic()
+        return models
+
+    def invalidate(self):
+        """Forces a refresh on the next lookup, e.g. after a model was pulled."""
+        with self._lock:
+            self._fetched_at = None
+
+    def _ensure_fresh(self):
+        if self._fetched_at is None or time.monotonic() - self._fetched_at > self.ttl:
+            self.refresh()
+
+    def get(self, model_name):
+        """Returns the /tags entry of a model or None."""
+        self._ensure_fresh()
+        return self._by_name.get(normalize_model_name(model_name))
+
+    def get_by_digest(self, digest):
+        """Returns the /tags entry with the given digest or None."""
+        self._ensure_fresh()
+        return self._by_digest.get(digest)
+
+    def exists(self, model_name):
+        return self.get(model_name) is not None
+
+    def digest(self, model_name):
+        model = self.get(model_name)
+        return model.get('digest') if model else None
+
+    def names(self):
+        self._ensure_fresh()
+        return list(self._by_name)
+
+    def metadata(self, model_name):
+        """Returns the result-row columns describing a model (empty dict if unknown)."""
+        model = self.get(model_name)
+        if model is None:
+            return {}
+        details = model.get('details') or {}
+        return {
+            "Model Size (GB)": model.get('size', 0) / BYTES_PER_GB,
+            "Parameter Size": details.get('parameter_size'),
+            "Parameters (B)": parse_parameter_size(details.get('parameter_size')),
+            "Quantization": details.get('quantization_level'),
+            "Family": details.get('family')
+        }
+
+# One registry per API URL
+_registries = {}
+_registries_lock = threading.Lock()
+
+def get_registry(api_url, ttl=60):
+    """Returns the shared registry of an API URL."""
+    with _registries_lock:
+        if api_url not in _registries:
+            _registries[api_url] = ModelRegistry(api_url, ttl=ttl)
+        return _registries[api_url]
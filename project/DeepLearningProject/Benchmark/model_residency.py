@@ -0,0 +1,96 @@
+"""
+model_residency.py - Cold-load and memory residency measurements
+
+This module measures how long it takes to load a model that is not in memory
+(cold load) compared to a request against the already loaded model, and reports
+the memory and VRAM the loaded models occupy according to /api/ps. On hosts
+that cannot keep all models in memory, this is the cost of every model swap.
+"""
+
+import time
+from benchmark_core import benchmark_model
+from model_manager import unload_model, get_running_models
+from model_registry import normalize_model_name
+
+BYTES_PER_GB = 1024 ** 3
+
+def _find_running(running_models, model_name):
+    names = {model_name, normalize_model_name(model_name)}
+    for model in running_models:
+        if model.get('name') in names or model.get('model') in names:
+            return model
+    return None
+
+def wait_until_unloaded(api_url, model_name, timeout=30, interval=0.2):
+    """Waits until a model no longer appears in /ps. Returns False on timeout."""
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if _find_running(get_running_models(api_url), model_name) is None:
+            return True
+        time.sleep(interval)
+    return False
+
+def residency_snapshot(api_url):
+    """Returns one row per loaded model with its resident size, VRAM usage and expiry from /ps."""
+    rows = []
+    for model in get_running_models(api_url):
+        size = model.get('size', 0)
+        size_vram = model.get('size_vram', 0)
+        rows.append({
+            "Model": model.get('name'),
+            "Resident Size (GB)": size / BYTES_PER_GB,
+            "VRAM (GB)": size_vram / BYTES_PER_GB,
+            "GPU Offload (%)": 100 * size_vram / size if size > 0 else 0,
+            "Expires At": model.get('expires_at')
+        })
+    return rows
+
+def measure_cold_load(api_url, models, prompt="Hello", repetitions=3, max_tokens=1, request_timeout=300,
+                      unload_timeout=30):
+    """
+    Measures cold-load and warm request times for every model.
+
+    Each repetition unloads the model (keep_alive 0), waits until it has left
+    /ps, sends a first request (cold) and directly afterwards a second one
+    (warm). The difference is the swap cost of the model.
+
+    Returns:
+        List of dicts with Model, Repetition, Cold Load Time (s) (server-side
+        load_duration), Cold Request Time (s), Warm Request Time (s),
+        Swap Overhead (s), Resident Size (GB), VRAM (GB) and GPU Offload (%)
+    """
+    rows = []
+    for model in models:
+        print(f"\n🧊 Cold load of {model}")
+        for repetition in range(repetitions):
+            unload_model(api_url, model)
+            if not wait_until_unloaded(api_url, model, timeout=unload_timeout):
+                print(f"  ⚠️ {model} is still loaded after {unload_timeout}s, skipping repetition.")
+                continue
+
+            cold = benchmark_model(api_url, model, prompt, max_tokens=max_tokens, temperature=0.0,
+                                   request_timeout=request_timeout, retry_timeout=request_timeout)
+            warm = benchmark_model(api_url, model, prompt, max_tokens=max_tokens, temperature=0.0,
+                                   request_timeout=request_timeout, retry_timeout=request_timeout)
+            if not (cold['success'] and warm['success']):
+                print(f"  ❌ Error: {cold.get('error') or warm.get('error')}")
+                continue
+
+            running = _find_running(get_running_models(api_url), model) or {}
+            size = running.get('size', 0)
+            size_vram = running.get('size_vram', 0)
+            row = {
+                "Model": model,
+                "Repetition": repetition,
+                "Cold Load Time (s)": cold['load_duration'],
+                "Cold Request Time (s)": cold['generation_time'],
+                "Warm Request Time (s)": warm['generation_time'],
+                "Swap Overhead (s)": cold['generation_time'] - warm['generation_time'],
+                "Resident Size (GB)": size / BYTES_PER_GB,
+                "VRAM (GB)": size_vram / BYTES_PER_GB,
+                "GPU Offload (%)": 100 * size_vram / size if size > 0 else 0
+            }
+            rows.append(row)
+            print(f"  ✓ #{repetition + 1}: load {row['Cold Load Time (s)']:.2f}s, cold {row['Cold Request Time (s)']:.2f}s, "
+                  f"warm {row['Warm Request Time (s)']:.2f}s, {row['Resident Size (GB)']:.1f} GB resident")
+    return rows
@@ -0,0 +1,100 @@
+"""
+ollama_client.py - Shared HTTP client for the Ollama API
+
+This module provides connection-pooled requests sessions that are shared by all
+modules talking to the Ollama API, so connections are kept alive between requests
+instead of opening a new TCP connection for every call.
+"""
+
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Default settings for the shared sessions
+DEFAULT_POOL_SIZE = 32
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF_FACTOR = 0.5
+# Status codes that indicate a busy or restarting server
+RETRY_STATUS_CODES = (429, 502, 503, 504)
+
+_session_config = {
+    "pool_size": DEFAULT_POOL_SIZE,
+    "retries": DEFAULT_RETRIES,
+    "backoff_factor": DEFAULT_BACKOFF_FACTOR
+}
+# Shared sessions, one with and one without retries
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+def create_session(pool_size=DEFAULT_POOL_SIZE, retries=DEFAULT_RETRIES, backoff_factor=DEFAULT_BACKOFF_FACTOR):
+    """
+    Creates a requests session with a connection pool and retry policy.
+
+    Connection errors and busy-server status codes are retried with exponential
+    backoff. Read errors are never retried, because that would silently re-issue
+    a generation that the server may still be computing.
+    """
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=0,
+        status=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=frozenset({"GET", "POST", "DELETE"}),
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def configure_session(pool_size=None, retries=None, backoff_factor=None):
+    """Changes the settings of the shared sessions. Existing sessions are closed and recreated on next use."""
+    with _sessions_lock:
+        if pool_size is not None:
+            _session_config["pool_size"] = pool_size
+        if retries is not None:
+            _session_config["retries"] = retries
+        if backoff_factor is not None:
+            _session_config["backoff_factor"] = backoff_factor
+
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+def ensure_pool_size(pool_size):
+    """Grows the connection pool if it is smaller than pool_size, e.g. for concurrent runs."""
+    if pool_size > _session_config["pool_size"]:
+        configure_session(pool_size=pool_size)
+
+def get_session(retry=True):
+    """
+    Returns the shared session for Ollama API calls.
+
+    With retry=False a session without retries is returned, which is meant for
+    quick reachability checks that should fail fast and for generation
+    requests, whose attempts are controlled by retry_policy.RetryPolicy.
+    """
+    session = _sessions.get(retry)
+    if session is not None:
+        return session
+
+    with _sessions_lock:
+        if retry not in _sessions:
+            _sessions[retry] = create_session(
+                pool_size=_session_config["pool_size"],
+                retries=_session_config["retries"] if retry else 0,
+                backoff_factor=_session_config["backoff_factor"]
+            )
+        return _sessions[retry]
+
+def close_sessions():
+    """Closes the shared sessions and all pooled connections."""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
@@ -1,75 +1,135 @@
 """
 ollama_server.py - Server management for Ollama
 
-This module contains functions for checking and starting the Ollama server.
+This module contains functions for checking, starting and stopping the Ollama server.
 """
 
+import atexit
 import requests
 import subprocess
 import platform
 import time
+from ollama_client import get_session
+from model_registry import get_registry
 
-def check_ollama_server(api_url):
-    """Checks if the Ollama server is running and reachable."""
+# Process of the Ollama server started by this module
+_server_process = None
+# Log file the started server writes its output to
+_server_log_file = None
+# Seconds until the started server answered its first request
+_server_startup_time = None
+
+def check_ollama_server(api_url, timeout=5):
+    """
+    Checks if the Ollama server is running and reachable.
+
+    The /tags response of the check also fills the model registry, so the
+    following model checks need no further request.
+    """
     try:
-        response = requests.get(f"{api_url}/tags")
-        return response.status_code == 200
-    except requests.exceptions.ConnectionError:
+        get_registry(api_url).refresh(session=get_session(retry=False), timeout=timeout)
+        return True
+    except (requests.exceptions.RequestException, ValueError):
         return False
 
-def start_ollama_server(api_url):
-    """Starts the Ollama server if it's not already running."""
+def wait_for_server(api_url, timeout=60, initial_delay=0.05, max_delay=2.0, process=None):
+    """
+    Polls /tags with exponential backoff until the server answers.
+
+    Returns the seconds it took until the server was reachable, or None if
+    timeout expired or the given process exited before that.
+    """
+    start_time = time.perf_counter()
+    delay = initial_delay
+    while True:
+        if check_ollama_server(api_url, timeout=max_delay):
+            return time.perf_counter() - start_time
+        if process is not None and process.poll() is not None:
+            return None
+        remaining = timeout - (time.perf_counter() - start_time)
+        if remaining <= 0:
+            return None
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, max_delay)
+
+def start_ollama_server(api_url, startup_timeout=60, log_path='ollama_server.log', stop_on_exit=False):
+    """
+    Starts the Ollama server if it's not already running.
+
+    The server output is written to log_path (None discards it), so the process
+    never blocks on a full pipe. Readiness is polled with exponential backoff up
+    to startup_timeout seconds; the time it took is available through
+    get_server_startup_time(). With stop_on_exit=True the server is stopped when
+    the Python process exits, otherwise it keeps running in the background.
+    """
+    global _server_process, _server_log_file, _server_startup_time
     print("🚀 Trying to start the Ollama server...")
-    
+
     # Check if we're on Windows or Linux/Mac
     if platform.system() == "Windows":
-        try:
-            # The Ollama server is started in the background
-            process = subprocess.Popen(
-                ["ollama", "serve"],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                creationflags=subprocess.CREATE_NEW_CONSOLE  # Open new console window
-            )
-            
-            # Wait until the server is started
-            print("⏳ Waiting for the Ollama server to start...")
-            time.sleep(5)  # Wait 5 seconds
-            
-            # Check if the server is running
-            if check_ollama_server(api_url):
-                print("✅ Ollama server was started successfully.")
-                return True
-            else:
-                print("⚠️ Ollama server could not be started. Try manually.")
-                return False
-                
-        except Exception as e:
-            print(f"❌ Error starting the Ollama server: {str(e)}")
-            print("ℹ️ Please start the Ollama server manually with the command 'ollama serve'")
-            return False
+        platform_options = {"creationflags": subprocess.CREATE_NEW_CONSOLE}  # Open new console window
     else:  # Mac or Linux
+        platform_options = {"start_new_session": True}  # Equivalent to nohup under Unix
+
+    # The log file stays open while the server runs, stop_ollama_server closes it
+    log_file = None
+    try:
+        if log_path:
+            log_file = open(log_path, 'ab')
+        process = subprocess.Popen(
+            ["ollama", "serve"],
+            stdout=log_file if log_file is not None else subprocess.DEVNULL,
+            stderr=subprocess.STDOUT,
+            **platform_options
+        )
+    except Exception as e:
+        if log_file is not None:
+            log_file.close()
+        print(f"❌ Error starting the Ollama server: {str(e)}")
+        print("ℹ️ Please start the Ollama server manually with the command 'ollama serve'")
+        return False
+
+    _server_process = process
+    _server_log_file = log_file
+    if stop_on_exit:
+        atexit.register(stop_ollama_server)
+
+    # Wait until the server is started
+    print("⏳ Waiting for the Ollama server to start...")
+    startup_time = wait_for_server(api_url, timeout=startup_timeout, process=process)
+    if startup_time is None:
+        print("⚠️ Ollama server could not be started. Try manually.")
+        if log_path:
+            print(f"ℹ️ See '{log_path}' for the server output.")
+        stop_ollama_server()
+        return False
+
+    _server_startup_time = startup_time
+    print(f"✅ Ollama server was started successfully in {startup_time:.2f}s.")
+    return True
+
+def stop_ollama_server(timeout=10):
+    """
+    Stops the Ollama server started by start_ollama_server.
+
+    The process is asked to terminate and killed if it is still running after
+    timeout seconds. Servers that were not started by this module are not touched.
+    """
+    global _server_process, _server_log_file
+    process = _server_process
+    _server_process = None
+    if process is not None and process.poll() is None:
+        process.terminate()
         try:
-            process = subprocess.Popen(
-                ["ollama", "serve"],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                start_new_session=True  # Equivalent to nohup under Unix
-            )
-            
-            # Wait until the server is started
-            print("⏳ Waiting for the Ollama server to start...")
-            time.sleep(5)  # Wait 5 seconds
-            
-            # Check if the server is running
-            if check_ollama_server(api_url):
-                print("✅ Ollama server was started successfully.")
-                return True
-            else:
-                print("⚠️ Ollama server could not be started. Try manually.")
-                return False
-                
-        except Exception as e:
-            print(f"❌ Error starting the Ollama server: {str(e)}")
-            print("ℹ️ Please start the Ollama server manually with the command 'ollama serve'")
-            return False
\ No newline at end of file
+            process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+        print("🛑 Ollama server was stopped.")
+    if _server_log_file is not None:
+        _server_log_file.close()
+        _server_log_file = None
+
+def get_server_startup_time():
+    """Returns the startup time in seconds of the server started by this module, or None."""
+    return _server_startup_time
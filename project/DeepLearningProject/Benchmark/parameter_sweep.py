@@ -0,0 +1,93 @@
+"""
+parameter_sweep.py - Parameter sweeps over Ollama generation options
+
+This module runs the benchmark for every combination of a grid of Ollama
+options (num_predict, num_ctx, num_thread, num_batch, temperature) and reports
+how throughput and latency change with each setting. This is used to tune the
+options of a deployment per model.
+"""
+
+import itertools
+from benchmark_core import run_benchmark
+from benchmark_stats import aggregate_results
+
+# Options that can be swept, in the order they appear in the results
+SWEEP_PARAMETERS = ['num_predict', 'num_ctx', 'num_thread', 'num_batch', 'temperature']
+
+def expand_grid(grid):
+    """Returns all combinations of a grid like {"num_ctx": [2048, 4096], "num_batch": [256, 512]}."""
+    unknown = [name for name in grid if name not in SWEEP_PARAMETERS]
+    if unknown:
+        raise ValueError(f"Unknown sweep parameters {unknown}, supported: {SWEEP_PARAMETERS}")
+    names = [name for name in SWEEP_PARAMETERS if name in grid]
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+def run_parameter_sweep(api_url, models, tasks, grid, warmup=1, repetitions=3, temperature=0.7,
+                        request_timeout=120, retry_timeout=300, stream=False):
+    """
+    Runs the benchmark for every model and every combination of the grid.
+
+    Changing num_ctx, num_thread or num_batch makes Ollama reload the model, so
+    every combination starts with warmup runs that are discarded.
+
+    Args:
+        api_url: The URL of the Ollama API
+        models: List of models to test
+        tasks: List of benchmark tasks
+        grid: Dict of option name -> list of values, e.g. {"num_ctx": [2048, 8192]}
+        warmup: Discarded runs per task/model pair and combination
+        repetitions: Measured runs per task/model pair and combination
+        temperature: Temperature used when the grid does not sweep it
+
+    Returns:
+        List of result rows with one column per swept option
+    """
+    combinations = expand_grid(grid)
+    print(f"🔧 Parameter sweep: {len(combinations)} combinations × {len(models)} models")
+
+    rows = []
+    for model in models:
+        for combination in combinations:
+            label = ", ".join(f"{name}={value}" for name, value in combination.items())
+            print(f"\n🔧 {model}: {label}")
+
+            options = {name: value for name, value in combination.items() if name not in ('num_predict', 'temperature')}
+            sweep_tasks = tasks
+            if 'num_predict' in combination:
+                sweep_tasks = [dict(task, max_tokens=combination['num_predict']) for task in tasks]
+
+            results = run_benchmark(
+                api_url,
+                [model],
+                sweep_tasks,
+                temperature=combination.get('temperature', temperature),
+                request_timeout=request_timeout,
+                retry_timeout=retry_timeout,
+                stream=stream,
+                warmup=warmup,
+                repetitions=repetitions,
+                options=options
+            )
+            for row in results or []:
+                row.update(combination)
+                rows.append(row)
+    return rows
+
+def summarize_sweep(rows, metrics=('Tokens per Second', 'Generation Time (s)')):
+    """
+    Aggregates sweep rows per model and option combination.
+
+    Returns a list of dicts (Model, swept options, Metric, N, Mean, ...) and
+    prints the combination with the highest mean throughput per model.
+    """
+    parameters = [name for name in SWEEP_PARAMETERS if rows and name in rows[0]]
+    summary = aggregate_results(rows, metrics=list(metrics), group_by=('Model', *parameters))
+
+    throughput = [entry for entry in summary if entry['Metric'] == 'Tokens per Second']
+    for model in dict.fromkeys(entry['Model'] for entry in throughput):
+        best = max((entry for entry in throughput if entry['Model'] == model), key=lambda entry: entry['Mean'])
+        worst = min((entry for entry in throughput if entry['Model'] == model), key=lambda entry: entry['Mean'])
+        label = ", ".join(f"{name}={best[name]}" for name in parameters)
+        speedup = best['Mean'] / worst['Mean'] if worst['Mean'] > 0 else float('inf')
+        print(f"🏆 {model}: best {best['Mean']:.1f} tokens/s with {label} ({speedup:.2f}× the slowest combination)")
+    return summary
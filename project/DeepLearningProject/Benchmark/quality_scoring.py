@@ -0,0 +1,338 @@
+"""
+quality_scoring.py - Automatic quality scores for benchmark responses
+
+This module scores responses while the benchmark keeps generating: rows are
+handed to a small worker pool and get their score columns before they are
+written to the result store. A scorer is a function scorer(task, row) that
+returns a dict of columns, or an empty dict if it does not apply to the task.
+
+Built-in scorers:
+- score_format: length and format metrics of every response
+- score_expected_answer: compares the numbers/text of the response with the
+  task's expected_answer (math tasks)
+- score_python_tests: runs the Python code of the response against the task's
+  test_cases in a separate subprocess (python -I, timeout, resource limits)
+  and compares the returned values with the expected ones in the harness
+
+Accuracy is the test pass rate if the task has test cases, otherwise whether
+the expected answer was found. pareto_front() relates it to tokens/s per model.
+
+The test subprocess guards the benchmark against runaway, crashing or
+resource-hungry code. It is no sandbox: the code runs with the user's
+permissions and can read files, so do not score responses you would not run.
+"""
+
+import os
+import re
+import sys
+import json
+import signal
+import tempfile
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+# Limits of the test process
+TEST_TIMEOUT = 5.0
+TEST_MEMORY_BYTES = 512 * 1024 * 1024
+TEST_FILE_BYTES = 1024 * 1024
+# Relative tolerance when comparing numbers with an expected answer
+ANSWER_TOLERANCE = 0.01
+
+_CODE_BLOCK = re.compile(r"```([\w+-]*)[^\n]*\n(.*?)(?:```|$)", re.DOTALL)
+_NUMBER = re.compile(r"-?\d+(?:,\d{3})*(?:\.\d+)?")
+_FRACTION = re.compile(r"(-?\d+(?:\.\d+)?)\s*/\s*(\d+(?:\.\d+)?)")
+_PERCENT = re.compile(r"(-?\d+(?:\.\d+)?)\s*%")
+
+# Runs in the test process: sets the resource limits (POSIX only), executes
+# every code block in one namespace, then calls the function under test for
+# every case. The returned values (never the expected ones, which the process
+# does not get) are written to the stdout pipe; the code's own output goes to
+# /dev/null. Pass or fail is decided by the harness.
+_TEST_RUNNER = '''
+import os, json, types
+with open("input.json") as f:
+    spec = json.load(f)
+report = os.fdopen(os.dup(1), "w")
+devnull = os.open(os.devnull, os.O_WRONLY)
+os.dup2(devnull, 1)
+os.dup2(devnull, 2)
+try:
+    import resource
+    os.nice(10)
+    for limit, value in spec["limits"].items():
+        resource.setrlimit(getattr(resource, limit), (value, value))
+except ImportError:
+    pass
+namespace = {"__name__": "solution"}
+errors = []
+for index, block in enumerate(spec["blocks"]):
+    try:
+        exec(compile(block, f"block{index}.py", "exec"), namespace)
+    except BaseException as e:
+        errors.append(f"block {index}: {type(e).__name__}: {e}")
+names = [name for name in spec["functions"] if callable(namespace.get(name))]
+if not names:
+    defined = [name for name, value in namespace.items() if isinstance(value, types.FunctionType)]
+    names = defined[-1:]
+results = []
+for args in spec["args"]:
+    if not names:
+        results.append({"error": "no function found"})
+        continue
+    try:
+        results.append({"value": json.loads(json.dumps(namespace[names[0]](*args), default=repr))})
+    except BaseException as e:
+        results.append({"error": f"{type(e).__name__}: {e}"})
+report.write(json.dumps({"function": names[0] if names else None, "errors": errors, "results": results}))
+report.flush()
+'''
+
+def extract_code_blocks(text, languages=('python', 'py', '')):
+    """
+    Returns the fenced code blocks of a response in the given languages.
+
+    A response without fences is returned as a single block if it looks like
+    Python code (contains a def or class statement).
+    """
+    blocks = [code for language, code in _CODE_BLOCK.findall(text or '') if language.lower() in languages]
+    if not blocks and re.search(r"^\s*(def|class) \w+", text or '', re.MULTILINE):
+        blocks = [text]
+    return blocks
+
+def extract_numbers(text):
+    """Returns all numbers in a text, fractions (3/8) and percentages (37.5%) also as their value."""
+    text = text or ''
+    numbers = [float(match.replace(',', '')) for match in _NUMBER.findall(text)]
+    numbers += [float(a) / float(b) for a, b in _FRACTION.findall(text) if float(b) != 0]
+    numbers += [float(value) / 100 for value in _PERCENT.findall(text)]
+    return numbers
+
+def _answer_found(answer, response, numbers, tolerance):
+    if isinstance(answer, (int, float)) and not isinstance(answer, bool):
+        return any(abs(number - answer) <= tolerance * max(abs(answer), 1e-9) for number in numbers)
+    return str(answer).lower() in response.lower()
+
+def score_format(task, row):
+    """Length and format metrics of the response."""
+    response = row.get('Response') or ''
+    max_tokens = task.get('max_tokens')
+    scores = {
+        "Response Characters": len(response),
+        "Response Words": len(response.split()),
+        "Response Lines": response.count('\n') + 1 if response else 0,
+        "Code Blocks": len(_CODE_BLOCK.findall(response))
+    }
+    if max_tokens:
+        # The model stopped because of the token limit, not because it was done
+        scores["Truncated"] = row.get('Tokens Generated', 0) >= max_tokens
+    return scores
+
+def score_expected_answer(task, row, tolerance=ANSWER_TOLERANCE):
+    """
+    Checks whether the response contains the task's expected_answer.
+
+    expected_answer is a number, a string or a list of them that must all be
+    found. Numbers match any number in the response within a relative
+    tolerance (task 'answer_tolerance', default ANSWER_TOLERANCE), strings
+    match case-insensitively as substrings.
+    """
+    expected = task.get('expected_answer')
+    if expected is None:
+        return {}
+    answers = expected if isinstance(expected, list) else [expected]
+    response = row.get('Response') or ''
+    numbers = extract_numbers(response)
+    tolerance = task.get('answer_tolerance', tolerance)
+    found = sum(_answer_found(answer, response, numbers, tolerance) for answer in answers)
+    return {"Answer Correct": found == len(answers), "Answers Found": found}
+
+def run_python_tests(blocks, test_cases, timeout=TEST_TIMEOUT):
+    """
+    Executes code blocks and the test cases in a separate Python subprocess.
+
+    The process runs with python -I (no site packages, environment or
+    current directory on the path) in an empty temporary directory, without
+    stdin and environment variables, at lower priority and (on POSIX) with
+    CPU, memory and file size limits set before the generated code runs. The
+    process and everything it started is killed after timeout seconds.
+    Only the arguments of the cases are passed to the process; it reports the
+    returned values and the harness compares them with the expected ones, so
+    the tested code cannot report a pass for a case it did not solve. This
+    is no sandbox, the code can still read files of the user.
+
+    test_cases is a dict with function (name or list of accepted names; the
+    last defined function is used if none of them exists) and cases (list of
+    {"args": [...], "expected": ...}).
+
+    Returns:
+        Dict with passed, total, function, errors (list of str) and timed_out
+    """
+    cases = test_cases.get('cases', [])
+    functions = test_cases.get('function', [])
+    spec = {
+        "blocks": blocks,
+        "functions": functions if isinstance(functions, list) else [functions],
+        "args": [case.get("args", []) for case in cases],
+        "limits": {
+            "RLIMIT_CPU": int(timeout) + 1,
+            "RLIMIT_AS": TEST_MEMORY_BYTES,
+            "RLIMIT_FSIZE": TEST_FILE_BYTES
+        }
+    }
+    failed = {"passed": 0, "total": len(cases), "function": None, "timed_out": False}
+    with tempfile.TemporaryDirectory(prefix="benchmark_tests_") as directory:
+        with open(os.path.join(directory, 'input.json'), 'w', encoding='utf-8') as f:
+            json.dump(spec, f)
+        # A session of its own, so the whole process group can be killed
+        process = subprocess.Popen(
+            [sys.executable, "-I", "-c", _TEST_RUNNER],
+            cwd=directory,
+            env={"SYSTEMROOT": os.environ["SYSTEMROOT"]} if "SYSTEMROOT" in os.environ else {},
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True
+        )
+        try:
+            stdout, _ = process.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            if hasattr(os, 'killpg'):
+                os.killpg(process.pid, signal.SIGKILL)
+            else:
+                process.kill()
+            process.communicate()
+            return dict(failed, errors=["timeout"], timed_out=True)
+    try:
+        output = json.loads(stdout)
+        results = output["results"]
+        if process.returncode != 0 or len(results) != len(cases):
+            raise ValueError("incomplete results")
+    except (ValueError, KeyError, TypeError):
+        return dict(failed, errors=["test process crashed"])
+    passed = sum(1 for result, case in zip(results, cases)
+                 if "error" not in result and result.get("value") == case.get("expected"))
+    return {
+        "passed": passed,
+        "total": len(cases),
+        "function": output["function"],
+        "errors": output["errors"] + [result["error"] for result in results if "error" in result],
+        "timed_out": False
+    }
+
+def score_python_tests(task, row):
+    """Runs the Python code of the response against the task's test_cases."""
+    test_cases = task.get('test_cases')
+    if not test_cases:
+        return {}
+    blocks = extract_code_blocks(row.get('Response'))
+    total = len(test_cases.get('cases', []))
+    if not blocks:
+        return {"Tests Passed": 0, "Tests Total": total, "Test Pass Rate": 0.0, "Test Errors": "no code found"}
+    result = run_python_tests(blocks, test_cases)
+    return {
+        "Tests Passed": result["passed"],
+        "Tests Total": total,
+        "Test Pass Rate": result["passed"] / total if total else 0.0,
+        "Test Errors": "; ".join(result["errors"])[:500]
+    }
+
+DEFAULT_SCORERS = [score_format, score_expected_answer, score_python_tests]
+
+def score_row(row, task, scorers=None):
+    """Applies the scorers to a row in place and sets Accuracy; returns the row."""
+    for scorer in scorers or DEFAULT_SCORERS:
+        try:
+            row.update(scorer(task, row))
+        except Exception as e:
+            print(f"  ⚠️ Scorer {getattr(scorer, '__name__', scorer)} failed for {row.get('Model')} · {row.get('Task')}: {e}")
+    if "Test Pass Rate" in row:
+        row["Accuracy"] = row["Test Pass Rate"]
+    elif "Answer Correct" in row:
+        row["Accuracy"] = float(row["Answer Correct"])
+    return row
+
+class QualityScorer:
+    """
+    Scores result rows in a worker pool, off the generation path.
+
+    submit() returns immediately; the row is scored in a worker thread and
+    then passed to on_scored (e.g. ResultStore.append). The test runs are
+    subprocesses at lower priority, so max_workers also limits the CPU
+    they take from a local Ollama server. wait() blocks until every submitted
+    row is scored, close() (or leaving a with block) also shuts the pool down.
+    """
+
+    def __init__(self, scorers=None, max_workers=2):
+        self.scorers = scorers or DEFAULT_SCORERS
+        self.max_workers = max_workers
+        self._executor = None
+        self._futures = []
+        self._lock = threading.Lock()
+
+    def _score(self, row, task, on_scored):
+        score_row(row, task, self.scorers)
+        if on_scored is not None:
+            on_scored(row)
+        return row
+
+    def submit(self, row, task, on_scored=None):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="quality-scorer")
+            future = self._executor.submit(self._score, row, task, on_scored)
+            self._futures.append(future)
+        return future
+
+    def wait(self):
+        """Waits for all submitted rows; returns the number of rows scored since the last wait."""
+        with self._lock:
+            futures, self._futures = self._futures, []
+        wait(futures)
+        for future in futures:
+            # Re-raise errors of on_scored, e.g. a failing store
+            future.result()
+        return len(futures)
+
+    def close(self):
+        self.wait()
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+def pareto_front(rows, speed='Tokens per Second', quality='Accuracy'):
+    """
+    Averages speed and quality per model and marks the Pareto-optimal models.
+
+    A model is Pareto-optimal if no other model is at least as fast and at
+    least as accurate and strictly better in one of the two. Rows without a
+    quality score (tasks without expected answer or tests) are left out.
+
+    Returns:
+        List of dicts with Model, N, speed, quality and Pareto Optimal, sorted by speed
+    """
+    per_model = {}
+    for row in rows:
+        if row.get(quality) is None or row.get(speed) is None or row.get('Cached', False):
+            continue
+        values = per_model.setdefault(row['Model'], ([], []))
+        values[0].append(row[speed])
+        values[1].append(row[quality])
+    summary = [
+        {"Model": model, "N": len(speeds), speed: sum(speeds) / len(speeds), quality: sum(qualities) / len(qualities)}
+        for model, (speeds, qualities) in per_model.items()
+    ]
+    for entry in summary:
+        entry["Pareto Optimal"] = not any(
+            other[speed] >= entry[speed] and other[quality] >= entry[quality]
+            and (other[speed] > entry[speed] or other[quality] > entry[quality])
+            for other in summary
+        )
+    return sorted(summary, key=lambda entry: entry[speed])
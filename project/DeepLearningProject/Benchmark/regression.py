@@ -0,0 +1,224 @@
+"""
+regression.py - Regression detection between two stored benchmark runs
+
+This module aligns the rows of a baseline and a candidate run by model and
+task and tests each metric with the Mann-Whitney U test on the repeated
+samples. A difference counts as a regression (or improvement) when it is
+statistically significant and larger than a relative threshold in the
+direction that matters for the metric, e.g. higher latency or lower tokens/s.
+
+Usage:
+    python regression.py --store model_benchmark_results.jsonl --baseline <run id> --candidate <run id>
+
+Without --baseline/--candidate the last two runs in the store are compared.
+The exit code is 1 if a regression was found, so the command can gate an
+Ollama upgrade or a quantization change.
+"""
+
+import sys
+import argparse
+import numpy as np
+from statistics import NormalDist
+from result_store import ResultStore
+
+try:
+    from scipy import stats as scipy_stats
+except ImportError:
+    # scipy is optional, an own implementation of the test is used without it
+    scipy_stats = None
+
+# Metrics compared by default and whether higher or lower values are better
+METRIC_DIRECTIONS = {
+    'Generation Time (s)': 'lower',
+    'Tokens per Second': 'higher',
+    'Decode Tokens per Second': 'higher',
+    'Prefill Tokens per Second': 'higher',
+    'Time to First Token (s)': 'lower'
+}
+# Largest group size for which the exact distribution of U is computed
+EXACT_LIMIT = 20
+
+def _rank(values):
+    """Ranks with ties receiving their average rank (1-based)."""
+    order = np.argsort(values, kind='mergesort')
+    sorted_values = values[order]
+    ranks = np.empty(len(values))
+    # Boundaries of runs of equal values
+    starts = np.concatenate(([0], np.nonzero(np.diff(sorted_values))[0] + 1))
+    ends = np.concatenate((starts[1:], [len(values)]))
+    for start, end in zip(starts, ends):
+        ranks[order[start:end]] = (start + end + 1) / 2
+    return ranks, ends - starts
+
+def _exact_u_distribution(n1, n2):
+    """Number of orderings for each value of U (0..n1*n2) without ties."""
+    # counts[i][j] holds the distribution for group sizes i and j
+    counts = [[None] * (n2 + 1) for _ in range(n1 + 1)]
+    for i in range(n1 + 1):
+        for j in range(n2 + 1):
+            if i == 0 or j == 0:
+                counts[i][j] = np.ones(1)
+                continue
+            # The largest value is either in the first group (adds j to U) or in the second
+            distribution = np.zeros(i * j + 1)
+            with_first = counts[i - 1][j]
+            distribution[j:j + len(with_first)] += with_first
+            with_second = counts[i][j - 1]
+            distribution[:len(with_second)] += with_second
+            counts[i][j] = distribution
+    return counts[n1][n2]
+
+def mann_whitney_u(baseline, candidate):
+    """
+    Two-sided Mann-Whitney U test.
+
+    Uses scipy if it is installed. Otherwise the exact distribution is used for
+    small samples without ties and the normal approximation with tie and
+    continuity correction for all others.
+
+    Returns:
+        (U of the candidate sample, p-value)
+    """
+    baseline = np.asarray(baseline, dtype=float)
+    candidate = np.asarray(candidate, dtype=float)
+    n1, n2 = len(candidate), len(baseline)
+    if scipy_stats is not None:
+        result = scipy_stats.mannwhitneyu(candidate, baseline, alternative='two-sided')
+        return float(result.statistic), float(result.pvalue)
+
+    ranks, tie_sizes = _rank(np.concatenate((candidate, baseline)))
+    u = ranks[:n1].sum() - n1 * (n1 + 1) / 2
+    if max(n1, n2) <= EXACT_LIMIT and np.all(tie_sizes == 1):
+        distribution = _exact_u_distribution(n1, n2)
+        extreme = min(u, n1 * n2 - u)
+        p = 2 * distribution[:int(extreme) + 1].sum() / distribution.sum()
+        return float(u), float(min(p, 1.0))
+
+    n = n1 + n2
+    mean = n1 * n2 / 2
+    tie_term = (tie_sizes ** 3 - tie_sizes).sum() / (n * (n - 1))
+    std = np.sqrt(n1 * n2 / 12 * (n + 1 - tie_term))
+    if std == 0:
+        return float(u), 1.0
+    z = (abs(u - mean) - 0.5) / std
+    return float(u), float(min(2 * (1 - NormalDist().cdf(max(z, 0))), 1.0))
+
+def compare_runs(baseline_rows, candidate_rows, metrics=None, alpha=0.05, threshold=5.0, include_cold=False):
+    """
+    Compares two runs metric by metric for every model/task pair.
+
+    Cold-start and cached rows are left out, like in aggregate_results. The
+    effect size is the rank-biserial correlation (-1..1, positive when the
+    candidate values are higher); Change (%) compares the medians.
+
+    Args:
+        baseline_rows, candidate_rows: Result rows of the two runs
+        metrics: Dict metric -> 'higher'/'lower' is better (default: METRIC_DIRECTIONS)
+        alpha: Significance level of the test
+        threshold: Minimum relative change of the median in percent to flag a difference
+        include_cold: Also use rows flagged as Cold Start
+
+    Returns:
+        List of dicts with Model, Task, Metric, Baseline N, Candidate N,
+        Baseline Median, Candidate Median, Change (%), p-value, Effect Size and
+        Status ('regression', 'improvement', 'unchanged', 'insufficient data'
+        or 'missing')
+    """
+    metrics = metrics or METRIC_DIRECTIONS
+
+    def samples(rows):
+        grouped = {}
+        for row in rows:
+            if (row.get('Cold Start', False) and not include_cold) or row.get('Cached', False):
+                continue
+            grouped.setdefault((row['Model'], row['Task']), []).append(row)
+        return grouped
+
+    baseline, candidate = samples(baseline_rows), samples(candidate_rows)
+    comparison = []
+    for key in dict.fromkeys(list(baseline) + list(candidate)):
+        for metric, direction in metrics.items():
+            base_values = np.array([row[metric] for row in baseline.get(key, []) if row.get(metric) is not None], dtype=float)
+            new_values = np.array([row[metric] for row in candidate.get(key, []) if row.get(metric) is not None], dtype=float)
+            entry = {"Model": key[0], "Task": key[1], "Metric": metric,
+                     "Baseline N": len(base_values), "Candidate N": len(new_values)}
+            if len(base_values) == 0 or len(new_values) == 0:
+                if len(base_values) + len(new_values) > 0:
+                    comparison.append(dict(entry, Status="missing"))
+                continue
+
+            base_median, new_median = float(np.median(base_values)), float(np.median(new_values))
+            change = 100 * (new_median - base_median) / base_median if base_median != 0 else 0.0
+            entry.update({"Baseline Median": base_median, "Candidate Median": new_median, "Change (%)": change})
+            if len(base_values) < 2 or len(new_values) < 2:
+                comparison.append(dict(entry, Status="insufficient data"))
+                continue
+
+            u, p = mann_whitney_u(base_values, new_values)
+            effect_size = 2 * u / (len(base_values) * len(new_values)) - 1
+            worse = change > threshold if direction == 'lower' else change < -threshold
+            better = change < -threshold if direction == 'lower' else change > threshold
+            if p < alpha and worse:
+                status = "regression"
+            elif p < alpha and better:
+                status = "improvement"
+            else:
+                status = "unchanged"
+            entry.update({"p-value": p, "Effect Size": effect_size, "Status": status})
+            comparison.append(entry)
+    return comparison
+
+def print_comparison(comparison):
+    """Prints the flagged differences and a count per status."""
+    symbols = {"regression": "🔴", "improvement": "🟢", "missing": "⚪", "insufficient data": "⚪"}
+    for entry in comparison:
+        if entry["Status"] == "unchanged":
+            continue
+        details = ""
+        if "Change (%)" in entry:
+            details = f": {entry['Baseline Median']:.3f} → {entry['Candidate Median']:.3f} ({entry['Change (%)']:+.1f}%"
+            details += f", p={entry['p-value']:.4f}, r={entry['Effect Size']:+.2f})" if "p-value" in entry else ")"
+        print(f"{symbols[entry['Status']]} {entry['Status']}: {entry['Model']} · {entry['Task']} · {entry['Metric']}{details}")
+    statuses = [entry["Status"] for entry in comparison]
+    print(f"\n📊 {len(comparison)} comparisons: " + ", ".join(f"{statuses.count(status)} {status}" for status in dict.fromkeys(statuses)))
+
+def main(argv=None):
+    """Compares two runs of a result store; exits with 1 on regressions and 2 if a run is missing."""
+    parser = argparse.ArgumentParser(description="Detect regressions between two stored benchmark runs")
+    parser.add_argument("--store", default="model_benchmark_results.jsonl", help="Result store of the candidate run")
+    parser.add_argument("--baseline-store", default=None, help="Result store of the baseline run (default: --store)")
+    parser.add_argument("--baseline", default=None, help="Run ID of the baseline (default: second to last run)")
+    parser.add_argument("--candidate", default=None, help="Run ID of the candidate (default: last run)")
+    parser.add_argument("--metrics", nargs="*", default=None, help="Metrics to compare (default: latency and tokens/s metrics)")
+    parser.add_argument("--alpha", type=float, default=0.05, help="Significance level")
+    parser.add_argument("--threshold", type=float, default=5.0, help="Minimum change of the median in percent")
+    parser.add_argument("--include-cold", action="store_true", help="Also compare rows flagged as cold start")
+    args = parser.parse_args(argv)
+
+    store = ResultStore(args.store)
+    baseline_store = ResultStore(args.baseline_store) if args.baseline_store else store
+    run_ids = store.run_ids()
+    candidate = args.candidate or (run_ids[-1] if run_ids else None)
+    if args.baseline:
+        baseline = args.baseline
+    elif baseline_store is store:
+        baseline = run_ids[-2] if len(run_ids) > 1 else None
+    else:
+        baseline = baseline_store.latest_run_id()
+
+    baseline_rows = baseline_store.load(baseline) if baseline else []
+    candidate_rows = store.load(candidate) if candidate else []
+    if not baseline_rows or not candidate_rows:
+        print(f"❌ Runs not found (baseline: {baseline}, candidate: {candidate}).")
+        return 2
+
+    metrics = {metric: METRIC_DIRECTIONS.get(metric, 'higher' if 'per Second' in metric else 'lower')
+               for metric in args.metrics} if args.metrics else None
+    print(f"🔍 Comparing run {candidate} against baseline {baseline}\n")
+    comparison = compare_runs(baseline_rows, candidate_rows, metrics=metrics, alpha=args.alpha,
+                              threshold=args.threshold, include_cold=args.include_cold)
+    print_comparison(comparison)
+    return 1 if any(entry["Status"] == "regression" for entry in comparison) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+"""
+resource_sampler.py - Background sampling of CPU, memory and load from /proc
+
+This module records CPU utilization per core, the resident memory of the
+ollama processes, system memory and the load average at a fixed interval while
+a benchmark runs. Each sample only reads a few small files from /proc, so the
+sampler costs well under a millisecond per interval. The samples describe the
+machine the benchmark runs on, i.e. they are only meaningful for a local server.
+"""
+
+import os
+import time
+import bisect
+import threading
+
+# The process list is scanned every this many samples, e.g. to find runner
+# processes started by a model load
+_PID_SCAN_EVERY = 10
+
+def _read_cpu_times(proc_root):
+    """Returns {cpu name: (busy, total)} jiffies for the overall CPU and every core."""
+    times = {}
+    with open(os.path.join(proc_root, 'stat')) as f:
+        for line in f:
+            if not line.startswith('cpu'):
+                break
+            fields = line.split()
+            values = [int(value) for value in fields[1:9]]
+            idle = values[3] + values[4]  # idle + iowait
+            total = sum(values)
+            times[fields[0]] = (total - idle, total)
+    return times
+
+def _read_meminfo(proc_root):
+    """Returns total and available system memory in MB."""
+    info = {}
+    with open(os.path.join(proc_root, 'meminfo')) as f:
+        for line in f:
+            key, value = line.split(':', 1)
+            if key in ('MemTotal', 'MemAvailable'):
+                info[key] = int(value.split()[0]) / 1024
+    return info.get('MemTotal', 0), info.get('MemAvailable', 0)
+
+def _read_loadavg(proc_root):
+    with open(os.path.join(proc_root, 'loadavg')) as f:
+        return float(f.read().split()[0])
+
+def _find_pids(proc_root, process_name):
+    """Returns the PIDs whose command name is process_name."""
+    pids = []
+    for entry in os.listdir(proc_root):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(os.path.join(proc_root, entry, 'comm')) as f:
+                if f.read().strip() == process_name:
+                    pids.append(entry)
+        except OSError:
+            continue
+    return pids
+
+def _read_rss(proc_root, pid):
+    """Returns the resident memory of a process in MB, 0 if it has exited."""
+    try:
+        with open(os.path.join(proc_root, pid, 'status')) as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0
+
+class ResourceSampler:
+    """
+    Samples system resources in a background thread.
+
+    Every sample is a dict with Time (perf_counter seconds), CPU (%) (all
+    cores), CPU per Core (%) (list), Ollama RSS (MB) (summed over all processes
+    named process_name), Memory Used (MB), Memory Available (MB) and
+    Load Average (1 min). CPU utilization of a sample covers the interval
+    before it. On systems without /proc the sampler records nothing.
+    """
+
+    def __init__(self, interval=0.5, process_name='ollama', proc_root='/proc'):
+        self.interval = interval
+        self.process_name = process_name
+        self.proc_root = proc_root
+        self.samples = []
+        self._times = []
+        # Total seconds spent taking samples, i.e. the sampler's own cost
+        self.sampling_time = 0.0
+        self.available = os.path.exists(os.path.join(proc_root, 'stat'))
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._start_time = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        if not self.available:
+            print("ℹ️ /proc is not available, resource sampling is disabled.")
+            return self
+        self._stop_event.clear()
+        self._start_time = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="resource-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def _run(self):
+        previous = _read_cpu_times(self.proc_root)
+        pids = []
+        count = 0
+        while not self._stop_event.wait(self.interval):
+            sample_start = time.perf_counter()
+            if count % _PID_SCAN_EVERY == 0:
+                pids = _find_pids(self.proc_root, self.process_name)
+            count += 1
+
+            current = _read_cpu_times(self.proc_root)
+            utilization = {}
+            for cpu, (busy, total) in current.items():
+                previous_busy, previous_total = previous.get(cpu, (busy, total))
+                elapsed = total - previous_total
+                utilization[cpu] = 100 * (busy - previous_busy) / elapsed if elapsed > 0 else 0.0
+            previous = current
+            memory_total, memory_available = _read_meminfo(self.proc_root)
+
+            sample = {
+                "Time": sample_start,
+                "CPU (%)": utilization.pop('cpu', 0.0),
+                "CPU per Core (%)": list(utilization.values()),
+                "Ollama RSS (MB)": sum(_read_rss(self.proc_root, pid) for pid in pids),
+                "Memory Used (MB)": memory_total - memory_available,
+                "Memory Available (MB)": memory_available,
+                "Load Average (1 min)": _read_loadavg(self.proc_root)
+            }
+            with self._lock:
+                self.samples.append(sample)
+                self._times.append(sample_start)
+            self.sampling_time += time.perf_counter() - sample_start
+
+    def window(self, start_time, end_time):
+        """
+        Summarizes the samples taken between start_time and end_time (perf_counter seconds).
+
+        If no sample falls into the window (requests shorter than the
+        interval), the last sample before end_time is used, whose CPU figures
+        cover the end of the request.
+
+        Returns:
+            Dict with Mean CPU (%), Peak CPU Core (%), Peak Ollama RSS (MB),
+            Min Memory Available (MB) and Mean Load Average, or an empty dict
+            if there are no samples yet
+        """
+        with self._lock:
+            first = bisect.bisect_left(self._times, start_time)
+            last = bisect.bisect_right(self._times, end_time)
+            samples = self.samples[first:last] or self.samples[max(last - 1, 0):last]
+        if not samples:
+            return {}
+        return {
+            "Mean CPU (%)": sum(sample["CPU (%)"] for sample in samples) / len(samples),
+            "Peak CPU Core (%)": max(max(sample["CPU per Core (%)"], default=0.0) for sample in samples),
+            "Peak Ollama RSS (MB)": max(sample["Ollama RSS (MB)"] for sample in samples),
+            "Min Memory Available (MB)": min(sample["Memory Available (MB)"] for sample in samples),
+            "Mean Load Average": sum(sample["Load Average (1 min)"] for sample in samples) / len(samples)
+        }
+
+    def series(self):
+        """Returns the samples with Time in seconds since the sampler was started."""
+        with self._lock:
+            return [dict(sample, Time=sample["Time"] - self._start_time) for sample in self.samples]
@@ -0,0 +1,110 @@
+"""
+response_cache.py - On-disk cache for model responses
+
+This module stores benchmark responses under a content hash of the model digest,
+the prompt and the sampling options. Re-running a suite with unchanged inputs
+then reuses the stored responses instead of generating them again, e.g. to
+re-plot or re-score results. The cache is bounded in size and evicts the least
+recently used entries.
+"""
+
+import os
+import json
+import hashlib
+import threading
+from model_manager import get_model_digest
+
+class ResponseCache:
+    """Size-bounded, content-addressed response cache with LRU eviction on disk."""
+
+    def __init__(self, directory='.response_cache', max_bytes=512 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._size = None
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def model_digest(self, api_url, model_name):
+        """Returns the model digest from the model registry, so a re-pulled model gets new keys."""
+        return get_model_digest(api_url, model_name)
+
+    def make_key(self, api_url, model_name, prompt, options):
+        """
+        Builds the cache key from model digest, prompt hash and options.
+
+        Returns None if the model digest is unknown, such requests are not cached.
+        """
+        digest = self.model_digest(api_url, model_name)
+        if digest is None:
+            return None
+        content = json.dumps({
+            "digest": digest,
+            "prompt": hashlib.sha256(prompt.encode('utf-8')).hexdigest(),
+            "options": options
+        }, sort_keys=True)
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        """Returns the cached result for a key or None. A hit marks the entry as recently used."""
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                result = json.load(f)
+            os.utime(path)
+        except (OSError, json.JSONDecodeError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return result
+
+    def put(self, key, result):
+        """Stores a result and evicts the least recently used entries if the cache is too large."""
+        path = self._path(key)
+        data = json.dumps(result, ensure_ascii=False).encode('utf-8')
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+        with self._lock:
+            if self._size is None:
+                self._size = self._current_size()
+            else:
+                self._size += len(data)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _entries(self):
+        return [entry for entry in os.scandir(self.directory) if entry.name.endswith('.json')]
+
+    def _current_size(self):
+        return sum(entry.stat().st_size for entry in self._entries())
+
+    def _evict(self):
+        """Removes the least recently used entries until the cache fits into max_bytes."""
+        entries = sorted(self._entries(), key=lambda entry: entry.stat().st_mtime)
+        size = sum(entry.stat().st_size for entry in entries)
+        for entry in entries:
+            if size <= self.max_bytes:
+                break
+            try:
+                entry_size = entry.stat().st_size
+                os.remove(entry.path)
+                size -= entry_size
+            except OSError:
+                pass
+        self._size = size
+
+    def clear(self):
+        """Removes all cached responses."""
+        with self._lock:
+            for entry in self._entries():
+                os.remove(entry.path)
+            self._size = 0
@@ -0,0 +1,166 @@
+"""
+result_store.py - Incremental on-disk storage for benchmark results
+
+This module appends every result row to a JSON Lines file as soon as it is
+measured, so a crash or timeout in a long benchmark run does not lose the rows
+that were already completed. Rows are keyed by run ID, model, task and
+repetition, which allows resuming an interrupted run.
+"""
+
+import os
+import csv
+import json
+import time
+import random
+import threading
+
+def new_run_id():
+    """Creates a unique, sortable run ID."""
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{random.randint(1000, 9999)}"
+
+class ResultStore:
+    """Append-only JSON Lines store for benchmark result rows."""
+
+    def __init__(self, path, run_id=None):
+        self.path = path
+        self.run_id = run_id or new_run_id()
+        self._lock = threading.Lock()
+
+    def append(self, row):
+        """Appends one result row to the store and flushes it to disk."""
+        record = dict(row)
+        record["Run ID"] = self.run_id
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def series_path(self, name):
+        """Returns the file of a time series stored next to the results, e.g. results.resources.jsonl."""
+        return f"{os.path.splitext(self.path)[0]}.{name}.jsonl"
+
+    def append_series(self, name, records):
+        """Appends the records of a time series (e.g. resource samples) of this run to its own file."""
+        lines = [json.dumps(dict(record, **{"Run ID": self.run_id}), ensure_ascii=False) for record in records]
+        with self._lock:
+            with open(self.series_path(name), 'a', encoding='utf-8') as f:
+                f.write("".join(line + "\n" for line in lines))
+                f.flush()
+                os.fsync(f.fileno())
+
+    def load_series(self, name, run_id=None):
+        """Returns the records of a time series for a run (default: this store's run)."""
+        run_id = run_id or self.run_id
+        return [record for record in self._read_records(self.series_path(name)) if record.get("Run ID") == run_id]
+
+    def _read_records(self, path=None):
+        """Reads all records, skipping a partially written last line."""
+        path = path or self.path
+        if not os.path.exists(path):
+            return []
+        records = []
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    print(f"⚠️ Skipping corrupt line in {path}")
+        return records
+
+    def load(self, run_id=None):
+        """Returns the rows of a run (default: this store's run), use run_id='*' for all runs."""
+        run_id = run_id or self.run_id
+        return [record for record in self._read_records() if run_id == '*' or record.get("Run ID") == run_id]
+
+    def run_ids(self):
+        """Returns all run IDs in the store in order of appearance."""
+        return list(dict.fromkeys(record.get("Run ID") for record in self._read_records()))
+
+    def latest_run_id(self):
+        """Returns the ID of the last run in the store or None if the store is empty."""
+        run_ids = self.run_ids()
+        return run_ids[-1] if run_ids else None
+
+    def load_metrics(self, run_id=None, keep_text=False):
+        """Returns the rows of a run as compact DataFrame, see metrics_frame."""
+        return metrics_frame(self.load(run_id), keep_text=keep_text)
+
+    def completed_keys(self, run_id=None):
+        """Returns the (model, task, repetition) keys that are already stored for a run."""
+        return {
+            (record["Model"], record["Task"], record.get("Repetition", 0))
+            for record in self.load(run_id)
+        }
+
+def open_store(path, run_id=None, resume=False):
+    """
+    Opens a result store.
+
+    With resume=True and no run_id, the last run in the store is continued,
+    otherwise a new run ID is created.
+    """
+    if resume and run_id is None:
+        run_id = ResultStore(path).latest_run_id()
+        if run_id is not None:
+            print(f"🔁 Resuming run {run_id} from {path}")
+    return ResultStore(path, run_id)
+
+def export_csv(rows, path):
+    """
+    Writes result rows to a CSV file with the standard library csv module.
+
+    The columns are the union of all row keys in order of first appearance,
+    missing values stay empty. Lists (e.g. per-core values) are written as JSON.
+    """
+    columns = list(dict.fromkeys(column for row in rows for column in row))
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({
+                column: json.dumps(value) if isinstance(value, (list, dict)) else value
+                for column, value in row.items()
+            })
+
+# Columns that identify a row; metrics_frame keeps them however unique they are
+KEY_COLUMNS = ('Run ID', 'Model', 'Task', 'Repetition', 'Host', 'Prompt Hash', 'Response Hash')
+
+def metrics_frame(rows, keep_text=False):
+    """
+    Builds a compact pandas DataFrame of result rows for analysis.
+
+    The key columns (KEY_COLUMNS: Run ID, Model, Task, Repetition, Host and
+    the text hashes) are always kept, text keys as categoricals. Other string
+    columns with repeated values (Quantization, Family, ...) become
+    categoricals, float metrics float32 and integer columns the smallest
+    integer type. Mostly unique text (Response, error messages) and list
+    columns are left out unless keep_text is True; look texts up with
+    blob_store.BlobStore.expand when needed.
+    """
+    import pandas as pd
+    df = pd.DataFrame.from_records(rows)
+    dropped = []
+    for column in df.columns:
+        series = df[column]
+        if pd.api.types.is_bool_dtype(series):
+            continue
+        if pd.api.types.is_float_dtype(series):
+            df[column] = series.astype('float32')
+        elif pd.api.types.is_integer_dtype(series):
+            df[column] = pd.to_numeric(series, downcast='integer')
+        else:
+            try:
+                distinct = series.nunique(dropna=True)
+            except TypeError:
+                # Lists, e.g. per-core CPU values
+                distinct = None
+            if column in KEY_COLUMNS or (distinct is not None and distinct <= max(len(series) // 2, 1)):
+                df[column] = series.astype('category')
+            elif not keep_text:
+                dropped.append(column)
+    return df.drop(columns=dropped)
@@ -0,0 +1,104 @@
+"""
+retry_policy.py - Retry policy for generation requests
+
+This module decides how often a failed /generate or /chat request is retried,
+with which timeout and after how long a pause. Every attempt is timed on its
+own, so a successful retry only reports its own latency and the failed
+attempts remain visible as attempt records with a failure class.
+
+An attempt that hits its timeout is abandoned in one of two ways:
+'cancel' closes the connection, which makes Ollama stop the generation, and
+'drain' keeps reading the response (discarding it) until the server has
+finished, so the retry never competes with the abandoned request.
+"""
+
+import random
+import threading
+import requests
+from urllib3.exceptions import ReadTimeoutError
+
+# Failure classes of an attempt
+FAILURE_CLASSES = ('timeout', 'connection', 'server_error', 'client_error', 'stream_error', 'invalid_response', 'other')
+# Failures that are retried by default, all others are returned immediately
+RETRYABLE_FAILURES = ('timeout', 'connection', 'server_error')
+
+def classify_status(status_code):
+    """Returns the failure class of an HTTP error status."""
+    return 'server_error' if status_code >= 500 else 'client_error'
+
+def classify_failure(error):
+    """Returns the failure class of an exception raised by an attempt."""
+    if isinstance(error, requests.exceptions.Timeout):
+        return 'timeout'
+    if isinstance(error, requests.exceptions.ConnectionError):
+        # Read timeouts arrive as ConnectionError: wrapped in a MaxRetryError
+        # while waiting for the response, unwrapped in the middle of a stream
+        cause = error.args[0] if error.args else None
+        if isinstance(cause, ReadTimeoutError) or isinstance(getattr(cause, 'reason', None), ReadTimeoutError):
+            return 'timeout'
+        return 'connection'
+    if isinstance(error, (requests.exceptions.ChunkedEncodingError, requests.exceptions.ContentDecodingError)):
+        return 'stream_error'
+    if isinstance(error, ValueError):
+        # Invalid JSON in the response body or stream
+        return 'invalid_response'
+    return 'other'
+
+class RetryPolicy:
+    """
+    Attempts, timeouts and backoff for one request.
+
+    Attempt 1 uses timeout, every further attempt retry_timeout (default:
+    timeout). The timeout is a deadline for the whole attempt, also when
+    streaming. Before attempt n + 1 the policy waits
+    backoff * backoff_factor ** (n - 1) seconds (at most max_backoff), varied by
+    ±jitter (relative) so concurrent retries do not hit the server at once.
+    Only failure classes in retry_on are retried.
+
+    abandon='cancel' closes the connection of a timed-out attempt,
+    abandon='drain' reads it to its end (for at most drain_timeout further
+    seconds) before the next attempt is sent.
+    """
+
+    def __init__(self, attempts=2, timeout=120, retry_timeout=None, backoff=1.0, backoff_factor=2.0, max_backoff=30.0,
+                 jitter=0.5, retry_on=RETRYABLE_FAILURES, abandon='cancel', drain_timeout=60.0, seed=None):
+        if attempts < 1:
+            raise ValueError("attempts must be at least 1")
+        if abandon not in ('cancel', 'drain'):
+            raise ValueError(f"Unknown abandon mode '{abandon}', use 'cancel' or 'drain'")
+        self.attempts = attempts
+        self.timeout = timeout
+        self.retry_timeout = retry_timeout or timeout
+        self.backoff = backoff
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.retry_on = tuple(retry_on)
+        self.abandon = abandon
+        self.drain_timeout = drain_timeout
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def timeout_for(self, attempt):
+        """Returns the timeout of the given attempt (1-based)."""
+        return self.timeout if attempt <= 1 else self.retry_timeout
+
+    def drain_for(self):
+        """Returns the extra seconds a timed-out attempt is read for, 0 when it is cancelled."""
+        return self.drain_timeout if self.abandon == 'drain' else 0
+
+    def should_retry(self, failure, attempt):
+        """Returns True if an attempt that failed with the given class is followed by another one."""
+        return attempt < self.attempts and failure in self.retry_on
+
+    def backoff_for(self, attempt):
+        """Returns the pause in seconds after the given failed attempt."""
+        delay = min(self.backoff * self.backoff_factor ** (attempt - 1), self.max_backoff)
+        if self.jitter <= 0 or delay <= 0:
+            return delay
+        with self._lock:
+            return max(0.0, delay * (1 + self._random.uniform(-self.jitter, self.jitter)))
+
+    def __repr__(self):
+        return (f"RetryPolicy(attempts={self.attempts}, timeout={self.timeout}, retry_timeout={self.retry_timeout}, "
+                f"backoff={self.backoff}, abandon='{self.abandon}')")
@@ -0,0 +1,12 @@
+import pytest
+
+from benchmark_cli import main
+
+
+@pytest.mark.parametrize("option", [["--resume"], ["--cache-dir", "cache"], ["--score"], ["--schedule", "grouped"],
+                                    ["--concurrency-per-model", "2"], ["--resource-interval", "0"]])
+def test_single_host_options_are_rejected_for_several_hosts(option, capsys):
+    argv = ["--models", "mock", "--api-url", "http://127.0.0.1:1/api", "http://127.0.0.1:2/api", "--store", "",
+            "--csv", ""] + option
+    assert main(argv) == 1
+    assert option[0] in capsys.readouterr().out
@@ -0,0 +1,50 @@
+import time
+
+import pytest
+
+from benchmark_core import run_benchmark
+from instrumentation import add_hook, remove_hook
+from mock_ollama_server import MockOllamaServer
+
+TASKS = [{"name": f"task{i}", "prompt": f"Prompt {i}", "max_tokens": 4} for i in range(3)]
+MODELS = ["model-a", "model-b"]
+
+
+class RequestSpans:
+    """Records the start and end of every request per model."""
+
+    def __init__(self):
+        self.starts = {}
+        self.ends = {}
+
+    def before_request(self, context):
+        self.starts.setdefault(context["model"], []).append(time.perf_counter())
+
+    def on_complete(self, context, result):
+        self.ends.setdefault(context["model"], []).append(time.perf_counter())
+
+
+@pytest.fixture
+def server():
+    with MockOllamaServer(models=MODELS, ttft=0.02, token_delay=0.005, load_time=0.0, slots=4, seed=1) as mock:
+        yield mock
+
+
+def test_grouped_schedule_never_mixes_models_in_flight(server):
+    spans = add_hook(RequestSpans())
+    try:
+        rows = run_benchmark(server.api_url, MODELS, TASKS, max_concurrency=4, repetitions=2, warmup=1,
+                             schedule='grouped', resource_interval=None)
+    finally:
+        remove_hook(spans)
+    assert [row["Model"] for row in rows] == ["model-a"] * 6 + ["model-b"] * 6
+    assert max(spans.ends["model-a"]) <= min(spans.starts["model-b"])
+
+
+@pytest.mark.parametrize("max_concurrency", [1, 4])
+def test_warmup_requests_are_numbered_from_one(server, capsys, max_concurrency):
+    run_benchmark(server.api_url, MODELS[:1], TASKS[:1], max_concurrency=max_concurrency, warmup=2,
+                  resource_interval=None)
+    out = capsys.readouterr().out
+    assert "warmup #1" in out and "warmup #2" in out
+    assert "#0" not in out and "#-1" not in out
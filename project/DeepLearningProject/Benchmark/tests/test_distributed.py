@@ -0,0 +1,54 @@
+from distributed import WorkStealingQueues, get_last_failures, run_distributed_benchmark
+from mock_ollama_server import MockOllamaServer
+
+TASKS = [{"name": f"task{i}", "prompt": f"Prompt {i}", "max_tokens": 4} for i in range(4)]
+
+
+class FailingBlobStore:
+    """Fails for every row of one host, like a store that cannot be written."""
+
+    def __init__(self, host):
+        self.host = host
+
+    def compact(self, row):
+        if row["Host"] == self.host:
+            raise OSError("disk full")
+        return row
+
+
+def test_retire_moves_jobs_to_remaining_hosts():
+    queues = WorkStealingQueues(["a", "b"], list(range(4)))
+    assert queues.retire("a") == []
+    assert queues.next_job("a") is None
+    jobs = [queues.next_job("b")[1] for _ in range(4)]
+    assert sorted(jobs) == [0, 1, 2, 3]
+    assert queues.retire("b") == []
+
+
+def test_last_host_retired_returns_its_jobs():
+    queues = WorkStealingQueues(["a"], ["x", "y"])
+    assert queues.retire("a") == [(0, "x"), (1, "y")]
+
+
+def test_failing_worker_retires_host_and_jobs_move(capsys):
+    kwargs = dict(models=["mock"], ttft=0.01, token_delay=0.001, load_time=0.0, seed=1)
+    with MockOllamaServer(**kwargs) as healthy, MockOllamaServer(**kwargs) as broken:
+        rows, summary = run_distributed_benchmark(
+            [healthy.api_url, broken.api_url], ["mock"], TASKS, repetitions=2,
+            blob_store=FailingBlobStore(broken.api_url)
+        )
+    failures = get_last_failures()
+    assert len(failures) == 1
+    assert failures[0]["Host"] == broken.api_url
+    assert "disk full" in failures[0]["Error"]
+    assert len(rows) == len(TASKS) * 2 - 1
+    assert {row["Host"] for row in rows} == {healthy.api_url}
+    assert "Worker for" in capsys.readouterr().out
+
+
+def test_all_hosts_failing_records_every_job():
+    kwargs = dict(models=["mock"], ttft=0.01, token_delay=0.001, load_time=0.0, seed=1)
+    with MockOllamaServer(**kwargs) as broken:
+        rows, _ = run_distributed_benchmark([broken.api_url], ["mock"], TASKS, blob_store=FailingBlobStore(broken.api_url))
+    assert rows == []
+    assert len(get_last_failures()) == len(TASKS)
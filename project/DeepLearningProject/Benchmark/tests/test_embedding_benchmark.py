@@ -0,0 +1,28 @@
+from embedding_benchmark import benchmark_embed
+from mock_ollama_server import MockOllamaServer
+from retry_policy import RetryPolicy
+
+INPUTS = ["first input", "second input", "third input"]
+
+
+def test_embed_batch():
+    with MockOllamaServer(models=["embed"], ttft=0.01, load_time=0.0) as mock:
+        res = benchmark_embed(mock.api_url, "embed", INPUTS)
+    assert res["success"]
+    assert res["inputs_per_second"] > 0
+    assert len(res["attempts"]) == 1
+
+
+def test_busy_server_is_one_recorded_attempt():
+    with MockOllamaServer(models=["embed"], load_time=0.0, failure_rate=1.0, failure_status=503) as mock:
+        res = benchmark_embed(mock.api_url, "embed", INPUTS)
+        assert mock.path_counts["/api/embed"] == 1
+    assert not res["success"]
+    assert res["failure"] == "server_error"
+
+
+def test_retry_policy_attempts_are_recorded():
+    with MockOllamaServer(models=["embed"], load_time=0.0, failure_rate=1.0, failure_status=503) as mock:
+        res = benchmark_embed(mock.api_url, "embed", INPUTS, retry_policy=RetryPolicy(attempts=3, backoff=0.0))
+        assert mock.path_counts["/api/embed"] == 3
+    assert [attempt["failure"] for attempt in res["attempts"]] == ["server_error"] * 3
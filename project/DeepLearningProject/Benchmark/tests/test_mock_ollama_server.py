@@ -0,0 +1,74 @@
+import pytest
+
+from benchmark_core import benchmark_model, get_last_failures, run_benchmark
+from mock_ollama_server import MockOllamaServer
+from result_store import open_store
+from retry_policy import RetryPolicy
+
+MODELS = ["model-a", "model-b"]
+TASKS = [{"name": f"task{i}", "prompt": f"Prompt {i}", "max_tokens": 8} for i in range(3)]
+
+
+def generations(mock):
+    return mock.path_counts.get("/api/generate", 0)
+
+
+def test_streaming_measures_ttft_and_inter_token_latency():
+    with MockOllamaServer(models=MODELS, ttft=0.1, token_delay=0.02, prompt_token_delay=0.0, load_time=0.0) as mock:
+        res = benchmark_model(mock.api_url, "model-a", "Hello", max_tokens=10, stream=True)
+    assert res["success"]
+    assert res["eval_count"] == 10
+    assert 0.1 <= res["time_to_first_token"] < 0.2
+    assert 0.015 <= res["inter_token_latency"]["p50"] < 0.04
+    assert res["time_to_first_token"] < res["generation_time"]
+
+
+def test_failures_are_recorded_per_attempt():
+    with MockOllamaServer(models=MODELS, ttft=0.01, token_delay=0.001, load_time=0.0, failure_rate=0.4,
+                          seed=3) as mock:
+        rows = run_benchmark(mock.api_url, MODELS, TASKS, repetitions=3, resource_interval=None,
+                             retry_policy=RetryPolicy(attempts=2, timeout=5, backoff=0.0))
+        hits = generations(mock)
+    failures = get_last_failures()
+    assert len(rows) + len(failures) == len(MODELS) * len(TASKS) * 3
+    assert failures and any(row["Attempts"] == 2 for row in rows)
+    for record in failures:
+        assert record["Failure"] == "server_error"
+        assert record["Attempt Failures"] == ["server_error", "server_error"]
+    # Every request the server saw is one recorded attempt
+    assert hits == sum(row["Attempts"] for row in rows) + sum(record["Attempts"] for record in failures)
+
+
+def test_resume_only_runs_missing_jobs(tmp_path):
+    path = str(tmp_path / "results.jsonl")
+    with MockOllamaServer(models=MODELS, ttft=0.01, token_delay=0.001, load_time=0.0) as mock:
+        first = run_benchmark(mock.api_url, MODELS, TASKS[:2], repetitions=2, store=open_store(path),
+                              resource_interval=None)
+        assert len(first) == 8
+        before = generations(mock)
+        rows = run_benchmark(mock.api_url, MODELS, TASKS, repetitions=2, store=open_store(path, resume=True),
+                             resume=True, resource_interval=None)
+        assert generations(mock) - before == len(MODELS) * 2
+    assert len(rows) == len(MODELS) * len(TASKS) * 2
+    assert {(row["Model"], row["Task"], row["Repetition"]) for row in rows} == {
+        (model, task["name"], repetition) for model in MODELS for task in TASKS for repetition in range(2)
+    }
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_generate_reports_server_timings(stream):
+    with MockOllamaServer(models=MODELS, ttft=0.01, token_delay=0.001, load_time=0.0) as mock:
+        res = benchmark_model(mock.api_url, "model-b", "Hello", max_tokens=5, stream=stream)
+    assert res["success"]
+    assert res["eval_count"] == 5
+    assert res["decode_tokens_per_second"] > 0
+
+
+def test_streamed_chunks_are_not_delayed_on_reused_connections():
+    with MockOllamaServer(models=MODELS, ttft=0.01, token_delay=0.001, prompt_token_delay=0.0, load_time=0.0) as mock:
+        results = [benchmark_model(mock.api_url, "model-a", "Hello", max_tokens=20, stream=True) for _ in range(4)]
+    for res in results:
+        assert res["success"]
+        # Nagle's algorithm and delayed ACKs hold chunks back for ~40 ms and deliver them in a burst
+        assert 0.01 <= res["time_to_first_token"] < 0.03
+        assert 0.0005 <= res["inter_token_latency"]["p50"] < 0.005
@@ -0,0 +1,19 @@
+import builtins
+
+import ollama_server
+
+
+def test_log_file_is_closed_when_the_server_cannot_start(tmp_path, monkeypatch):
+    opened = []
+
+    def recording_open(*args, **kwargs):
+        opened.append(builtins.open(*args, **kwargs))
+        return opened[-1]
+
+    def missing_binary(*args, **kwargs):
+        raise FileNotFoundError("ollama")
+
+    monkeypatch.setattr(ollama_server, "open", recording_open, raising=False)
+    monkeypatch.setattr(ollama_server.subprocess, "Popen", missing_binary)
+    assert not ollama_server.start_ollama_server("http://127.0.0.1:1/api", log_path=str(tmp_path / "server.log"))
+    assert len(opened) == 1 and opened[0].closed
@@ -0,0 +1,51 @@
+from quality_scoring import QualityScorer, run_python_tests, score_row
+
+TEST_CASES = {"function": "add", "cases": [{"args": [1, 2], "expected": 3}, {"args": [2, 2], "expected": 4}]}
+
+
+def test_correct_code_passes():
+    result = run_python_tests(["def add(a, b):\n    return a + b\n"], TEST_CASES)
+    assert result["passed"] == 2
+    assert result["function"] == "add"
+
+
+def test_wrong_code_fails():
+    result = run_python_tests(["def add(a, b):\n    return a - b\n"], TEST_CASES)
+    assert result["passed"] == 0
+
+
+def test_code_cannot_fake_its_results():
+    fake = "{'function': 'add', 'errors': [], 'results': [{'passed': True}, {'passed': True}]}"
+    code = (
+        "import os, json\n"
+        "def add(a, b):\n"
+        f"    json.dump({fake}, open('results.json', 'w'))\n"
+        f"    os.write(1, json.dumps({fake}).encode())\n"
+        "    os._exit(0)\n"
+    )
+    result = run_python_tests([code], TEST_CASES)
+    assert result["passed"] == 0
+
+
+def test_exit_without_results_is_a_failure():
+    result = run_python_tests(["import os\nos._exit(0)\n"], TEST_CASES)
+    assert result["passed"] == 0
+    assert result["errors"] == ["test process crashed"]
+
+
+def test_timeout_kills_the_process():
+    result = run_python_tests(["while True:\n    pass\n"], TEST_CASES, timeout=0.5)
+    assert result["timed_out"]
+
+
+def test_scorer_pool_is_shut_down_on_exit():
+    task = {"test_cases": TEST_CASES}
+    with QualityScorer() as scorer:
+        future = scorer.submit({"Response": "```python\ndef add(a, b):\n    return a + b\n```"}, task)
+    assert future.result()["Accuracy"] == 1.0
+    assert scorer._executor is None
+
+
+def test_expected_answer_sets_accuracy():
+    row = score_row({"Response": "The answer is 3/8 or 37.5%."}, {"expected_answer": 0.375})
+    assert row["Accuracy"] == 1.0
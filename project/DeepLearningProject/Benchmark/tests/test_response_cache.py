@@ -0,0 +1,14 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from response_cache import ResponseCache
+
+
+def test_hit_and_miss_counters_under_concurrency(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    cache.put("stored", {"success": True, "response": "cached"})
+    keys = ["stored", "missing"] * 400
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(cache.get, keys))
+    assert sum(result is not None for result in results) == 400
+    assert cache.hits == 400
+    assert cache.misses == 400
@@ -0,0 +1,29 @@
+import pytest
+
+from result_store import metrics_frame
+
+pytest.importorskip("pandas")
+
+
+def _rows(models, tasks):
+    return [
+        {"Run ID": "run", "Model": model, "Task": task, "Repetition": 0, "Host": "localhost",
+         "Response Hash": f"{model}-{task}", "Tokens per Second": 10.0, "Error": f"error {model} {task}"}
+        for model in models for task in tasks
+    ]
+
+
+@pytest.mark.parametrize("models, tasks", [(["m1"], ["t1", "t2", "t3", "t4"]), (["m1", "m2", "m3"], ["t1"])])
+def test_metrics_frame_keeps_unique_key_columns(models, tasks):
+    df = metrics_frame(_rows(models, tasks))
+    for column in ("Run ID", "Model", "Task", "Repetition", "Host", "Response Hash"):
+        assert column in df.columns
+    assert str(df["Model"].dtype) == "category"
+    assert list(df["Task"].astype(str)) == [task for _ in models for task in tasks]
+    assert "Error" not in df.columns
+    assert df["Tokens per Second"].dtype == "float32"
+
+
+def test_metrics_frame_keep_text():
+    df = metrics_frame(_rows(["m1"], ["t1", "t2"]), keep_text=True)
+    assert "Error" in df.columns
@@ -0,0 +1,62 @@
+import time
+
+import pytest
+
+from benchmark_core import benchmark_model
+from mock_ollama_server import MockOllamaServer
+from retry_policy import RetryPolicy
+
+
+@pytest.fixture
+def mock_kwargs():
+    return dict(ttft=0.01, token_delay=0.001, load_time=0.0, seed=1)
+
+
+def test_busy_server_is_not_retried_behind_the_policy(mock_kwargs):
+    with MockOllamaServer(models=["mock"], failure_rate=1.0, failure_status=503, **mock_kwargs) as mock:
+        res = benchmark_model(mock.api_url, "mock", "Hello", max_tokens=4,
+                              retry_policy=RetryPolicy(attempts=1, timeout=5))
+        assert mock.request_count == 1
+    assert not res["success"]
+    assert res["failure"] == "server_error"
+    assert len(res["attempts"]) == 1
+
+
+def test_every_server_hit_is_an_attempt(mock_kwargs):
+    with MockOllamaServer(models=["mock"], failure_rate=1.0, failure_status=503, **mock_kwargs) as mock:
+        res = benchmark_model(mock.api_url, "mock", "Hello", max_tokens=4,
+                              retry_policy=RetryPolicy(attempts=3, timeout=5, backoff=0.0))
+        assert mock.request_count == 3
+    assert [attempt["failure"] for attempt in res["attempts"]] == ["server_error"] * 3
+
+
+@pytest.mark.parametrize("stall_point", ["before", "stream"])
+def test_stall_is_classified_as_timeout(mock_kwargs, stall_point):
+    with MockOllamaServer(models=["mock"], stall_rate=1.0, stall_time=2.0, stall_point=stall_point,
+                          **mock_kwargs) as mock:
+        res = benchmark_model(mock.api_url, "mock", "Hello", max_tokens=4, stream=True,
+                              retry_policy=RetryPolicy(attempts=2, timeout=0.3, backoff=0.0))
+    assert not res["success"]
+    assert res["failure"] == "timeout"
+    assert [attempt["failure"] for attempt in res["attempts"]] == ["timeout", "timeout"]
+
+
+@pytest.mark.parametrize("drain_timeout, abandon", [(0.0, "cancel"), (0.3, "drain_timeout"), (2.0, "drained")])
+def test_timed_out_attempts_record_how_they_were_abandoned(drain_timeout, abandon):
+    policy = RetryPolicy(attempts=1, timeout=0.2, abandon='drain' if drain_timeout else 'cancel',
+                         drain_timeout=drain_timeout)
+    with MockOllamaServer(models=["mock"], ttft=0.01, token_delay=0.05, load_time=0.0) as mock:
+        res = benchmark_model(mock.api_url, "mock", "Hello", max_tokens=20, stream=True, retry_policy=policy)
+    assert res["failure"] == "timeout"
+    assert res["abandon"] == abandon
+    assert res["attempts"][0]["abandon"] == abandon
+
+
+def test_default_retry_is_immediate(mock_kwargs):
+    with MockOllamaServer(models=["mock"], stall_rate=1.0, stall_time=1.0, **mock_kwargs) as mock:
+        start = time.perf_counter()
+        res = benchmark_model(mock.api_url, "mock", "Hello", max_tokens=4, request_timeout=0.2, retry_timeout=0.2)
+        elapsed = time.perf_counter() - start
+    assert [attempt["failure"] for attempt in res["attempts"]] == ["timeout", "timeout"]
+    # Two attempts of 0.2 s without a backoff pause in between
+    assert elapsed < 0.8
@@ -2,66 +2,194 @@
 visualization.py - Visualization for benchmark results
 
 This module contains functions for visualizing benchmark results 
-with tables and charts.
+with tables and charts. pandas, matplotlib and IPython are imported only
+when a function is called, so importing the package stays fast on headless
+machines without them.
 """
 
-import pandas as pd
-import matplotlib.pyplot as plt
-from IPython.display import display
+import os
 import numpy as np
+from benchmark_stats import aggregate_results
 
-def visualize_results(results, models, tasks):
-    if not results:
+# Server-side timing columns that are added to the summary when present
+SERVER_TIMING_COLUMNS = [
+    'Prefill Tokens per Second',
+    'Decode Tokens per Second',
+    'Load Time (s)',
+    'Client Overhead (s)'
+]
+
+def display(data):
+    """Shows a table with IPython's display in notebooks and as plain text elsewhere."""
+    try:
+        from IPython.display import display as ipython_display
+    except ImportError:
+        print(data.to_string() if hasattr(data, 'to_string') else data)
+        return
+    ipython_display(data)
+
+# Metrics shown as bar charts per task and model
+CHART_METRICS = [
+    ('Generation Time (s)', 'Comparison of Generation Times'),
+    ('Tokens per Second', 'Comparison of Tokens per Second')
+]
+
+def metric_matrices(df, metrics, models, task_names):
+    """
+    Returns a task × model matrix of mean values for every metric.
+
+    All metrics are averaged in a single groupby pass over the rows. Missing
+    task/model combinations are NaN.
+    """
+    means = df.groupby(['Task', 'Model'], sort=False)[metrics].mean()
+    return {metric: means[metric].unstack('Model').reindex(index=task_names, columns=models) for metric in metrics}
+
+def _bar_chart(plt, matrix, metric, title):
+    """Draws grouped bars (one group per task, one bar per model) and returns the figure."""
+    models = list(matrix.columns)
+    x = np.arange(len(matrix.index))
+    width = 0.8 / max(len(models), 1)
+    offsets = (np.arange(len(models)) - (len(models) - 1) / 2) * width
+    fig, ax = plt.subplots(figsize=(min(max(12, len(x) * len(models) * 0.15), 24), 6), layout="constrained")
+    for offset, model in zip(offsets, models):
+        ax.bar(x + offset, matrix[model].to_numpy(), width, label=model)
+    ax.set_xlabel('Task')
+    ax.set_ylabel(metric)
+    ax.set_title(title)
+    ax.set_xticks(x)
+    ax.set_xticklabels(matrix.index, rotation=45, ha='right')
+    ax.legend()
+    return fig
+
+def visualize_results(results, models=None, tasks=None, output_dir=None, show=True):
+    """
+    Plots generation time and tokens per second per task and model and shows the summary tables.
+
+    results can be the list of rows or a DataFrame. models and tasks set the
+    order of the bars and groups (default: order of appearance). With
+    output_dir the charts are saved there as PNG and the summary as CSV;
+    show=False closes the figures instead of showing them (headless runs).
+    """
+    if results is None or len(results) == 0:
         print("No results available for visualization.")
         return
-    df = pd.DataFrame(results)
-    task_names = list(set([task['name'] for task in tasks]))
-    plt.figure(figsize=(12, 6))
-    x = np.arange(len(task_names))
-    width = 0.35
-    for i, model in enumerate(models):
-        model_data = df[df['Model'] == model]
-        times = []
-        for task_name in task_names:
-            task_data = model_data[model_data['Task'] == task_name]['Generation Time (s)'].values
-            if len(task_data) > 0:
-                times.append(task_data[0])
-            else:
-                times.append(0)
-        plt.bar(x + i*width, times, width, label=model)
-    plt.xlabel('Task')
-    plt.ylabel('Generation Time (s)')
-    plt.title('Comparison of Generation Times')
-    plt.xticks(x + width/2, task_names, rotation=45)
-    plt.legend()
+    import pandas as pd
+    import matplotlib.pyplot as plt
+    df = results if isinstance(results, pd.DataFrame) else pd.DataFrame(results)
+    models = list(dict.fromkeys(models)) if models else list(df['Model'].unique())
+    task_names = list(dict.fromkeys(task['name'] for task in tasks)) if tasks else list(df['Task'].unique())
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    matrices = metric_matrices(df, [metric for metric, _ in CHART_METRICS], models, task_names)
+    for metric, title in CHART_METRICS:
+        fig = _bar_chart(plt, matrices[metric], metric, title)
+        if output_dir:
+            name = metric.split(' (')[0].lower().replace(' ', '_')
+            fig.savefig(os.path.join(output_dir, f"{name}.png"), dpi=100)
+        if show:
+            plt.show()
+        else:
+            plt.close(fig)
+
+    summary = df.groupby('Model', sort=False)[
+        ['Generation Time (s)', 'Tokens Generated', 'Tokens per Second'] + [column for column in SERVER_TIMING_COLUMNS if column in df]
+    ].mean().reindex(models).reset_index()
+    print("\n📊 Summary of Performance Metrics:")
+    display(summary)
+    if output_dir:
+        summary.to_csv(os.path.join(output_dir, "summary.csv"), index=False)
+    if 'Repetition' in df and df['Repetition'].max() > 0:
+        print("\n📈 Statistics over Repetitions (warm runs):")
+        statistics = pd.DataFrame(aggregate_results(df))
+        display(statistics)
+        if output_dir:
+            statistics.to_csv(os.path.join(output_dir, "statistics.csv"), index=False)
+
+def visualize_load_test(steps):
+    """Plots achieved throughput and latency percentiles against the offered arrival rate."""
+    if not steps:
+        print("No load test results available for visualization.")
+        return
+    import pandas as pd
+    import matplotlib.pyplot as plt
+    df = pd.DataFrame(steps)
+    fig, (ax_throughput, ax_latency) = plt.subplots(1, 2, figsize=(14, 5))
+    for model, model_data in df.groupby('Model', sort=False):
+        model_data = model_data.sort_values('Offered Rate (req/s)')
+        ax_throughput.plot(model_data['Offered Rate (req/s)'], model_data['Achieved Throughput (req/s)'], marker='o', label=model)
+        ax_latency.plot(model_data['Offered Rate (req/s)'], model_data['Latency p95 (s)'], marker='o', label=f"{model} p95")
+        ax_latency.plot(model_data['Offered Rate (req/s)'], model_data['Latency p50 (s)'], linestyle='--', label=f"{model} p50")
+    max_rate = df['Offered Rate (req/s)'].max()
+    ax_throughput.plot([0, max_rate], [0, max_rate], color='grey', linestyle=':', label='Offered = Achieved')
+    ax_throughput.set_xlabel('Offered Rate (req/s)')
+    ax_throughput.set_ylabel('Achieved Throughput (req/s)')
+    ax_throughput.set_title('Throughput under Load')
+    ax_throughput.legend()
+    ax_latency.set_xlabel('Offered Rate (req/s)')
+    ax_latency.set_ylabel('Latency (s)')
+    ax_latency.set_title('Latency under Load')
+    ax_latency.legend()
     plt.tight_layout()
     plt.show()
-    plt.figure(figsize=(12, 6))
-    for i, model in enumerate(models):
-        model_data = df[df['Model'] == model]
-        tokens_per_sec = []
-        for task_name in task_names:
-            task_data = model_data[model_data['Task'] == task_name]['Tokens per Second'].values
-            if len(task_data) > 0:
-                tokens_per_sec.append(task_data[0])
-            else:
-                tokens_per_sec.append(0)
-        plt.bar(x + i*width, tokens_per_sec, width, label=model)
-    plt.xlabel('Task')
-    plt.ylabel('Tokens per Second')
-    plt.title('Comparison of Tokens per Second')
-    plt.xticks(x + width/2, task_names, rotation=45)
-    plt.legend()
+    print("\n📊 Load Test Steps:")
+    display(df)
+
+
+def visualize_context_scaling(rows, knees=None):
+    """Plots prefill time and time to first token against the prompt length per model."""
+    if not rows:
+        print("No context scaling results available for visualization.")
+        return
+    import pandas as pd
+    import matplotlib.pyplot as plt
+    df = pd.DataFrame(rows)
+    per_length = df.groupby(['Model', 'Context Length'], sort=False).agg({
+        'Prompt Tokens': 'mean',
+        'Prefill Time (s)': 'mean',
+        'Time to First Token (s)': 'mean',
+        'Prefill Tokens per Second': 'mean'
+    }).reset_index()
+    fig, (ax_prefill, ax_ttft) = plt.subplots(1, 2, figsize=(14, 5))
+    for model, model_data in per_length.groupby('Model', sort=False):
+        ax_prefill.plot(model_data['Prompt Tokens'], model_data['Prefill Time (s)'], marker='o', label=model)
+        ax_ttft.plot(model_data['Prompt Tokens'], model_data['Time to First Token (s)'], marker='o', label=model)
+        if knees and knees.get(model) is not None:
+            ax_prefill.axvline(model_data[model_data['Context Length'] == knees[model]]['Prompt Tokens'].iloc[0],
+                               linestyle=':', color='grey')
+    for ax, ylabel, title in [(ax_prefill, 'Prefill Time (s)', 'Prefill Time vs. Context Size'),
+                              (ax_ttft, 'Time to First Token (s)', 'TTFT vs. Context Size')]:
+        ax.set_xscale('log', base=2)
+        ax.set_xlabel('Prompt Tokens')
+        ax.set_ylabel(ylabel)
+        ax.set_title(title)
+        ax.legend()
+    plt.tight_layout()
+    plt.show()
+    print("\n📊 Context Scaling per Length:")
+    display(per_length)
+
+def visualize_quality(rows, speed='Tokens per Second', quality='Accuracy'):
+    """Plots mean accuracy against mean tokens/s per model and connects the Pareto-optimal models."""
+    from quality_scoring import pareto_front
+    front = pareto_front(rows, speed=speed, quality=quality)
+    if not front:
+        print("No quality scores available for visualization.")
+        return
+    import pandas as pd
+    import matplotlib.pyplot as plt
+    df = pd.DataFrame(front)
+    fig, ax = plt.subplots(figsize=(8, 6))
+    for entry in front:
+        ax.scatter(entry[speed], entry[quality], s=80, marker='o' if entry['Pareto Optimal'] else 'x')
+        ax.annotate(entry['Model'], (entry[speed], entry[quality]), textcoords="offset points", xytext=(6, 6))
+    optimal = df[df['Pareto Optimal']]
+    ax.step(optimal[speed], optimal[quality], where='post', linestyle='--', color='grey', label='Pareto front')
+    ax.set_xlabel(speed)
+    ax.set_ylabel(quality)
+    ax.set_title('Speed vs. Quality')
+    ax.legend()
     plt.tight_layout()
     plt.show()
-    if len(df) > 0:
-        summary = df.groupby('Model').agg({
-            'Generation Time (s)': 'mean',
-            'Tokens Generated': 'mean',
-            'Tokens per Second': 'mean'
-        }).reset_index()
-        print("\n📊 Summary of Performance Metrics:")
-        display(summary)
-    else:
-        print("\n⚠️ No data available for summary.")
-    # No output of responses in the notebook anymore
\ No newline at end of file
+    print("\n📊 Speed and Quality per Model:")
+    display(df)